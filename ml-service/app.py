@@ -1,15 +1,22 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 import os
+import json
+import fcntl
+from contextlib import contextmanager
 from dotenv import load_dotenv
 import logging
 
 # Import ML modules
 from services.recommendations import RecommendationEngine
 from services.analytics import AnalyticsEngine
+from services.trending import TrendingEngine
 from services.content_analysis import ContentAnalyzer
+from services.cache import ResultCache
 from services.image_processing import ImageProcessor
+from services.palette import PALETTE_METHODS, DEFAULT_PALETTE_METHOD
 from services.video_processing import VideoProcessor
+from services.training_data import read_interaction_columns, NPZ_CONTENT_TYPES, ARROW_CONTENT_TYPES
 
 # Load environment variables
 load_dotenv()
@@ -24,11 +31,78 @@ logger = logging.getLogger(__name__)
 
 # Initialize ML services
 recommendation_engine = RecommendationEngine()
-analytics_engine = AnalyticsEngine()
-content_analyzer = ContentAnalyzer()
+analytics_engine = AnalyticsEngine(trending=TrendingEngine(
+    backend=os.getenv('TRENDING_BACKEND', 'exact'),
+    topic_capacity=int(os.getenv('TRENDING_TOPIC_CAPACITY', '100')),
+    sketch_width=int(os.getenv('TRENDING_SKETCH_WIDTH', '512')),
+    sketch_depth=int(os.getenv('TRENDING_SKETCH_DEPTH', '4'))
+), cache_size=int(os.getenv('ANALYTICS_CACHE_SIZE', '10000')), cache_ttl=int(os.getenv('ANALYTICS_CACHE_TTL', '300')))
+content_analyzer = ContentAnalyzer(cache=ResultCache(
+    'content-analysis',
+    max_size=int(os.getenv('CONTENT_CACHE_SIZE', '10000')),
+    redis_url=os.getenv('REDIS_URL'),
+    ttl=int(os.getenv('CONTENT_CACHE_TTL', '3600'))
+), document_frequency_path=os.getenv('CONTENT_DF_PATH'))
 image_processor = ImageProcessor()
 video_processor = VideoProcessor()
 
+# Trained recommendation models are shared between workers through this directory
+RECOMMENDATION_MODEL_DIR = os.getenv('RECOMMENDATION_MODEL_DIR')
+
+if RECOMMENDATION_MODEL_DIR:
+    # Lets refresh() pick up a model another worker saves after this one started
+    recommendation_engine.model_dir = os.path.abspath(RECOMMENDATION_MODEL_DIR)
+
+if RECOMMENDATION_MODEL_DIR and os.path.exists(os.path.join(RECOMMENDATION_MODEL_DIR, 'meta.json')):
+    try:
+        recommendation_engine.load_model(RECOMMENDATION_MODEL_DIR)
+        logger.info(f"Loaded recommendation model from {RECOMMENDATION_MODEL_DIR}")
+    except Exception as e:
+        logger.warning(f"Could not load recommendation model: {str(e)}")
+
+# Trained engagement model weights (a small JSON file)
+ENGAGEMENT_MODEL_PATH = os.getenv('ENGAGEMENT_MODEL_PATH')
+
+if ENGAGEMENT_MODEL_PATH:
+    # Lets refresh() pick up weights another worker trains after this one started
+    analytics_engine.engagement_model.path = ENGAGEMENT_MODEL_PATH
+
+if ENGAGEMENT_MODEL_PATH and os.path.exists(ENGAGEMENT_MODEL_PATH):
+    try:
+        analytics_engine.engagement_model.load(ENGAGEMENT_MODEL_PATH)
+        logger.info(f"Loaded engagement model from {ENGAGEMENT_MODEL_PATH}")
+    except Exception as e:
+        logger.warning(f"Could not load engagement model: {str(e)}")
+
+def save_recommendation_model():
+    """Persist the recommendation model so other workers pick it up"""
+    if RECOMMENDATION_MODEL_DIR:
+        recommendation_engine.save_model(RECOMMENDATION_MODEL_DIR)
+
+@contextmanager
+def recommendation_model_writer():
+    """
+    Serialize recommendation model changes across workers
+    
+    Holds an exclusive file lock next to the model directory and reloads the
+    latest saved model first, skipping the refresh throttle, so each change
+    is applied on top of what other workers saved instead of over a stale
+    in-memory copy.
+    """
+    if not RECOMMENDATION_MODEL_DIR:
+        yield
+        return
+    
+    model_dir = os.path.abspath(RECOMMENDATION_MODEL_DIR)
+    os.makedirs(os.path.dirname(model_dir), exist_ok=True)
+    with open(f"{model_dir}.lock", 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            recommendation_engine.refresh(force=True)
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
 # Health check endpoint
 @app.route('/health', methods=['GET'])
 def health_check():
@@ -44,6 +118,7 @@ def get_user_recommendations(user_id):
     """Get personalized content recommendations for a user"""
     try:
         limit = request.args.get('limit', default=10, type=int)
+        recommendation_engine.refresh()
         recommendations = recommendation_engine.get_user_recommendations(user_id, limit)
         
         return jsonify({
@@ -58,12 +133,83 @@ def get_user_recommendations(user_id):
             'error': str(e)
         }), 500
 
+# Get recommendations for many users in one call
+@app.route('/api/recommendations/users/batch', methods=['POST'])
+def get_batch_recommendations():
+    """Get personalized content recommendations for a list of users"""
+    try:
+        data = request.json
+        user_ids = data.get('user_ids', [])
+        limit = int(data.get('limit', 10))
+        
+        if not user_ids:
+            return jsonify({
+                'success': False,
+                'error': 'user_ids array is required'
+            }), 400
+        
+        recommendation_engine.refresh()
+        results = recommendation_engine.get_batch_recommendations(user_ids, limit)
+        
+        return jsonify({
+            'success': True,
+            'results': results
+        })
+    except Exception as e:
+        logger.error(f"Error getting batch recommendations: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+# Update recommendation exclusions
+@app.route('/api/recommendations/exclusions', methods=['POST'])
+def update_recommendation_exclusions():
+    """Record post authors and blocked users so they are filtered from recommendations"""
+    try:
+        data = request.json
+        item_authors = data.get('item_authors', [])
+        blocked_users = data.get('blocked_users', [])
+        
+        if not item_authors and not blocked_users:
+            return jsonify({
+                'success': False,
+                'error': 'item_authors or blocked_users is required'
+            }), 400
+        
+        with recommendation_model_writer():
+            if item_authors:
+                recommendation_engine.set_item_authors(
+                    [row['item_id'] for row in item_authors],
+                    [row['author_id'] for row in item_authors]
+                )
+            
+            if blocked_users:
+                recommendation_engine.set_blocked_users(
+                    [row['user_id'] for row in blocked_users],
+                    [row['blocked_user_id'] for row in blocked_users]
+                )
+            
+            save_recommendation_model()
+        
+        return jsonify({
+            'success': True,
+            'message': 'Exclusions updated successfully'
+        })
+    except Exception as e:
+        logger.error(f"Error updating exclusions: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 # Get similar users
 @app.route('/api/recommendations/similar-users/<int:user_id>', methods=['GET'])
 def get_similar_users(user_id):
     """Find users with similar interests"""
     try:
         limit = request.args.get('limit', default=10, type=int)
+        recommendation_engine.refresh()
         similar_users = recommendation_engine.get_similar_users(user_id, limit)
         
         return jsonify({
@@ -78,6 +224,57 @@ def get_similar_users(user_id):
             'error': str(e)
         }), 500
 
+# Get similar content ("more like this")
+@app.route('/api/recommendations/content/<int:item_id>', methods=['GET'])
+def get_content_recommendations(item_id):
+    """Find posts with similar content"""
+    try:
+        limit = request.args.get('limit', default=10, type=int)
+        recommendation_engine.refresh()
+        similar_items = recommendation_engine.get_content_recommendations(item_id, limit)
+        
+        return jsonify({
+            'success': True,
+            'item_id': item_id,
+            'similar_items': similar_items
+        })
+    except Exception as e:
+        logger.error(f"Error finding similar content: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+# Build the content similarity index
+@app.route('/api/recommendations/content/index', methods=['POST'])
+def index_content():
+    """Embed post text and build the approximate nearest-neighbour index"""
+    try:
+        data = request.json
+        posts = data.get('posts', [])
+        
+        if not posts:
+            return jsonify({
+                'success': False,
+                'error': 'posts array is required'
+            }), 400
+        
+        with recommendation_model_writer():
+            result = recommendation_engine.index_items(posts)
+            save_recommendation_model()
+        
+        return jsonify({
+            'success': True,
+            'message': 'Content index built successfully',
+            'metrics': result
+        })
+    except Exception as e:
+        logger.error(f"Error indexing content: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 # Analyze content
 @app.route('/api/analysis/content', methods=['POST'])
 def analyze_content():
@@ -105,6 +302,57 @@ def analyze_content():
             'error': str(e)
         }), 500
 
+# Analyze many posts in one call
+@app.route('/api/analysis/content/batch', methods=['POST'])
+def analyze_content_batch():
+    """
+    Analyze a batch of posts, e.g. for backfilling existing content
+    
+    Published posts count toward topic statistics once per post: pass
+    'post_ids' alongside 'contents' (null for drafts and previews).
+    """
+    try:
+        data = request.json
+        contents = data.get('contents', [])
+        
+        if not contents:
+            return jsonify({
+                'success': False,
+                'error': 'contents array is required'
+            }), 400
+        
+        post_ids = data.get('post_ids')
+        if post_ids is not None and len(post_ids) != len(contents):
+            return jsonify({
+                'success': False,
+                'error': 'post_ids must have one id per content'
+            }), 400
+        
+        analyses = content_analyzer.analyze_batch(
+            [content or '' for content in contents],
+            post_ids=post_ids
+        )
+        
+        return jsonify({
+            'success': True,
+            'analyses': analyses
+        })
+    except Exception as e:
+        logger.error(f"Error analyzing content batch: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+# Content analysis cache statistics
+@app.route('/api/analysis/cache/stats', methods=['GET'])
+def get_content_cache_stats():
+    """Hit/miss counters for the content analysis cache"""
+    return jsonify({
+        'success': True,
+        'cache': content_analyzer.cache.stats()
+    })
+
 # Get user analytics
 @app.route('/api/analytics/user/<int:user_id>', methods=['GET'])
 def get_user_analytics(user_id):
@@ -124,6 +372,121 @@ def get_user_analytics(user_id):
             'error': str(e)
         }), 500
 
+# Feed post, engagement and follow events into the per-user rollups
+@app.route('/api/analytics/events', methods=['POST'])
+def ingest_user_events():
+    """
+    Update per-user analytics rollups incrementally
+    
+    Each event has 'type' (post, like, comment, share, follow, unfollow or
+    profile), 'user_id', an optional 'timestamp', and 'post_id',
+    'author_id', 'target_user_id' or 'hashtags' as the type needs. Other
+    types are ignored; a malformed event rejects the whole batch.
+    """
+    try:
+        data = request.json
+        events = data.get('events', [])
+        
+        if not events:
+            return jsonify({
+                'success': False,
+                'error': 'events array is required'
+            }), 400
+        
+        changed = analytics_engine.ingest_user_events(events)
+        
+        return jsonify({
+            'success': True,
+            'ingested': len(events),
+            'users_updated': len(changed)
+        })
+    except (KeyError, ValueError) as e:
+        return jsonify({
+            'success': False,
+            'error': f'Invalid event: {str(e)}'
+        }), 400
+    except Exception as e:
+        logger.error(f"Error ingesting user events: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+def with_sentiment(posts):
+    """Fill in 'sentiment' for posts that only carry content, in one batch"""
+    missing = [post for post in posts if post.get('sentiment') is None and post.get('content')]
+    sentiments = content_analyzer.analyze_sentiment_batch([post['content'] for post in missing])
+    for post, sentiment in zip(missing, sentiments):
+        post['sentiment'] = sentiment['compound']
+    return posts
+
+# Predict engagement for a batch of draft posts
+@app.route('/api/analytics/engagement/predict', methods=['POST'])
+def predict_engagement():
+    """
+    Score draft posts, and pick the best posting slot for each
+    
+    Posts carry content, hashtags, posting_hour, posting_day, optional
+    sentiment and optional candidate_slots ([{'day', 'hour'}]).
+    """
+    try:
+        data = request.json
+        posts = data.get('posts', [])
+        
+        if not posts:
+            return jsonify({
+                'success': False,
+                'error': 'posts array is required'
+            }), 400
+        
+        analytics_engine.engagement_model.refresh()
+        predictions = analytics_engine.predict_engagement_batch(with_sentiment(posts))
+        
+        return jsonify({
+            'success': True,
+            'predictions': predictions
+        })
+    except Exception as e:
+        logger.error(f"Error predicting engagement: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+# Train the engagement model on published posts
+@app.route('/api/analytics/engagement/train', methods=['POST'])
+def train_engagement_model():
+    """Refit the engagement model on posts with their observed 'engagement_rate'"""
+    try:
+        data = request.json
+        posts = data.get('posts', [])
+        
+        if not posts:
+            return jsonify({
+                'success': False,
+                'error': 'posts array is required'
+            }), 400
+        
+        result = analytics_engine.train_engagement_model(with_sentiment(posts), float(data.get('l2', 1.0)))
+        if ENGAGEMENT_MODEL_PATH:
+            analytics_engine.engagement_model.save(ENGAGEMENT_MODEL_PATH)
+        
+        return jsonify({
+            'success': True,
+            'model': result
+        })
+    except (KeyError, ValueError) as e:
+        return jsonify({
+            'success': False,
+            'error': f'Invalid training data: {str(e)}'
+        }), 400
+    except Exception as e:
+        logger.error(f"Error training engagement model: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 # Get trending topics
 @app.route('/api/analytics/trending', methods=['GET'])
 def get_trending_topics():
@@ -136,8 +499,14 @@ def get_trending_topics():
         
         return jsonify({
             'success': True,
+            'timeframe': timeframe,
             'trending': trending
         })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         logger.error(f"Error getting trending topics: {str(e)}")
         return jsonify({
@@ -145,11 +514,206 @@ def get_trending_topics():
             'error': str(e)
         }), 500
 
+# Push hashtag/topic events into the trending counters
+@app.route('/api/analytics/trending/ingest', methods=['POST'])
+def ingest_trending_topics():
+    """
+    Record posts for trending topics
+    
+    Each event carries 'hashtags' (or 'topics'), an optional 'timestamp' and
+    'sentiment'; events with only 'content' are run through the content
+    analyzer for their hashtags and sentiment, and count toward topic
+    statistics once per 'post_id'.
+    """
+    try:
+        data = request.json
+        events = data.get('events', [data])
+        
+        to_analyze = [event for event in events if 'hashtags' not in event and 'topics' not in event and event.get('content')]
+        analyses = content_analyzer.analyze_batch(
+            [event['content'] for event in to_analyze],
+            post_ids=[event.get('post_id') for event in to_analyze]
+        )
+        for event, analysis in zip(to_analyze, analyses):
+            event['hashtags'] = analysis['hashtags']
+            event.setdefault('sentiment', analysis['sentiment']['compound'])
+        
+        analytics_engine.trending.ingest_batch(events)
+        
+        return jsonify({
+            'success': True,
+            'ingested': len(events)
+        })
+    except Exception as e:
+        logger.error(f"Error ingesting trending topics: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+# Record post/story view and interaction events
+@app.route('/api/analytics/views', methods=['POST'])
+def record_view_events():
+    """
+    Record rows from story_views / post_interactions for unique-viewer and reach sketches
+    
+    Each event has 'post_id' or 'story_id', 'user_id', and optionally
+    'timestamp' and 'type' ('view' by default).
+    """
+    try:
+        data = request.json
+        events = data.get('events', [])
+        
+        if not events:
+            return jsonify({
+                'success': False,
+                'error': 'events array is required'
+            }), 400
+        
+        analytics_engine.reach.record_events(events)
+        
+        return jsonify({
+            'success': True,
+            'recorded': len(events)
+        })
+    except (KeyError, ValueError) as e:
+        return jsonify({
+            'success': False,
+            'error': f'Invalid view event: {str(e)}'
+        }), 400
+    except Exception as e:
+        logger.error(f"Error recording view events: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+# Get post analytics
+@app.route('/api/analytics/post/<int:post_id>', methods=['GET'])
+def get_post_analytics(post_id):
+    """Get analytics for a post, optionally limited to the last N days"""
+    try:
+        days = request.args.get('days', default=None, type=int)
+        analytics = analytics_engine.get_post_analytics(post_id, days)
+        
+        return jsonify({
+            'success': True,
+            'analytics': analytics
+        })
+    except Exception as e:
+        logger.error(f"Error getting post analytics: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+# Exchange reach sketches between workers
+@app.route('/api/analytics/reach/<kind>/<int:item_id>/sketch', methods=['GET'])
+def export_reach_sketch(kind, item_id):
+    """Serialized HyperLogLog sketches for a post or story"""
+    try:
+        return jsonify({
+            'success': True,
+            'sketch': analytics_engine.reach.export_sketches(kind, item_id)
+        })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+@app.route('/api/analytics/reach/merge', methods=['POST'])
+def merge_reach_sketches():
+    """Merge serialized sketches exported by another worker"""
+    try:
+        data = request.json
+        sketches = data.get('sketches', [data.get('sketch')] if data.get('sketch') else [])
+        
+        for sketch in sketches:
+            analytics_engine.reach.merge_sketches(sketch)
+        
+        return jsonify({
+            'success': True,
+            'merged': len(sketches)
+        })
+    except (KeyError, ValueError) as e:
+        return jsonify({
+            'success': False,
+            'error': f'Invalid sketch: {str(e)}'
+        }), 400
+    except Exception as e:
+        logger.error(f"Error merging reach sketches: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+# Trending backend memory footprint
+@app.route('/api/analytics/trending/stats', methods=['GET'])
+def get_trending_stats():
+    """Backend, bucket and memory statistics for trending topics"""
+    return jsonify({
+        'success': True,
+        'trending': analytics_engine.trending.stats()
+    })
+
+def read_training_columns():
+    """
+    Columnar training input, or None for the JSON list-of-dicts format
+    
+    Binary bodies (.npz or Arrow IPC) are decoded straight from the request;
+    JSON bodies may carry parallel arrays under 'columns' or a local file 'path'.
+    """
+    content_type = (request.content_type or '').split(';')[0].strip().lower()
+    
+    if content_type in NPZ_CONTENT_TYPES or content_type in ARROW_CONTENT_TYPES:
+        return read_interaction_columns(body=request.stream, content_type=content_type)
+    
+    data = request.get_json(silent=True) or {}
+    if 'columns' in data:
+        return read_interaction_columns(columns=data['columns'])
+    if 'path' in data:
+        return read_interaction_columns(path=data['path'])
+    return None
+
+def configure_training():
+    """Apply model type, interaction weights and decay half-life sent with a training request"""
+    data = request.get_json(silent=True) or {}
+    options = {**request.args.to_dict(), **data}
+    
+    recommendation_engine.configure_weighting(data.get('interaction_weights'), options.get('half_life_days'))
+    recommendation_engine.configure_model(
+        options.get('model_type'),
+        factors=int(options['factors']) if 'factors' in options else None,
+        iterations=int(options['iterations']) if 'iterations' in options else None
+    )
+
 # Train recommendation model
 @app.route('/api/ml/train', methods=['POST'])
 def train_model():
     """Train or retrain the recommendation model"""
     try:
+        columns = read_training_columns()
+        
+        if columns is not None:
+            if len(columns['user_id']) == 0:
+                return jsonify({
+                    'success': False,
+                    'error': 'Training data is required'
+                }), 400
+            
+            with recommendation_model_writer():
+                # After the writer's reload, which restores the saved model's configuration
+                configure_training()
+                result = recommendation_engine.train_from_columns(columns)
+                save_recommendation_model()
+            
+            return jsonify({
+                'success': True,
+                'message': 'Model trained successfully',
+                'metrics': result
+            })
+        
         data = request.json
         user_interactions = data.get('user_interactions', [])
         
@@ -159,7 +723,10 @@ def train_model():
                 'error': 'Training data is required'
             }), 400
         
-        result = recommendation_engine.train_model(user_interactions)
+        with recommendation_model_writer():
+            configure_training()
+            result = recommendation_engine.train_model(user_interactions)
+            save_recommendation_model()
         
         return jsonify({
             'success': True,
@@ -173,15 +740,111 @@ def train_model():
             'error': str(e)
         }), 500
 
+# Incrementally update recommendation model
+@app.route('/api/ml/update', methods=['POST'])
+def update_model():
+    """Fold interactions newer than the model watermark into the trained model"""
+    try:
+        columns = read_training_columns()
+        
+        if columns is not None:
+            since = request.args.get('since') or (request.get_json(silent=True) or {}).get('since')
+            with recommendation_model_writer():
+                result = recommendation_engine.update_from_columns(columns, since)
+                save_recommendation_model()
+            
+            return jsonify({
+                'success': True,
+                'message': 'Model updated successfully',
+                'metrics': result
+            })
+        
+        data = request.json
+        user_interactions = data.get('user_interactions', [])
+        since = data.get('since')
+        
+        if not user_interactions:
+            return jsonify({
+                'success': False,
+                'error': 'Interaction data is required'
+            }), 400
+        
+        with recommendation_model_writer():
+            result = recommendation_engine.update_model(user_interactions, since)
+            save_recommendation_model()
+        
+        return jsonify({
+            'success': True,
+            'message': 'Model updated successfully',
+            'metrics': result
+        })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        logger.error(f"Error updating model: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 # Image Processing Endpoints
+def read_image_request():
+    """
+    Image and parameters from a JSON, multipart or raw-bytes request
+    
+    - JSON: {"image": "<base64>", ...parameters}
+    - multipart/form-data: an "image" file part plus form fields; the spooled
+      upload is passed straight to the decoder
+    - raw body (image/* or application/octet-stream): parameters in the query string
+    
+    Returns: (image_data, params); image_data is None when no image was sent
+    """
+    if request.mimetype == 'multipart/form-data':
+        upload = request.files.get('image')
+        params = request.args.to_dict()
+        params.update(request.form.to_dict())
+        return (upload.stream if upload else None), params
+    
+    if request.is_json:
+        data = request.get_json()
+        return data.get('image'), data
+    
+    return request.get_data(cache=False) or None, request.args.to_dict()
+
+def size_param(value, default):
+    """(width, height) from a JSON list or a '1920x1080' / '1920,1080' string"""
+    if value is None or value == '':
+        return tuple(default)
+    if isinstance(value, str):
+        value = value.lower().replace('x', ',').split(',')
+    return tuple(int(v) for v in value)
+
+def wants_binary(params):
+    """Binary responses are requested with response=binary or an image Accept header"""
+    if params.get('response') == 'binary':
+        return True
+    return request.accept_mimetypes.best_match(['application/json', 'image/jpeg']) == 'image/jpeg'
+
+def image_response(result, image_key, binary):
+    """JSON with a base64 image, or the raw JPEG with the other fields in X-Image-Metadata"""
+    if not binary:
+        return jsonify(result)
+    
+    image_bytes = result.pop(image_key)
+    response = Response(image_bytes, mimetype='image/jpeg')
+    response.headers['X-Image-Metadata'] = json.dumps(result)
+    return response
+
 @app.route('/api/image/optimize', methods=['POST'])
 def optimize_image():
     """Optimize image for web/mobile"""
     try:
-        data = request.json
-        image_data = data.get('image')  # Base64 encoded
-        max_size = data.get('max_size', [1920, 1080])
-        quality = data.get('quality', 85)
+        image_data, params = read_image_request()
+        max_size = size_param(params.get('max_size'), [1920, 1080])
+        quality = int(params.get('quality', 85))
         
         if not image_data:
             return jsonify({
@@ -189,13 +852,15 @@ def optimize_image():
                 'error': 'Image data is required'
             }), 400
         
+        binary = wants_binary(params)
         result = image_processor.optimize_image(
             image_data,
-            tuple(max_size),
-            quality
+            max_size,
+            quality,
+            as_bytes=binary
         )
         
-        return jsonify(result)
+        return image_response(result, 'optimized_image', binary)
     except Exception as e:
         logger.error(f"Error optimizing image: {str(e)}")
         return jsonify({
@@ -207,9 +872,8 @@ def optimize_image():
 def apply_image_filter():
     """Apply filter to image"""
     try:
-        data = request.json
-        image_data = data.get('image')
-        filter_type = data.get('filter', 'none')
+        image_data, params = read_image_request()
+        filter_type = params.get('filter', 'none')
         
         if not image_data:
             return jsonify({
@@ -217,9 +881,15 @@ def apply_image_filter():
                 'error': 'Image data is required'
             }), 400
         
-        result = image_processor.apply_filter(image_data, filter_type)
+        binary = wants_binary(params)
+        result = image_processor.apply_filter(image_data, filter_type, as_bytes=binary)
         
-        return jsonify(result)
+        return image_response(result, 'filtered_image', binary)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         logger.error(f"Error applying filter: {str(e)}")
         return jsonify({
@@ -231,9 +901,8 @@ def apply_image_filter():
 def generate_thumbnail():
     """Generate thumbnail from image"""
     try:
-        data = request.json
-        image_data = data.get('image')
-        size = data.get('size', [150, 150])
+        image_data, params = read_image_request()
+        size = size_param(params.get('size'), [150, 150])
         
         if not image_data:
             return jsonify({
@@ -241,9 +910,10 @@ def generate_thumbnail():
                 'error': 'Image data is required'
             }), 400
         
-        result = image_processor.generate_thumbnail(image_data, tuple(size))
+        binary = wants_binary(params)
+        result = image_processor.generate_thumbnail(image_data, size, as_bytes=binary)
         
-        return jsonify(result)
+        return image_response(result, 'thumbnail', binary)
     except Exception as e:
         logger.error(f"Error generating thumbnail: {str(e)}")
         return jsonify({
@@ -253,11 +923,15 @@ def generate_thumbnail():
 
 @app.route('/api/image/colors', methods=['POST'])
 def extract_colors():
-    """Extract dominant colors from image"""
+    """
+    Extract dominant colors from image
+    
+    Parameters: num_colors, method ('median_cut' or 'kmeans')
+    """
     try:
-        data = request.json
-        image_data = data.get('image')
-        num_colors = data.get('num_colors', 5)
+        image_data, params = read_image_request()
+        num_colors = int(params.get('num_colors', 5))
+        method = params.get('method', DEFAULT_PALETTE_METHOD)
         
         if not image_data:
             return jsonify({
@@ -265,7 +939,13 @@ def extract_colors():
                 'error': 'Image data is required'
             }), 400
         
-        result = image_processor.extract_dominant_colors(image_data, num_colors)
+        if method not in PALETTE_METHODS:
+            return jsonify({
+                'success': False,
+                'error': f"method must be one of: {', '.join(PALETTE_METHODS)}"
+            }), 400
+        
+        result = image_processor.extract_dominant_colors(image_data, num_colors, method)
         
         return jsonify(result)
     except Exception as e:
@@ -275,6 +955,52 @@ def extract_colors():
             'error': str(e)
         }), 500
 
+@app.route('/api/image/pipeline', methods=['POST'])
+def process_image_pipeline():
+    """
+    Decode an upload once and return every rendition, its colors and metadata
+    
+    Parameters: renditions ([{'name', 'max_size', 'quality'}]), num_colors, color_method, metadata
+    """
+    try:
+        image_data, params = read_image_request()
+        renditions = params.get('renditions')
+        if isinstance(renditions, str):
+            renditions = json.loads(renditions)
+        num_colors = int(params.get('num_colors', 5))
+        color_method = params.get('color_method', DEFAULT_PALETTE_METHOD)
+        include_metadata = str(params.get('metadata', True)).lower() not in ('false', '0')
+        
+        if not image_data:
+            return jsonify({
+                'success': False,
+                'error': 'Image data is required'
+            }), 400
+        
+        for rendition in renditions or []:
+            if not rendition.get('name') or not rendition.get('max_size'):
+                return jsonify({
+                    'success': False,
+                    'error': 'Each rendition needs a name and max_size'
+                }), 400
+            rendition['max_size'] = size_param(rendition['max_size'], None)
+        
+        if color_method not in PALETTE_METHODS:
+            return jsonify({
+                'success': False,
+                'error': f"color_method must be one of: {', '.join(PALETTE_METHODS)}"
+            }), 400
+        
+        result = image_processor.process_pipeline(image_data, renditions, num_colors, include_metadata, color_method)
+        
+        return jsonify(result)
+    except Exception as e:
+        logger.error(f"Error running image pipeline: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 # Video Processing Endpoints
 @app.route('/api/video/info', methods=['POST'])
 def get_video_info():
@@ -444,28 +1170,13 @@ def suggest_hashtags():
                 'error': 'content is required'
             }), 400
         
-        # Analyze content
-        analysis = content_analyzer.analyze(content)
-        
-        # Extract topics as hashtags
-        suggested_hashtags = []
-        
-        # Add topics as hashtags
-        if 'topics' in analysis:
-            suggested_hashtags.extend([f"#{topic}" for topic in analysis['topics'][:5]])
-        
-        # Add extracted hashtags
-        if 'hashtags' in analysis:
-            suggested_hashtags.extend(analysis['hashtags'][:3])
-        
-        # Remove duplicates
-        suggested_hashtags = list(set(suggested_hashtags))
+        suggestion = content_analyzer.suggest_hashtags(content)
         
         return jsonify({
             'success': True,
-            'hashtags': suggested_hashtags[:8],  # Max 8 suggestions
-            'sentiment': analysis.get('sentiment', 'neutral'),
-            'quality_score': analysis.get('quality_score', 0)
+            'hashtags': suggestion['hashtags'],  # Max 8 suggestions
+            'sentiment': suggestion['sentiment'],
+            'quality_score': suggestion['quality_score']
         })
         
     except Exception as e:
@@ -559,6 +1270,14 @@ def get_story_analytics():
                 'error': 'stories array is required'
             }), 400
         
+        # Views and distinct viewers come from the view sketches when the story has been tracked
+        reach = analytics_engine.reach
+        story_ids = [story.get('id', story.get('story_id')) for story in story_data]
+        for story, story_id in zip(story_data, story_ids):
+            if story_id is not None:
+                story.setdefault('views', reach.views('story', story_id))
+                story['unique_viewers'] = reach.unique_viewers('story', story_id)
+        
         # Calculate story metrics
         total_views = sum(story.get('views', 0) for story in story_data)
         total_stories = len(story_data)
@@ -572,6 +1291,7 @@ def get_story_analytics():
             'analytics': {
                 'total_stories': total_stories,
                 'total_views': total_views,
+                'unique_viewers': reach.unique_audience('story', [story_id for story_id in story_ids if story_id is not None]),
                 'average_views': round(avg_views, 2),
                 'best_performing': best_story,
                 'engagement_rate': round((total_views / total_stories) * 100, 2) if total_stories > 0 else 0
@@ -0,0 +1,72 @@
+"""
+Recall vs latency benchmark for the IVF content index
+
+Builds an index over synthetic clustered unit vectors (shaped like the
+hashed TF-IDF post embeddings) and compares recall@k and per-query latency
+for several n_probe settings against a brute-force scan.
+
+    python benchmarks/ann_recall.py --items 200000 --dim 256
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from services.ann_index import IVFIndex
+
+
+def make_vectors(n_items, dim, n_topics, noise, seed):
+    rng = np.random.default_rng(seed)
+    topics = rng.standard_normal((n_topics, dim)).astype(np.float32)
+    vectors = topics[rng.integers(0, n_topics, n_items)]
+    vectors += noise * rng.standard_normal((n_items, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--items', type=int, default=200000)
+    parser.add_argument('--dim', type=int, default=256)
+    parser.add_argument('--topics', type=int, default=2000)
+    parser.add_argument('--noise', type=float, default=1.5)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    
+    vectors = make_vectors(args.items, args.dim, args.topics, args.noise, args.seed)
+    queries = np.random.default_rng(args.seed + 1).choice(args.items, args.queries, replace=False)
+    
+    start = time.perf_counter()
+    index = IVFIndex(seed=args.seed).build(vectors)
+    print(f"built {len(index)} vectors into {len(index.centroids)} lists in {time.perf_counter() - start:.2f}s")
+    
+    exact = []
+    start = time.perf_counter()
+    for q in queries:
+        ids, _ = index.search_exact(vectors[q], args.k)
+        exact.append(set(ids.tolist()))
+    brute_ms = (time.perf_counter() - start) / len(queries) * 1000
+    
+    print(f"{'n_probe':>8} {'recall@' + str(args.k):>10} {'ms/query':>10} {'speedup':>8}")
+    print(f"{'brute':>8} {1.0:>10.3f} {brute_ms:>10.3f} {1.0:>8.1f}")
+    
+    for n_probe in (1, 2, 4, 8, 16, 32, 64):
+        if n_probe > len(index.centroids):
+            break
+        hits = 0
+        start = time.perf_counter()
+        for q, truth in zip(queries, exact):
+            ids, _ = index.search(vectors[q], args.k, n_probe=n_probe)
+            hits += len(truth.intersection(ids.tolist()))
+        ms = (time.perf_counter() - start) / len(queries) * 1000
+        print(f"{n_probe:>8} {hits / (len(queries) * args.k):>10.3f} {ms:>10.3f} {brute_ms / ms:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
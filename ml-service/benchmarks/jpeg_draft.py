@@ -0,0 +1,115 @@
+"""
+Full decode vs JPEG draft-mode decode for typical camera uploads
+
+Encodes synthetic photo-like JPEGs at 12, 24 and 48 megapixels and times
+each ImageProcessor path (thumbnail, dominant colors, feed optimization and
+the rendition pipeline) with draft decoding disabled and enabled. The PSNR
+column compares the draft output with the full-decode output.
+
+    python benchmarks/jpeg_draft.py --repeat 3
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from services.image_processing import ImageProcessor
+
+UPLOAD_SIZES = {
+    '12MP': (4000, 3000),
+    '24MP': (6000, 4000),
+    '48MP': (8000, 6000)
+}
+
+
+class FullDecodeProcessor(ImageProcessor):
+    """ImageProcessor with draft decoding (including thumbnail()'s own) turned off"""
+    
+    def _draft(self, img, size):
+        img.decoderconfig = (1, 0)
+        return img
+
+
+def make_jpeg(width, height, seed):
+    """Smooth gradients plus upsampled texture and sensor-like noise"""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    base = np.stack([
+        128 + 100 * np.sin(x / width * 7 + y / height * 3),
+        128 + 100 * np.cos(y / height * 5),
+        128 + 80 * np.sin((x + y) / (width + height) * 11)
+    ], axis=-1)
+    coarse = rng.integers(0, 256, (height // 16, width // 16, 3), dtype=np.uint8)
+    texture = np.asarray(Image.fromarray(coarse).resize((width, height), Image.Resampling.BICUBIC), dtype=np.float32)
+    pixels = base * 0.6 + texture * 0.4 + rng.normal(0, 6, (height, width, 3)).astype(np.float32)
+    
+    output = io.BytesIO()
+    Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)).save(output, format='JPEG', quality=90)
+    return output.getvalue()
+
+
+def decoded(result, key):
+    return np.asarray(Image.open(io.BytesIO(result[key])), dtype=np.float64)
+
+
+def psnr(a, b):
+    if a.shape != b.shape:
+        return float('nan')
+    mse = np.mean((a - b) ** 2)
+    return float('inf') if mse == 0 else 10 * np.log10(255 ** 2 / mse)
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', nargs='+', default=list(UPLOAD_SIZES), choices=list(UPLOAD_SIZES))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    
+    full, draft = FullDecodeProcessor(), ImageProcessor()
+    cases = [
+        ('thumbnail 150', lambda p, data: p.generate_thumbnail(data, as_bytes=True), 'thumbnail'),
+        ('colors', lambda p, data: p.extract_dominant_colors(data), None),
+        ('optimize 1920', lambda p, data: p.optimize_image(data, as_bytes=True), 'optimized_image'),
+        ('pipeline', lambda p, data: p.process_pipeline(data, include_metadata=False), None)
+    ]
+    
+    for label in args.sizes:
+        width, height = UPLOAD_SIZES[label]
+        data = make_jpeg(width, height, args.seed)
+        print(f"{label} ({width}x{height}, {len(data) / 1e6:.1f} MB)")
+        
+        for name, run, image_key in cases:
+            full_time, full_result = best_of(lambda: run(full, data), args.repeat)
+            draft_time, draft_result = best_of(lambda: run(draft, data), args.repeat)
+            
+            if image_key:
+                quality = f"PSNR {psnr(decoded(full_result, image_key), decoded(draft_result, image_key)):.1f} dB"
+            elif name == 'colors':
+                shared = {c['hex'] for c in full_result['dominant_colors']} & {c['hex'] for c in draft_result['dominant_colors']}
+                quality = f"{len(shared)}/{len(full_result['dominant_colors'])} colors shared"
+            else:
+                quality = 'renditions ' + ', '.join(
+                    f"{key} {value['size'][0]}x{value['size'][1]}" for key, value in draft_result['renditions'].items()
+                )
+            print(f"  {name:14s} full {full_time * 1000:7.1f} ms   draft {draft_time * 1000:7.1f} ms   "
+                  f"x{full_time / draft_time:4.1f}   {quality}")
+
+
+if __name__ == '__main__':
+    main()
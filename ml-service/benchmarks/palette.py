@@ -0,0 +1,72 @@
+"""
+Palette extraction: Counter over pixel tuples vs median cut vs k-means
+
+Runs each method on the 100x100 color sample of synthetic photos and
+reports time per image and how distinct the returned colors are (smallest
+CIE76 delta E between any two of them; below ~12 reads as the same color).
+
+    python benchmarks/palette.py --images 20 --colors 5
+"""
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from services.image_processing import COLOR_SAMPLE_SIZE
+from services.palette import PALETTE_METHODS, extract_palette, rgb_to_lab
+
+
+def legacy_palette(pixels, num_colors):
+    """Most common exact pixel values, as extract_dominant_colors used to do"""
+    pixel_list = [tuple(int(channel) for channel in pixel) for pixel in pixels.reshape(-1, 3)]
+    return [(list(color), count / len(pixel_list)) for color, count in Counter(pixel_list).most_common(num_colors)]
+
+
+def make_sample(seed):
+    """Smooth photo-like image with a few color regions and sensor noise, at the sample size"""
+    rng = np.random.default_rng(seed)
+    width, height = COLOR_SAMPLE_SIZE
+    regions = rng.integers(0, 256, (4, 4, 3), dtype=np.uint8)
+    pixels = np.asarray(Image.fromarray(regions).resize((width, height), Image.Resampling.BICUBIC), dtype=np.float64)
+    pixels += rng.normal(0, 8, pixels.shape)
+    return np.clip(pixels, 0, 255).astype(np.uint8)
+
+
+def min_delta_e(palette):
+    if len(palette) < 2:
+        return float('nan')
+    lab = rgb_to_lab([color for color, _ in palette])
+    distances = np.sqrt(((lab[:, None, :] - lab[None, :, :]) ** 2).sum(axis=2))
+    return float(distances[np.triu_indices(len(lab), 1)].min())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--images', type=int, default=20)
+    parser.add_argument('--colors', type=int, default=5)
+    args = parser.parse_args()
+    
+    samples = [make_sample(seed) for seed in range(args.images)]
+    methods = [('counter', legacy_palette)] + [
+        (method, lambda pixels, n, method=method: extract_palette(pixels, n, method))
+        for method in PALETTE_METHODS
+    ]
+    
+    for name, extract in methods:
+        start = time.perf_counter()
+        palettes = [extract(pixels, args.colors) for pixels in samples]
+        elapsed = (time.perf_counter() - start) / len(samples)
+        deterministic = all(extract(pixels, args.colors) == palette for pixels, palette in zip(samples, palettes))
+        coverage = np.mean([sum(share for _, share in palette) for palette in palettes])
+        print(f"{name:10s} {elapsed * 1000:7.2f} ms/image   min delta E {np.nanmedian([min_delta_e(p) for p in palettes]):6.1f} (median)   "
+              f"pixels covered {coverage:6.1%}   deterministic: {deterministic}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""
+Error-bound check for the Count-Min and Space-Saving hashtag sketches
+
+Streams a Zipf-distributed hashtag workload mixed with one-off spam tags and
+compares sketch answers with exact counts:
+
+  - Count-Min: every estimate must be >= the true count, and the share of
+    keys over the true count by more than epsilon * N must stay below delta.
+  - Space-Saving: every key with true count > N / capacity must be monitored,
+    and true counts must lie within [count - error, count].
+  - TrendingEngine (sketch backend): reported mentions must never be below
+    the exact backend's counts, stay within the Count-Min bound, and come
+    back in descending order.
+
+Exits with status 1 when any check fails.
+
+    python benchmarks/sketch_error.py --events 500000 --spam 0.5
+"""
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from services.sketches import CountMinSketch, SpaceSaving, hash_keys
+from services.trending import TrendingEngine
+
+
+def make_stream(n_events, n_topics, spam, seed):
+    rng = np.random.default_rng(seed)
+    topics = rng.zipf(1.2, n_events) % n_topics
+    is_spam = rng.random(n_events) < spam
+    spam_ids = rng.integers(0, 2 ** 40, n_events)
+    return [f'spam{s}' if flag else f'tag{t}' for t, s, flag in zip(topics, spam_ids, is_spam)]
+
+
+def check(label, ok):
+    print(f"  {label}: {'ok' if ok else 'FAIL'}")
+    return ok
+
+
+def check_trending(stream, args):
+    """Replay the stream over 24 hours through both trending backends"""
+    exact = TrendingEngine(windows={'24h': 24})
+    sketch = TrendingEngine(windows={'24h': 24}, backend='sketch', topic_capacity=args.capacity,
+                            sketch_width=args.width, sketch_depth=args.depth)
+    start_time = 1_700_000_000 - 1_700_000_000 % 3600
+    step = 24 * 3600 / len(stream)
+    started = time.perf_counter()
+    for i, key in enumerate(stream):
+        timestamp = start_time + int(i * step)
+        exact.ingest([key], timestamp)
+        sketch.ingest([key], timestamp)
+    now = start_time + 24 * 3600 - 1
+    print(f"trending sketch backend: replayed in {time.perf_counter() - started:.2f}s")
+    
+    true_counts = exact.current['24h'].counts
+    reported = sketch.get_trending('24h', limit=args.top, now=now)
+    mentions = [entry['mentions'] for entry in reported]
+    overshoot = [entry['mentions'] - true_counts.get(entry['topic'].lstrip('#'), 0) for entry in reported]
+    bound = np.e / args.width * len(stream)
+    true_top = {topic for topic, _ in exact.current['24h'].top(10)}
+    found = {entry['topic'].lstrip('#') for entry in reported[:10]}
+    print(f"  e/width*N = {bound:.1f}, max overshoot = {max(overshoot)}, top-10 overlap with exact: {len(found & true_top)}/10")
+    
+    results = [
+        check("never undercounts", min(overshoot) >= 0),
+        check("within Count-Min bound", max(overshoot) <= bound),
+        check("ranked by reported mentions", mentions == sorted(mentions, reverse=True))
+    ]
+    return all(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--events', type=int, default=500000)
+    parser.add_argument('--topics', type=int, default=50000)
+    parser.add_argument('--spam', type=float, default=0.5)
+    parser.add_argument('--width', type=int, default=2048)
+    parser.add_argument('--depth', type=int, default=4)
+    parser.add_argument('--capacity', type=int, default=200)
+    parser.add_argument('--top', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    
+    stream = make_stream(args.events, args.topics, args.spam, args.seed)
+    exact = Counter(stream)
+    n = len(stream)
+    print(f"{n} events, {len(exact)} distinct tags")
+    
+    sketch = CountMinSketch(args.width, args.depth, seed=args.seed)
+    start = time.perf_counter()
+    sketch.add_hashes(hash_keys(stream))
+    print(f"count-min: {sketch.memory_bytes / 1024:.0f} KiB, built in {time.perf_counter() - start:.2f}s")
+    
+    keys = list(exact)
+    true_counts = np.array([exact[key] for key in keys])
+    estimates = sketch.estimate_hashes(hash_keys(keys))
+    overshoot = estimates - true_counts
+    bound = sketch.epsilon * n
+    violations = float(np.mean(overshoot > bound))
+    print(f"  epsilon*N = {bound:.1f}, max overshoot = {overshoot.max()}, mean = {overshoot.mean():.2f}")
+    print(f"  keys over bound: {violations:.4%} (delta = {sketch.delta:.4%})")
+    results = [
+        check("never undercounts", bool((overshoot >= 0).all())),
+        check("keys over bound <= delta", violations <= sketch.delta)
+    ]
+    
+    summary = SpaceSaving(args.capacity)
+    start = time.perf_counter()
+    for key in stream:
+        summary.offer(key)
+    print(f"space-saving: {args.capacity} counters, built in {time.perf_counter() - start:.2f}s")
+    
+    threshold = n / args.capacity
+    heavy = [key for key, count in exact.items() if count > threshold]
+    missing = [key for key in heavy if key not in summary.counts]
+    bracket_ok = all(
+        count - summary.errors[key] <= exact[key] <= count
+        for key, count in summary.counts.items()
+    )
+    top = [key for key, _, _ in summary.top(10)]
+    true_top = [key for key, _ in exact.most_common(10)]
+    print(f"  heavy hitters (> N/capacity = {threshold:.0f}): {len(heavy)}, top-10 overlap with exact: {len(set(top) & set(true_top))}/10")
+    results.append(check("no heavy hitter missing", not missing))
+    results.append(check("true counts within [count - error, count]", bracket_ok))
+    
+    results.append(check_trending(stream, args))
+    
+    if not all(results):
+        print("FAIL")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
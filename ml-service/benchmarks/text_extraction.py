@@ -0,0 +1,126 @@
+"""
+Microbenchmark for ContentAnalyzer token and task extraction
+
+Compares the previous per-call regex approach (separate re.findall/re.match
+calls with string patterns, one per feature and one per task marker) with
+the fused, precompiled scanners on long OCR-style text and a bulk post
+backfill.
+
+    python benchmarks/text_extraction.py --posts 20000
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from services.content_analysis import ContentAnalyzer, TASK_MARKER_PATTERN
+
+WORDS = (
+    'great launch team meeting today love the new design terrible bug fixed '
+    'python release notes shipping tomorrow please review awesome work'
+).split()
+
+LEGACY_TASK_MARKERS = [
+    r'^\s*[-•*]\s*(.+)$',
+    r'^\s*\d+[.)]\s*(.+)$',
+    r'^\s*\[[ x]\]\s*(.+)$',
+    r'^TODO:\s*(.+)$',
+    r'^Task:\s*(.+)$',
+]
+
+
+def legacy_tokens(content):
+    """
+    Token extraction as done by analyze() before the fused scanner: word
+    tokens twice (sentiment, then again for the quality score), topics,
+    hashtags, mentions, and two whitespace splits
+    """
+    words = re.findall(r'\b\w+\b', content.lower())
+    words_again = re.findall(r'\b\w+\b', content.lower())
+    topics = re.findall(r'\b\w{4,}\b', content.lower())
+    hashtags = re.findall(r'#(\w+)', content)
+    mentions = re.findall(r'@(\w+)', content)
+    chunks = content.split()
+    chunks_again = content.split()
+    return words, words_again, topics, hashtags, mentions, chunks, chunks_again
+
+
+def legacy_task_lines(text):
+    """Task marker matching as done before the combined pattern"""
+    found = []
+    for line in text.split('\n'):
+        line = line.strip()
+        for pattern in LEGACY_TASK_MARKERS:
+            match = re.match(pattern, line, re.IGNORECASE)
+            if match:
+                found.append(match.group(1).strip())
+                break
+    return found
+
+
+def task_lines(text):
+    """The same matching with the combined TASK_MARKER_PATTERN"""
+    found = []
+    for line in text.split('\n'):
+        match = TASK_MARKER_PATTERN.match(line.strip())
+        if match:
+            found.append(match.group(1).strip())
+    return found
+
+
+def make_post(rng):
+    words = [rng.choice(WORDS) for _ in range(rng.randint(10, 60))]
+    words.insert(rng.randrange(len(words)), '#' + rng.choice(WORDS))
+    words.insert(rng.randrange(len(words)), '@user' + str(rng.randint(1, 999)))
+    if rng.random() < 0.3:
+        words.append('https://example.com/p/' + str(rng.randint(1, 10 ** 6)))
+    return ' '.join(words)
+
+
+def make_ocr_text(rng, n_lines, unmarked):
+    prefixes = ['- ', '* ', '1. ', '2) ', '[ ] ', '[x] ', 'TODO: ', 'Task: ']
+    return '\n'.join(
+        ('' if rng.random() < unmarked else rng.choice(prefixes))
+        + ' '.join(rng.choice(WORDS) for _ in range(rng.randint(2, 8)))
+        for _ in range(n_lines)
+    )
+
+
+def timed(label, fn, baseline=None):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    speedup = f"{baseline / elapsed:6.2f}x" if baseline else ''
+    print(f"{label:<32} {elapsed * 1000:10.1f} ms {speedup}")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--posts', type=int, default=20000)
+    parser.add_argument('--ocr-lines', type=int, default=20000)
+    parser.add_argument('--unmarked', type=float, default=0.5,
+                        help='fraction of OCR lines without a task marker')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    
+    rng = random.Random(args.seed)
+    posts = [make_post(rng) for _ in range(args.posts)]
+    ocr_text = make_ocr_text(rng, args.ocr_lines, args.unmarked)
+    analyzer = ContentAnalyzer()
+    
+    print(f"{args.posts} posts")
+    baseline = timed('  legacy per-feature regexes', lambda: [legacy_tokens(p) for p in posts])
+    timed('  fused scanner', lambda: [analyzer._tokenize_document(p) for p in posts], baseline)
+    
+    print(f"OCR text, {args.ocr_lines} lines")
+    baseline = timed('  legacy marker loop', lambda: legacy_task_lines(ocr_text))
+    timed('  combined marker pattern', lambda: task_lines(ocr_text), baseline)
+
+
+if __name__ == '__main__':
+    main()
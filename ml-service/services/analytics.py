@@ -1,14 +1,26 @@
-from datetime import datetime, timedelta
-from collections import Counter, defaultdict
 import logging
 
+import numpy as np
+
+from .trending import TrendingEngine
+from .reach import ReachTracker
+from .user_rollups import UserRollupStore, WEEKDAYS
+from .cache import LRUCache
+from .engagement_model import EngagementModel, engagement_features, weekday_indexes
+
 logger = logging.getLogger(__name__)
 
 class AnalyticsEngine:
     """Analytics and insights engine for user data"""
     
-    def __init__(self):
-        self.analytics_cache = {}
+    def __init__(self, trending=None, reach=None, cache_size=10000, cache_ttl=300, engagement_model=None):
+        # Rendered user analytics; dropped when the user's rollup changes, and
+        # expired after cache_ttl so time-windowed fields (growth, trend) roll forward
+        self.analytics_cache = LRUCache(cache_size, ttl=cache_ttl)
+        self.rollups = UserRollupStore()
+        self.trending = trending or TrendingEngine()
+        self.reach = reach or ReachTracker()
+        self.engagement_model = engagement_model or EngagementModel()
     
     def get_user_analytics(self, user_id):
         """
@@ -17,49 +29,33 @@ class AnalyticsEngine:
         Returns engagement metrics, growth trends, audience insights
         """
         try:
-            # Mock analytics - will be replaced with actual data from database
-            analytics = {
-                'engagement': {
-                    'total_posts': 45,
-                    'total_likes': 1250,
-                    'total_comments': 340,
-                    'total_shares': 89,
-                    'avg_engagement_rate': 0.078,
-                    'engagement_trend': 'up'  # up, down, stable
-                },
-                'growth': {
-                    'followers': 523,
-                    'following': 287,
-                    'follower_growth_7d': 34,
-                    'follower_growth_30d': 127,
-                    'growth_rate': 0.32
-                },
-                'content_performance': {
-                    'best_performing_post': {
-                        'post_id': 123,
-                        'engagement_score': 0.95
-                    },
-                    'avg_likes_per_post': 27.8,
-                    'avg_comments_per_post': 7.6,
-                    'best_posting_time': '18:00-20:00',
-                    'best_posting_day': 'Wednesday'
-                },
-                'audience_insights': {
-                    'top_interests': ['technology', 'sports', 'music'],
-                    'engagement_by_type': {
-                        'posts': 65,
-                        'comments': 25,
-                        'shares': 10
-                    },
-                    'active_hours': ['17:00', '18:00', '19:00', '20:00']
-                }
-            }
+            analytics = self.analytics_cache.get(user_id)
+            if analytics is None:
+                analytics = self.rollups.snapshot(user_id)
+                self.analytics_cache.set(user_id, analytics)
             
             return analytics
         except Exception as e:
             logger.error(f"Error getting user analytics: {str(e)}")
             raise
     
+    def ingest_user_events(self, events):
+        """
+        Fold post, engagement and follow events into the per-user rollups
+        
+        Args:
+            events: dicts with 'type', 'user_id', 'timestamp' and, depending on
+                the type, 'post_id', 'author_id', 'target_user_id', 'hashtags'
+        """
+        try:
+            changed = self.rollups.apply_events(events)
+            for user_id in changed:
+                self.analytics_cache.delete(user_id)
+            return changed
+        except Exception as e:
+            logger.error(f"Error ingesting user events: {str(e)}")
+            raise
+    
     def get_trending_topics(self, timeframe='24h', limit=10):
         """
         Get trending topics and hashtags
@@ -69,59 +65,32 @@ class AnalyticsEngine:
             limit: number of trending topics to return
         """
         try:
-            # Mock trending topics - will be replaced with actual data
-            trending = [
-                {
-                    'topic': '#Innovation',
-                    'mentions': 1234,
-                    'growth': 45.2,
-                    'sentiment': 'positive'
-                },
-                {
-                    'topic': '#Technology',
-                    'mentions': 987,
-                    'growth': 32.1,
-                    'sentiment': 'positive'
-                },
-                {
-                    'topic': '#Sports',
-                    'mentions': 856,
-                    'growth': 28.5,
-                    'sentiment': 'neutral'
-                },
-                {
-                    'topic': '#Music',
-                    'mentions': 745,
-                    'growth': 22.3,
-                    'sentiment': 'positive'
-                },
-                {
-                    'topic': '#Art',
-                    'mentions': 678,
-                    'growth': 18.7,
-                    'sentiment': 'positive'
-                }
-            ]
-            
-            return trending[:limit]
+            return self.trending.get_trending(timeframe, limit)
         except Exception as e:
             logger.error(f"Error getting trending topics: {str(e)}")
             raise
     
-    def get_post_analytics(self, post_id):
-        """Get detailed analytics for a specific post"""
+    def get_post_analytics(self, post_id, days=None):
+        """
+        Get detailed analytics for a specific post
+        
+        Args:
+            post_id: post id
+            days: restrict views and reach to the last N days (default: all time)
+        """
         try:
+            views = self.reach.views('post', post_id)
             analytics = {
                 'post_id': post_id,
-                'views': 1234,
-                'unique_views': 987,
+                'views': views,
+                'unique_views': self.reach.unique_viewers('post', post_id, days),
                 'likes': 156,
                 'comments': 43,
                 'shares': 23,
                 'saves': 67,
                 'engagement_rate': 0.089,
-                'reach': 2340,
-                'impressions': 3456,
+                'reach': self.reach.reach('post', post_id, days),
+                'impressions': views,
                 'click_through_rate': 0.034,
                 'audience_demographics': {
                     'age_groups': {
@@ -148,51 +117,123 @@ class AnalyticsEngine:
         Predict expected engagement for a post
         
         Args:
-            post_data: dict with content, hashtags, posting_time, etc.
+            post_data: dict with content, hashtags, posting_hour, posting_day, sentiment
         """
         try:
-            # Simple prediction model (can be improved with ML)
-            base_score = 0.5
+            return self.predict_engagement_batch([post_data])[0]
+        except Exception as e:
+            logger.error(f"Error predicting engagement: {str(e)}")
+            raise
+    
+    def predict_engagement_batch(self, posts):
+        """
+        Predict engagement for many draft posts in one vectorized pass
+        
+        Each post may carry 'candidate_slots' ([{'day': ..., 'hour': ...}]),
+        e.g. a scheduler's free slots, and gets the best of them as
+        'best_slot'; otherwise every hour of the week is considered.
+        """
+        try:
+            n_posts = len(posts)
+            if n_posts == 0:
+                return []
             
-            # Factor in hashtags
-            hashtag_count = len(post_data.get('hashtags', []))
-            if 1 <= hashtag_count <= 5:
-                base_score += 0.1
+            hours = np.array([int(post.get('posting_hour', 12)) for post in posts])
+            weekdays = weekday_indexes([post.get('posting_day', 'Monday') for post in posts])
+            hashtag_counts = np.array([len(post.get('hashtags', [])) for post in posts])
+            lengths = np.array([len(post.get('content', '')) for post in posts])
+            sentiments = np.array([float(post.get('sentiment') or 0.0) for post in posts])
             
-            # Factor in content length
-            content_length = len(post_data.get('content', ''))
-            if 100 <= content_length <= 300:
-                base_score += 0.1
+            model = self.engagement_model
+            scores = model.score(engagement_features(hours, weekdays, hashtag_counts, lengths, sentiments))
             
-            # Factor in posting time
-            posting_hour = post_data.get('posting_hour', 12)
-            if 17 <= posting_hour <= 21:  # Peak hours
-                base_score += 0.15
+            # The model is additive in time and content features, so the best
+            # hour of the week is the same for every post: score the 168 slots
+            # once and shift each post's score by the time-term difference
+            week_hours = np.tile(np.arange(24), 7)
+            week_days = np.repeat(np.arange(7), 24)
+            week_scores = model.score(engagement_features(week_hours, week_days, 0, 0, 0))
+            best_week_slot = int(np.argmax(week_scores))
+            own_slot_scores = week_scores[weekdays * 24 + hours % 24]
             
-            # Factor in day of week
-            posting_day = post_data.get('posting_day', 'Monday')
-            if posting_day in ['Wednesday', 'Thursday', 'Friday']:
-                base_score += 0.1
+            best_days = np.full(n_posts, week_days[best_week_slot])
+            best_hours = np.full(n_posts, week_hours[best_week_slot])
+            best_scores = scores - own_slot_scores + week_scores[best_week_slot]
             
-            prediction = {
-                'expected_engagement_rate': round(min(base_score, 1.0), 2),
-                'expected_likes': int(base_score * 200),
-                'expected_comments': int(base_score * 50),
-                'expected_shares': int(base_score * 20),
-                'confidence': 0.75,
-                'best_time_to_post': '18:00-20:00',
-                'suggestions': []
-            }
+            # Scheduler candidate slots of all posts, flattened into one matrix
+            with_slots = [i for i, post in enumerate(posts) if post.get('candidate_slots')]
+            if with_slots:
+                slot_counts = np.array([len(posts[i]['candidate_slots']) for i in with_slots])
+                slots = [slot for i in with_slots for slot in posts[i]['candidate_slots']]
+                owners = np.repeat(np.array(with_slots), slot_counts)
+                slot_hours = np.array([int(slot['hour']) for slot in slots])
+                slot_days = weekday_indexes([slot['day'] for slot in slots])
+                slot_scores = model.score(engagement_features(
+                    slot_hours, slot_days, hashtag_counts[owners], lengths[owners], sentiments[owners]
+                ))
+                
+                # Highest-scoring slot per post: sort by (post, -score), take each post's first row
+                order = np.lexsort((-slot_scores, owners))
+                best = order[np.cumsum(slot_counts) - slot_counts]
+                best_days[with_slots] = slot_days[best]
+                best_hours[with_slots] = slot_hours[best]
+                best_scores[with_slots] = slot_scores[best]
             
-            # Add suggestions
-            if hashtag_count == 0:
-                prediction['suggestions'].append('Add relevant hashtags to increase discoverability')
-            if content_length < 50:
-                prediction['suggestions'].append('Consider adding more details to your post')
-            if posting_hour < 17 or posting_hour > 21:
-                prediction['suggestions'].append('Post during peak hours (6-9 PM) for better engagement')
+            scores = np.maximum(scores, 0.0)
+            best_scores = np.clip(best_scores, 0.0, 1.0)
             
-            return prediction
+            predictions = []
+            for i in range(n_posts):
+                score = float(scores[i])
+                best_hour = int(best_hours[i])
+                
+                prediction = {
+                    'expected_engagement_rate': round(min(score, 1.0), 2),
+                    'expected_likes': int(score * 200),
+                    'expected_comments': int(score * 50),
+                    'expected_shares': int(score * 20),
+                    'confidence': model.confidence,
+                    'best_time_to_post': f'{best_hour:02d}:00-{(best_hour + 1) % 24:02d}:00',
+                    'best_slot': {
+                        'day': WEEKDAYS[int(best_days[i])],
+                        'hour': best_hour,
+                        'expected_engagement_rate': round(float(best_scores[i]), 2)
+                    },
+                    'suggestions': []
+                }
+                
+                # Add suggestions
+                if hashtag_counts[i] == 0:
+                    prediction['suggestions'].append('Add relevant hashtags to increase discoverability')
+                if lengths[i] < 50:
+                    prediction['suggestions'].append('Consider adding more details to your post')
+                if hours[i] < 17 or hours[i] > 21:
+                    prediction['suggestions'].append('Post during peak hours (6-9 PM) for better engagement')
+                
+                predictions.append(prediction)
+            
+            return predictions
         except Exception as e:
-            logger.error(f"Error predicting engagement: {str(e)}")
+            logger.error(f"Error predicting engagement batch: {str(e)}")
+            raise
+    
+    def train_engagement_model(self, posts, l2=1.0):
+        """
+        Refit the engagement model on published posts
+        
+        Args:
+            posts: dicts with the prediction fields plus the observed 'engagement_rate'
+            l2: ridge penalty
+        """
+        try:
+            features = engagement_features(
+                [int(post.get('posting_hour', 12)) for post in posts],
+                weekday_indexes([post.get('posting_day', 'Monday') for post in posts]),
+                [len(post.get('hashtags', [])) for post in posts],
+                [len(post.get('content', '')) for post in posts],
+                [float(post.get('sentiment') or 0.0) for post in posts]
+            )
+            return self.engagement_model.fit(features, [float(post['engagement_rate']) for post in posts], l2)
+        except Exception as e:
+            logger.error(f"Error training engagement model: {str(e)}")
             raise
@@ -0,0 +1,125 @@
+import numpy as np
+from scipy import sparse
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class IVFIndex:
+    """
+    In-process inverted-file (IVF) approximate nearest neighbour index
+    
+    Vectors are L2-normalised and compared by inner product (cosine). A
+    spherical k-means coarse quantizer splits them into `n_lists` cells;
+    vectors are stored contiguously grouped by cell, so a query scores the
+    centroids, then only the `n_probe` closest cells instead of the whole
+    collection.
+    """
+    
+    def __init__(self, n_lists=None, n_probe=8, n_iter=10, seed=0):
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.n_iter = n_iter
+        self.seed = seed
+        
+        self.centroids = None
+        self.list_offsets = None
+        self.ids = None
+        self.vectors = None
+    
+    def __len__(self):
+        return 0 if self.ids is None else len(self.ids)
+    
+    def build(self, vectors, chunk_size=65536):
+        """Cluster the vectors and lay them out as contiguous inverted lists"""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        n = len(vectors)
+        if n == 0:
+            raise ValueError('Cannot build an index from zero vectors')
+        
+        n_lists = min(self.n_lists or max(1, int(np.sqrt(n))), n)
+        rng = np.random.default_rng(self.seed)
+        
+        # Train the coarse quantizer on a sample, which is plenty for the centroids
+        sample_size = min(n, 256 * n_lists)
+        sample = vectors[np.sort(rng.choice(n, sample_size, replace=False))]
+        self.centroids = self._train_centroids(sample, n_lists, rng)
+        
+        assignments = self._assign(vectors, self.centroids, chunk_size)
+        order = np.argsort(assignments, kind='stable')
+        
+        self.list_offsets = np.zeros(n_lists + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assignments, minlength=n_lists), out=self.list_offsets[1:])
+        self.ids = order.astype(np.int64)
+        self.vectors = vectors[order]
+        
+        return self
+    
+    def search(self, query, k=10, n_probe=None):
+        """
+        Approximate top-k by inner product
+        
+        Returns (row ids in the original build order, scores), best first.
+        """
+        query = np.asarray(query, dtype=np.float32)
+        n_probe = min(n_probe or self.n_probe, len(self.centroids))
+        
+        probe = np.argpartition(-(self.centroids @ query), n_probe - 1)[:n_probe]
+        starts = self.list_offsets[probe]
+        ends = self.list_offsets[probe + 1]
+        
+        positions = np.concatenate([np.arange(s, e) for s, e in zip(starts, ends)])
+        if len(positions) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        
+        scores = self.vectors[positions] @ query
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        
+        return self.ids[positions[top]], scores[top]
+    
+    def search_exact(self, query, k=10):
+        """Brute-force top-k over every vector, for recall measurements"""
+        query = np.asarray(query, dtype=np.float32)
+        scores = self.vectors @ query
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return self.ids[top], scores[top]
+    
+    @staticmethod
+    def _assign(vectors, centroids, chunk_size=65536):
+        """Nearest centroid for each vector, computed in chunks to bound memory"""
+        assignments = np.empty(len(vectors), dtype=np.int64)
+        chunk_size = max(1, min(chunk_size, (1 << 24) // max(len(centroids), 1)))
+        for start in range(0, len(vectors), chunk_size):
+            chunk = vectors[start:start + chunk_size]
+            assignments[start:start + chunk_size] = np.argmax(chunk @ centroids.T, axis=1)
+        return assignments
+    
+    def _train_centroids(self, sample, n_lists, rng):
+        """Spherical k-means over a sample of unit vectors"""
+        centroids = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+        
+        n = len(sample)
+        
+        for _ in range(self.n_iter):
+            assignments = self._assign(sample, centroids)
+            
+            # Per-cell sums as a sparse one-hot product instead of a Python loop
+            membership = sparse.csr_matrix(
+                (np.ones(n, dtype=np.float32), (assignments, np.arange(n))),
+                shape=(n_lists, n)
+            )
+            sums = np.asarray(membership @ sample, dtype=np.float32)
+            
+            # Re-seed empty cells from random sample points
+            empty = ~sums.any(axis=1)
+            if empty.any():
+                sums[empty] = sample[rng.choice(n, int(empty.sum()))]
+            
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            centroids = sums / np.maximum(norms, 1e-12)
+        
+        return centroids
@@ -0,0 +1,160 @@
+from collections import OrderedDict
+import hashlib
+import json
+import threading
+import time
+import logging
+
+# Redis is optional; without it each worker keeps its own in-process cache
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+def content_key(text):
+    """Short, stable cache key for a piece of content"""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class LRUCache:
+    """
+    Thread-safe bounded LRU cache with hit/miss counters
+    
+    With a ttl (seconds), entries older than that are treated as misses and
+    dropped when next read.
+    """
+    
+    def __init__(self, max_size=10000, ttl=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def get(self, key):
+        """Cached value or None; a hit marks the entry most recently used"""
+        with self._lock:
+            try:
+                value, expires_at = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def set(self, key, value, ttl=None):
+        """Store a value; ttl (seconds) overrides the cache's own for this entry"""
+        ttl = ttl or self.ttl
+        with self._lock:
+            expires_at = time.monotonic() + ttl if ttl else None
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+class ResultCache:
+    """
+    Two-tier result cache: an in-process LRU in front of an optional Redis
+    
+    Values must be JSON-serializable so they can be shared through Redis
+    between gunicorn workers. Both tiers expire entries after `ttl` seconds;
+    a value read from Redis is kept locally only for the rest of its Redis
+    lifetime. Redis failures and undecodable values are logged and treated
+    as misses, so the cache never breaks a request.
+    """
+    
+    def __init__(self, namespace, max_size=10000, redis_url=None, ttl=3600):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.local = LRUCache(max_size, ttl=ttl)
+        self.redis_hits = 0
+        self.redis_errors = 0
+        self.redis = None
+        
+        if redis_url:
+            if REDIS_AVAILABLE:
+                self.redis = redis.Redis.from_url(redis_url, socket_timeout=0.05)
+            else:
+                logger.warning("REDIS_URL is set but the redis package is not installed")
+    
+    def get(self, key):
+        value = self.local.get(key)
+        if value is not None or self.redis is None:
+            return value
+        
+        try:
+            pipeline = self.redis.pipeline()
+            pipeline.get(f"{self.namespace}:{key}")
+            pipeline.pttl(f"{self.namespace}:{key}")
+            raw, remaining_ms = pipeline.execute()
+            if raw is None:
+                return None
+            value = json.loads(raw)
+        except Exception as e:
+            self.redis_errors += 1
+            logger.warning(f"Redis cache read failed: {str(e)}")
+            return None
+        
+        self.redis_hits += 1
+        # PTTL is negative for keys without an expiry
+        self.local.set(key, value, ttl=remaining_ms / 1000 if remaining_ms > 0 else None)
+        return value
+    
+    def set(self, key, value):
+        self.local.set(key, value)
+        if self.redis is None:
+            return
+        
+        try:
+            self.redis.set(f"{self.namespace}:{key}", json.dumps(value), ex=self.ttl)
+        except Exception as e:
+            self.redis_errors += 1
+            logger.warning(f"Redis cache write failed: {str(e)}")
+    
+    def stats(self):
+        stats = self.local.stats()
+        stats.update({
+            'namespace': self.namespace,
+            'redis_enabled': self.redis is not None,
+            'redis_hits': self.redis_hits,
+            'redis_errors': self.redis_errors
+        })
+        return stats
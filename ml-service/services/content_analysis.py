@@ -1,22 +1,77 @@
+import os
 import re
+import time
+import fcntl
 from collections import Counter
 import logging
 
+from .cache import ResultCache, content_key
+from .sentiment import SentimentLexicon
+from .text_features import DocumentFrequencyTable, hash_tokens
+
 logger = logging.getLogger(__name__)
 
+# Single-pass word scanner: URLs and mentions are consumed whole (yielding an
+# empty group) so their pieces never become words, and the # of a hashtag is
+# dropped so the tag body still counts as a word. Apostrophes inside a word
+# are kept by the scan and then deleted, so "don't" becomes 'dont' (matching
+# the negation list) rather than 'don' + 't'.
+TOKEN_PATTERN = re.compile(r"https?://\S+|www\.\S+|@\w+|#?(\w+(?:['\u2019]\w+)*)")
+APOSTROPHES = str.maketrans('', '', "'\u2019")
+HASHTAG_PATTERN = re.compile(r'#(\w+)')
+MENTION_PATTERN = re.compile(r'@(\w+)')
+URL_PATTERN = re.compile(r'https?://\S+|www\.\S+')
+
+# Bullets, numbered items, checkboxes and TODO:/Task: prefixes in one pattern
+TASK_MARKER_PATTERN = re.compile(
+    r'^(?:\s*(?:[-•*]|\d+[.)]|\[[ x]\])|TODO:|Task:)\s*(.+)$',
+    re.IGNORECASE
+)
+PRIORITY_HIGH_PATTERN = re.compile(r'urgent|asap|important|critical|priority')
+PRIORITY_LOW_PATTERN = re.compile(r'optional|maybe|someday|low priority')
+
+# Frequent 4+ letter words that are never useful as topics
+TOPIC_STOP_WORDS = frozenset({
+    'that', 'this', 'with', 'from', 'have', 'been', 'were', 'will', 'what', 'when',
+    'where', 'which', 'while', 'your', 'yours', 'they', 'them', 'their', 'there',
+    'these', 'those', 'then', 'than', 'into', 'onto', 'over', 'just', 'about',
+    'also', 'some', 'more', 'most', 'very', 'much', 'many', 'only', 'even', 'such',
+    'like', 'make', 'made', 'does', 'doing', 'done', 'being', 'would', 'could',
+    'should', 'shall', 'here', 'each', 'every', 'other', 'because', 'after',
+    'before', 'again', 'still', 'really', 'today', 'know', 'think', 'want', 'need',
+    'going', 'come', 'came', 'take', 'took', 'time', 'thing', 'things', 'http', 'https',
+    # Contractions, which tokenize without their apostrophe
+    'dont', 'doesnt', 'didnt', 'isnt', 'wasnt', 'arent', 'werent', 'cant', 'couldnt',
+    'wont', 'wouldnt', 'shouldnt', 'hasnt', 'havent', 'hadnt', 'thats', 'theres',
+    'whats', 'youre', 'theyre', 'youve', 'theyve', 'youll', 'theyll'
+})
+
+
+def _topic_words(words):
+    """Word tokens that may become topics"""
+    return [w for w in words if len(w) >= 4 and w not in TOPIC_STOP_WORDS and not w.isdigit()]
+
+
 class ContentAnalyzer:
     """Analyze post content for sentiment, topics, and quality"""
     
-    def __init__(self):
-        # Simple sentiment words (can be expanded with ML models)
-        self.positive_words = {
-            'good', 'great', 'awesome', 'excellent', 'amazing', 'love', 'best',
-            'wonderful', 'fantastic', 'happy', 'excited', 'beautiful', 'perfect'
-        }
-        self.negative_words = {
-            'bad', 'terrible', 'awful', 'worst', 'hate', 'horrible', 'poor',
-            'disappointing', 'sad', 'angry', 'ugly', 'boring'
-        }
+    def __init__(self, cache=None, document_frequency_path=None, sync_interval=30.0):
+        # Results keyed by a hash of the content, shared by analyze and suggest_hashtags
+        self.cache = cache or ResultCache('content-analysis')
+        
+        # Corpus statistics for topic ranking, counted from published posts only
+        self.document_frequency = DocumentFrequencyTable()
+        # Posts counted since the last sync with the shared table on disk, by post id
+        self.unsynced_documents = {}
+        self.document_frequency_path = document_frequency_path
+        self.sync_interval = sync_interval
+        self._df_mtime = None
+        self._last_sync = 0.0
+        if document_frequency_path:
+            self.sync_document_frequency(force=True)
+        
+        # Weighted sentiment lexicon with negation handling
+        self.sentiment_lexicon = SentimentLexicon()
     
     def analyze(self, content):
         """
@@ -26,76 +81,251 @@ class ContentAnalyzer:
             dict with sentiment, topics, hashtags, mentions, quality_score
         """
         try:
-            analysis = {
-                'sentiment': self._analyze_sentiment(content),
-                'topics': self._extract_topics(content),
-                'hashtags': self._extract_hashtags(content),
-                'mentions': self._extract_mentions(content),
-                'quality_score': self._calculate_quality_score(content),
-                'word_count': len(content.split()),
-                'char_count': len(content),
-                'readability': self._calculate_readability(content)
-            }
-            
+            key = 'analysis:' + content_key(content)
+            analysis = self.cache.get(key)
+            if analysis is None:
+                self.sync_document_frequency()
+                analysis = self._analyze_document(self._tokenize_document(content))
+                self.cache.set(key, analysis)
             return analysis
         except Exception as e:
             logger.error(f"Error analyzing content: {str(e)}")
             raise
     
-    def _analyze_sentiment(self, content):
+    def analyze_batch(self, contents, post_ids=None):
         """
-        Simple sentiment analysis
-        Returns: positive, negative, or neutral
+        Analyze many posts, e.g. when backfilling existing content
+        
+        Published posts are also counted into the topic document frequencies,
+        before any of them is analyzed. Pass their ids in post_ids (one per
+        content, None for drafts and previews, which must not be counted);
+        each post id counts once, so retries and re-published posts do not
+        inflate the statistics.
+        
+        Returns a list of analysis dicts in input order.
+        """
+        try:
+            analyses = [None] * len(contents)
+            keys = ['analysis:' + content_key(content) for content in contents]
+            
+            missing = []
+            for i, key in enumerate(keys):
+                analyses[i] = self.cache.get(key)
+                if analyses[i] is None:
+                    missing.append(i)
+            
+            published = [i for i, post_id in enumerate(post_ids or []) if post_id is not None]
+            if published:
+                # Every published post counts, cached or not; only uncached ones are analyzed below
+                all_documents = [self._tokenize_document(content) for content in contents]
+                self.add_documents(
+                    [all_documents[i]['words'] for i in published],
+                    [post_ids[i] for i in published]
+                )
+                documents = [all_documents[i] for i in missing]
+            else:
+                self.sync_document_frequency()
+                documents = [self._tokenize_document(contents[i]) for i in missing]
+            
+            # Sentiment for every uncached post is scored in one vectorized pass
+            sentiments = self.sentiment_lexicon.score_batch([document['words'] for document in documents])
+            
+            for i, document, sentiment in zip(missing, documents, sentiments):
+                analyses[i] = self._analyze_document(document, sentiment)
+                self.cache.set(keys[i], analyses[i])
+            
+            return analyses
+        except Exception as e:
+            logger.error(f"Error analyzing content batch: {str(e)}")
+            raise
+    
+    def suggest_hashtags(self, content, limit=8):
         """
-        content_lower = content.lower()
-        words = re.findall(r'\b\w+\b', content_lower)
+        Suggest hashtags for a post from its topics and existing hashtags
         
-        positive_count = sum(1 for word in words if word in self.positive_words)
-        negative_count = sum(1 for word in words if word in self.negative_words)
+        Returns dict with hashtags, sentiment and quality_score.
+        """
+        try:
+            key = f"hashtags:{limit}:" + content_key(content)
+            suggestion = self.cache.get(key)
+            if suggestion is not None:
+                return suggestion
+            
+            analysis = self.analyze(content)
+            
+            # Topics first, then hashtags already in the post; de-duplicated in order
+            suggested = [f"#{topic}" for topic in analysis['topics'][:5]]
+            suggested.extend(analysis['hashtags'][:3])
+            suggested = list(dict.fromkeys(suggested))
+            
+            suggestion = {
+                'hashtags': suggested[:limit],
+                'sentiment': analysis['sentiment'],
+                'quality_score': analysis['quality_score']
+            }
+            self.cache.set(key, suggestion)
+            return suggestion
+        except Exception as e:
+            logger.error(f"Error suggesting hashtags: {str(e)}")
+            raise
+    
+    def tokenize(self, content):
+        """Lowercased word tokens, as used by the feature extractors"""
+        return self._tokenize_document(content)['words']
+    
+    def add_documents(self, word_lists, post_ids):
+        """
+        Count published posts (as word tokens) into the topic document
+        frequencies, once per post id
+        """
+        if len(word_lists) != len(post_ids):
+            raise ValueError('post_ids must have one id per post')
+        hashes = [hash_tokens(_topic_words(words)) for words in word_lists]
+        self.document_frequency.update_batch(hashes, post_ids)
+        if self.document_frequency_path:
+            self.unsynced_documents.update(zip(post_ids, hashes))
+            self.sync_document_frequency()
+    
+    def sync_document_frequency(self, force=False):
+        """
+        Share topic document frequencies with other workers through
+        document_frequency_path
         
-        if positive_count > negative_count:
-            sentiment = 'positive'
-            score = min(positive_count / max(len(words), 1) * 10, 1.0)
-        elif negative_count > positive_count:
-            sentiment = 'negative'
-            score = min(negative_count / max(len(words), 1) * 10, 1.0)
-        else:
-            sentiment = 'neutral'
-            score = 0.5
+        At most every `sync_interval` seconds (or with force=True): under an
+        exclusive file lock, posts counted here since the last sync are added
+        to the saved table (skipping post ids another worker already counted),
+        which is written back and adopted; with nothing to add, a table saved
+        by another worker is just reloaded. Posts counted since the last sync
+        are lost if the process dies first.
+        """
+        if not self.document_frequency_path:
+            return False
+        
+        now = time.monotonic()
+        if not force and now - self._last_sync < self.sync_interval:
+            return False
+        self._last_sync = now
+        
+        try:
+            path = self.document_frequency_path
+            pending = bool(self.unsynced_documents)
+            if not pending:
+                try:
+                    mtime = os.stat(path).st_mtime_ns
+                except OSError:
+                    return False
+                if mtime == self._df_mtime:
+                    return False
+            
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(f"{path}.lock", 'w') as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                shared = DocumentFrequencyTable(self.document_frequency.n_features)
+                if os.path.exists(path):
+                    shared.load(path)
+                if pending:
+                    shared.update_batch(list(self.unsynced_documents.values()), list(self.unsynced_documents))
+                    shared.save(path)
+                self._df_mtime = os.stat(path).st_mtime_ns
+            
+            self.document_frequency = shared
+            self.unsynced_documents = {}
+            return True
+        except Exception as e:
+            logger.error(f"Error syncing document frequencies: {str(e)}")
+            raise
+    
+    def _tokenize_document(self, content):
+        """
+        Tokenize a post once; every feature extractor reads from the result
         
+        One TOKEN_PATTERN scan yields the word tokens. Hashtag bodies count
+        as words (#love is still positive); mentions and URLs do not. The
+        hashtag, mention and URL scans only run when their marker character
+        is present, which a plain substring check rules out for most posts.
+        
+        Returns dict with the raw content, lowercased word tokens, hashtags,
+        mentions, urls and whitespace-separated chunks.
+        """
         return {
-            'label': sentiment,
-            'score': round(score, 2),
-            'positive_words': positive_count,
-            'negative_words': negative_count
+            'content': content,
+            # Join, lowercase and split once instead of per token; drops the empty groups
+            'words': ' '.join(TOKEN_PATTERN.findall(content)).lower().translate(APOSTROPHES).split(),
+            'hashtags': HASHTAG_PATTERN.findall(content) if '#' in content else [],
+            'mentions': MENTION_PATTERN.findall(content) if '@' in content else [],
+            'urls': URL_PATTERN.findall(content) if '://' in content or 'www.' in content else [],
+            'chunks': content.split()
         }
     
-    def _extract_topics(self, content):
-        """Extract main topics from content"""
-        # Simple keyword extraction (can be improved with NLP)
-        words = re.findall(r'\b\w{4,}\b', content.lower())
+    def analyze_sentiment_batch(self, contents):
+        """Sentiment only, for large backfills and trending rollups"""
+        try:
+            return self.sentiment_lexicon.score_batch([self.tokenize(content) for content in contents])
+        except Exception as e:
+            logger.error(f"Error analyzing sentiment batch: {str(e)}")
+            raise
+    
+    def _analyze_document(self, document, sentiment=None):
+        """Run every feature extractor over one tokenized document"""
+        content = document['content']
+        if sentiment is None:
+            sentiment = self._analyze_sentiment(document['words'])
         
-        # Remove common words
-        stop_words = {'that', 'this', 'with', 'from', 'have', 'been', 'were', 'will'}
-        words = [w for w in words if w not in stop_words]
+        return {
+            'sentiment': sentiment,
+            'topics': self._extract_topics(document['words']),
+            'hashtags': document['hashtags'],
+            'mentions': document['mentions'],
+            'quality_score': self._calculate_quality_score(content, sentiment),
+            'word_count': len(document['chunks']),
+            'char_count': len(content),
+            'readability': self._calculate_readability(document['chunks'])
+        }
+    
+    def _analyze_sentiment(self, words):
+        """
+        Lexicon sentiment analysis over word tokens
+        Returns: positive, negative, or neutral with score and word counts
+        """
+        return self.sentiment_lexicon.score_batch([words])[0]
+    
+    def _extract_topics(self, words, limit=5):
+        """
+        Extract main topics from word tokens, ranked by TF-IDF
         
-        # Get most common words as topics
+        Document frequencies come from the table of published posts (see
+        add_documents), so words common across the corpus rank below words
+        distinctive to this post. Analyzing a post never changes the table;
+        on a cold table ranking falls back to plain term frequency. Cost is
+        O(tokens) per post.
+        """
+        words = _topic_words(words)
+        if not words:
+            return []
+        
+        # Counter keeps first-occurrence order, which breaks score ties
         word_freq = Counter(words)
-        topics = [word for word, count in word_freq.most_common(5)]
+        candidates = list(word_freq)
+        hashes = hash_tokens(candidates)
         
-        return topics
+        idf = self.document_frequency.idf(hashes)
+        
+        scores = [word_freq[word] * weight for word, weight in zip(candidates, idf.tolist())]
+        ranked = sorted(range(len(candidates)), key=lambda i: -scores[i])
+        
+        return [candidates[i] for i in ranked[:limit]]
     
     def _extract_hashtags(self, content):
         """Extract hashtags from content"""
-        hashtags = re.findall(r'#(\w+)', content)
-        return hashtags
+        return HASHTAG_PATTERN.findall(content)
     
     def _extract_mentions(self, content):
         """Extract user mentions from content"""
-        mentions = re.findall(r'@(\w+)', content)
-        return mentions
+        return MENTION_PATTERN.findall(content)
     
-    def _calculate_quality_score(self, content):
+    def _calculate_quality_score(self, content, sentiment):
         """
         Calculate content quality score based on various factors
         Returns: score between 0 and 1
@@ -118,17 +348,15 @@ class ContentAnalyzer:
             score += 0.1
         
         # Sentiment bonus
-        sentiment = self._analyze_sentiment(content)
         if sentiment['label'] == 'positive':
             score += 0.1
         
         return round(min(score, 1.0), 2)
     
-    def _calculate_readability(self, content):
+    def _calculate_readability(self, words):
         """
-        Simple readability score
+        Simple readability score over whitespace-separated words
         """
-        words = content.split()
         if not words:
             return 0
         
@@ -152,19 +380,6 @@ class ContentAnalyzer:
         try:
             tasks = []
             
-            # Common task indicators
-            task_markers = [
-                r'^\s*[-•*]\s*(.+)$',  # Bullet points
-                r'^\s*\d+[.)]\s*(.+)$',  # Numbered lists
-                r'^\s*\[[ x]\]\s*(.+)$',  # Checkboxes
-                r'^TODO:\s*(.+)$',  # TODO prefix
-                r'^Task:\s*(.+)$',  # Task prefix
-            ]
-            
-            # Priority keywords
-            priority_high = ['urgent', 'asap', 'important', 'critical', 'priority']
-            priority_low = ['optional', 'maybe', 'someday', 'low priority']
-            
             lines = text.split('\n')
             
             for line in lines:
@@ -172,13 +387,11 @@ class ContentAnalyzer:
                 if not line:
                     continue
                 
-                # Try to match task markers
+                # Try to match task markers (bullets, numbers, checkboxes, TODO:/Task:)
                 task_text = None
-                for pattern in task_markers:
-                    match = re.match(pattern, line, re.IGNORECASE)
-                    if match:
-                        task_text = match.group(1).strip()
-                        break
+                match = TASK_MARKER_PATTERN.match(line)
+                if match:
+                    task_text = match.group(1).strip()
                 
                 # If no marker found, treat any line as potential task
                 if not task_text and len(line) > 3:
@@ -189,9 +402,9 @@ class ContentAnalyzer:
                     priority = 'medium'
                     line_lower = task_text.lower()
                     
-                    if any(word in line_lower for word in priority_high):
+                    if PRIORITY_HIGH_PATTERN.search(line_lower):
                         priority = 'high'
-                    elif any(word in line_lower for word in priority_low):
+                    elif PRIORITY_LOW_PATTERN.search(line_lower):
                         priority = 'low'
                     
                     tasks.append({
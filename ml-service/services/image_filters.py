@@ -0,0 +1,132 @@
+from PIL import ImageFilter
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+# ITU-R 601 luma weights, as used by Image.convert('L') and ImageEnhance.Color
+LUMA = np.array([0.299, 0.587, 0.114])
+
+SEPIA_MATRIX = np.array([
+    [0.393, 0.769, 0.189],
+    [0.349, 0.686, 0.168],
+    [0.272, 0.534, 0.131]
+])
+
+# Compiled filters: name -> callable taking and returning an RGB image
+FILTERS = {}
+
+
+def register_filter(name):
+    """
+    Register a filter factory under `name`
+    
+    The decorated function is called once, at import, and must return the
+    compiled filter: a callable that takes an RGB image and returns an RGB
+    image. Tables, matrices and kernels are built inside the factory so every
+    request reuses them.
+    
+        @register_filter('fade')
+        def fade():
+            return channel_curves(lambda v: 40 + v * 0.8)
+    """
+    def decorator(factory):
+        FILTERS[name] = factory()
+        return factory
+    return decorator
+
+
+def get_filter(name):
+    compiled = FILTERS.get(name)
+    if compiled is None:
+        raise ValueError(f"Unsupported filter: {name}. Use one of {', '.join(available_filters())}")
+    return compiled
+
+
+def available_filters():
+    return sorted(FILTERS)
+
+
+def saturation_matrix(factor):
+    """3x3 matrix blending each pixel with its luma, like ImageEnhance.Color(factor)"""
+    return factor * np.eye(3) + (1 - factor) * np.outer(np.ones(3), LUMA)
+
+
+def color_matrix(matrix):
+    """
+    Filter multiplying every pixel by a 3x3 color matrix
+    
+    Runs inside Image.convert, one pass over the 8-bit pixels with results
+    clipped to 0-255, so no float copy of the image is ever made.
+    """
+    matrix = tuple(
+        value
+        for row in np.asarray(matrix, dtype=np.float64).tolist()
+        for value in row + [0.0]
+    )
+    return lambda img: img.convert('RGB', matrix)
+
+
+def channel_curves(red, green=None, blue=None):
+    """
+    Filter remapping each channel through a curve
+    
+    Each curve maps a 0-255 value to a new value; green and blue default to
+    the red curve. The curves are evaluated once into a 768-entry table that
+    Image.point applies to the 8-bit pixels.
+    """
+    table = []
+    for curve in (red, green or red, blue or red):
+        table.extend(min(max(int(round(curve(value))), 0), 255) for value in range(256))
+    return lambda img: img.point(table)
+
+
+def kernel(image_filter):
+    """Filter applying a Pillow ImageFilter (convolution, blur, ...)"""
+    return lambda img: img.filter(image_filter)
+
+
+@register_filter('none')
+def no_filter():
+    return lambda img: img
+
+
+@register_filter('grayscale')
+def grayscale():
+    return lambda img: img.convert('L').convert('RGB')
+
+
+@register_filter('sepia')
+def sepia():
+    return color_matrix(SEPIA_MATRIX)
+
+
+@register_filter('vintage')
+def vintage():
+    # Desaturate to 70%, then warm up: red x1.1, blue x0.9
+    return color_matrix(np.diag([1.1, 1.0, 0.9]) @ saturation_matrix(0.7))
+
+
+@register_filter('warm')
+def warm():
+    return channel_curves(lambda v: v * 1.08 + 4, lambda v: v, lambda v: v * 0.9)
+
+
+@register_filter('cool')
+def cool():
+    return channel_curves(lambda v: v * 0.92, lambda v: v, lambda v: v * 1.06 + 6)
+
+
+@register_filter('blur')
+def blur():
+    return kernel(ImageFilter.GaussianBlur(radius=2))
+
+
+@register_filter('sharpen')
+def sharpen():
+    return kernel(ImageFilter.SHARPEN)
+
+
+@register_filter('edge_detect')
+def edge_detect():
+    return kernel(ImageFilter.FIND_EDGES)
@@ -4,60 +4,150 @@ import io
 import base64
 import logging
 
+from .image_filters import get_filter
+from .palette import extract_palette, DEFAULT_PALETTE_METHOD
+
 logger = logging.getLogger(__name__)
 
+# Renditions produced by the pipeline when the caller does not list any
+DEFAULT_RENDITIONS = [
+    {'name': 'feed', 'max_size': (1920, 1080), 'quality': 85},
+    {'name': 'thumbnail', 'max_size': (150, 150), 'quality': 85},
+    {'name': 'avatar', 'max_size': (64, 64), 'quality': 85}
+]
+
+# EXIF tag holding the camera orientation
+EXIF_ORIENTATION = 274
+
+# Pixel grid dominant colors are counted on
+COLOR_SAMPLE_SIZE = (100, 100)
+
+# Modes whose alpha (or palette transparency) is composited onto white for JPEG
+TRANSPARENT_MODES = ('RGBA', 'RGBa', 'LA', 'La', 'PA', 'P')
+
 class ImageProcessor:
     """Advanced image processing using Python"""
     
     def __init__(self):
         self.supported_formats = ['JPEG', 'PNG', 'WEBP']
+    
+    def _open_image(self, image_data):
+        """
+        Open an image from base64 text, raw bytes or a binary file object
+        
+        File objects (e.g. multipart uploads spooled by Werkzeug) are handed to
+        Pillow directly, without copying them into memory first.
+        
+        Returns: (PIL image, size of the encoded input in bytes)
+        """
+        if isinstance(image_data, str):
+            # Base64 encoded
+            image_data = base64.b64decode(image_data)
+        
+        if isinstance(image_data, (bytes, bytearray, memoryview)):
+            return Image.open(io.BytesIO(image_data)), len(image_data)
+        
+        start = image_data.tell()
+        image_data.seek(0, io.SEEK_END)
+        original_bytes = image_data.tell() - start
+        image_data.seek(start)
+        return Image.open(image_data), original_bytes
+    
+    def _draft(self, img, size):
+        """
+        Let the JPEG decoder downscale by 1/2, 1/4 or 1/8 while decoding
+        
+        Picks the largest DCT scaling that still leaves the image at least
+        `size` on both sides, so a 48MP upload headed for a 150px thumbnail is
+        decoded at 1/8 resolution instead of in full. Must be called before the
+        pixels are loaded; other formats are left untouched.
+        """
+        if img.format == 'JPEG':
+            img.draft(None, (max(int(size[0]), 1), max(int(size[1]), 1)))
+        return img
+    
+    def _flatten_to_rgb(self, img):
+        """
+        Image in a mode JPEG can store and browsers display: RGB, or L for grayscale
+        
+        Transparency (RGBA, LA, PA, P with a transparent color, ...) is
+        composited onto white. 16-bit, 32-bit integer and float grayscale is
+        scaled down to 8 bits rather than clipped. Every other mode (1, CMYK,
+        YCbCr, LAB, HSV, RGBX, ...) is converted to RGB or L.
+        """
+        if img.mode in ('RGB', 'L'):
+            return img
+        if img.mode in ('I', 'F') or img.mode.startswith('I;16'):
+            return self._to_8bit_gray(img)
+        if img.mode == '1':
+            return img.convert('L')
+        if img.mode in TRANSPARENT_MODES:
+            img = img.convert('RGBA')
+            background = Image.new('RGB', img.size, (255, 255, 255))
+            background.paste(img, mask=img.split()[-1])
+            return background
+        return img.convert('RGB')
+    
+    def _to_8bit_gray(self, img):
+        """
+        8-bit L image from 16-bit, 32-bit integer or float grayscale
         
-    def optimize_image(self, image_data, max_size=(1920, 1080), quality=85):
+        16-bit modes map 0-65535 onto 0-255. I and F images already within
+        0-255 are kept as they are; floats within 0-1 are stretched to 0-255;
+        wider ranges are treated as 16-bit, or as 0-max beyond that.
+        """
+        pixels = np.asarray(img, dtype=np.float64)
+        high = float(pixels.max()) if pixels.size else 0.0
+        if img.mode.startswith('I;16'):
+            scale = 65535.0
+        elif img.mode == 'F' and 0.0 <= float(pixels.min()) and high <= 1.0:
+            scale = 1.0
+        elif high <= 255:
+            scale = 255.0
+        elif high <= 65535:
+            scale = 65535.0
+        else:
+            scale = high
+        return Image.fromarray(np.clip(np.rint(pixels * (255.0 / scale)), 0, 255).astype(np.uint8))
+    
+    def _encode_output(self, data, as_bytes):
+        """Raw bytes for binary responses, base64 text for JSON"""
+        return data if as_bytes else base64.b64encode(data).decode('utf-8')
+        
+    def optimize_image(self, image_data, max_size=(1920, 1080), quality=85, as_bytes=False):
         """
         Optimize image for web/mobile
         
         Args:
-            image_data: Binary image data or base64 string
+            image_data: Binary image data, base64 string or binary file object
             max_size: Maximum dimensions (width, height)
             quality: JPEG quality (1-100)
+            as_bytes: return the optimized image as raw bytes instead of base64
         """
         try:
-            # Open image
-            if isinstance(image_data, str):
-                # Base64 encoded
-                image_bytes = base64.b64decode(image_data)
-                img = Image.open(io.BytesIO(image_bytes))
-            else:
-                img = Image.open(io.BytesIO(image_data))
+            img, original_bytes = self._open_image(image_data)
             
             # Get original size
             original_size = img.size
             original_format = img.format
             
-            # Resize if needed
+            # Resize if needed; flattened first, as Pillow drops the palette when resizing PA
+            self._draft(img, max_size)
+            img = self._flatten_to_rgb(img)
             img.thumbnail(max_size, Image.Resampling.LANCZOS)
             
-            # Convert RGBA to RGB if saving as JPEG
-            if img.mode in ('RGBA', 'LA', 'P'):
-                background = Image.new('RGB', img.size, (255, 255, 255))
-                if img.mode == 'P':
-                    img = img.convert('RGBA')
-                background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-                img = background
-            
             # Save optimized
             output = io.BytesIO()
             img.save(output, format='JPEG', quality=quality, optimize=True)
             optimized_data = output.getvalue()
             
             # Calculate compression ratio
-            original_bytes = len(image_data) if isinstance(image_data, bytes) else len(base64.b64decode(image_data))
             optimized_bytes = len(optimized_data)
             compression_ratio = (1 - optimized_bytes / original_bytes) * 100
             
             return {
                 'success': True,
-                'optimized_image': base64.b64encode(optimized_data).decode('utf-8'),
+                'optimized_image': self._encode_output(optimized_data, as_bytes),
                 'original_size': original_size,
                 'new_size': img.size,
                 'original_bytes': original_bytes,
@@ -69,65 +159,24 @@ class ImageProcessor:
             logger.error(f"Image optimization error: {str(e)}")
             raise
     
-    def apply_filter(self, image_data, filter_type='none'):
+    def apply_filter(self, image_data, filter_type='none', as_bytes=False):
         """
         Apply filters to image
         
-        Filters: grayscale, sepia, blur, sharpen, edge_detect, vintage
+        Filters: grayscale, sepia, vintage, warm, cool, blur, sharpen, edge_detect
+        (see services/image_filters.py to add more)
         """
         try:
-            # Open image
-            if isinstance(image_data, str):
-                image_bytes = base64.b64decode(image_data)
-                img = Image.open(io.BytesIO(image_bytes))
-            else:
-                img = Image.open(io.BytesIO(image_data))
+            image_filter = get_filter(filter_type)
+            img, _ = self._open_image(image_data)
             
-            # Apply filter
-            if filter_type == 'grayscale':
-                img = img.convert('L').convert('RGB')
-            
-            elif filter_type == 'sepia':
+            # Filters work on RGB; transparency is flattened as for any JPEG output
+            img = self._flatten_to_rgb(img)
+            if img.mode != 'RGB':
                 img = img.convert('RGB')
-                pixels = np.array(img, dtype=np.float32)
-                
-                # Sepia matrix
-                sepia_filter = np.array([
-                    [0.393, 0.769, 0.189],
-                    [0.349, 0.686, 0.168],
-                    [0.272, 0.534, 0.131]
-                ])
-                
-                sepia_img = pixels @ sepia_filter.T
-                sepia_img = np.clip(sepia_img, 0, 255).astype(np.uint8)
-                img = Image.fromarray(sepia_img)
             
-            elif filter_type == 'blur':
-                from PIL import ImageFilter
-                img = img.filter(ImageFilter.GaussianBlur(radius=2))
-            
-            elif filter_type == 'sharpen':
-                from PIL import ImageFilter
-                img = img.filter(ImageFilter.SHARPEN)
-            
-            elif filter_type == 'edge_detect':
-                from PIL import ImageFilter
-                img = img.filter(ImageFilter.FIND_EDGES)
-            
-            elif filter_type == 'vintage':
-                # Vintage effect: desaturate + warm tones
-                from PIL import ImageEnhance
-                img = img.convert('RGB')
-                
-                # Reduce saturation
-                enhancer = ImageEnhance.Color(img)
-                img = enhancer.enhance(0.7)
-                
-                # Add warm tones
-                pixels = np.array(img, dtype=np.float32)
-                pixels[:, :, 0] = np.clip(pixels[:, :, 0] * 1.1, 0, 255)  # More red
-                pixels[:, :, 2] = np.clip(pixels[:, :, 2] * 0.9, 0, 255)  # Less blue
-                img = Image.fromarray(pixels.astype(np.uint8))
+            # Apply filter
+            img = image_filter(img)
             
             # Save filtered image
             output = io.BytesIO()
@@ -136,7 +185,7 @@ class ImageProcessor:
             
             return {
                 'success': True,
-                'filtered_image': base64.b64encode(filtered_data).decode('utf-8'),
+                'filtered_image': self._encode_output(filtered_data, as_bytes),
                 'filter_applied': filter_type,
                 'size': img.size
             }
@@ -161,16 +210,14 @@ class ImageProcessor:
             logger.error(f"Face detection error: {str(e)}")
             raise
     
-    def generate_thumbnail(self, image_data, size=(150, 150)):
+    def generate_thumbnail(self, image_data, size=(150, 150), as_bytes=False):
         """Generate thumbnail from image"""
         try:
-            if isinstance(image_data, str):
-                image_bytes = base64.b64decode(image_data)
-                img = Image.open(io.BytesIO(image_bytes))
-            else:
-                img = Image.open(io.BytesIO(image_data))
+            img, _ = self._open_image(image_data)
             
-            # Create thumbnail
+            # Create thumbnail, flattened for JPEG output first
+            self._draft(img, size)
+            img = self._flatten_to_rgb(img)
             img.thumbnail(size, Image.Resampling.LANCZOS)
             
             # Save
@@ -180,48 +227,123 @@ class ImageProcessor:
             
             return {
                 'success': True,
-                'thumbnail': base64.b64encode(thumbnail_data).decode('utf-8'),
+                'thumbnail': self._encode_output(thumbnail_data, as_bytes),
                 'size': img.size
             }
         except Exception as e:
             logger.error(f"Thumbnail generation error: {str(e)}")
             raise
     
-    def extract_dominant_colors(self, image_data, num_colors=5):
-        """Extract dominant colors from image"""
+    def extract_dominant_colors(self, image_data, num_colors=5, method=DEFAULT_PALETTE_METHOD):
+        """
+        Extract dominant colors from image
+        
+        Methods: median_cut (default), kmeans
+        """
         try:
-            if isinstance(image_data, str):
-                image_bytes = base64.b64decode(image_data)
-                img = Image.open(io.BytesIO(image_bytes))
-            else:
-                img = Image.open(io.BytesIO(image_data))
-            
-            # Resize for faster processing
-            img = img.resize((100, 100))
-            img = img.convert('RGB')
-            
-            # Get pixel data
-            pixels = np.array(img).reshape(-1, 3)
-            
-            # Simple clustering (k-means would be better)
-            from collections import Counter
-            pixel_list = [tuple(pixel) for pixel in pixels]
-            color_counts = Counter(pixel_list)
-            dominant_colors = color_counts.most_common(num_colors)
-            
-            colors = [
-                {
-                    'rgb': list(color),
-                    'hex': '#{:02x}{:02x}{:02x}'.format(*color),
-                    'percentage': round(count / len(pixel_list) * 100, 2)
-                }
-                for color, count in dominant_colors
-            ]
+            img, _ = self._open_image(image_data)
+            self._draft(img, COLOR_SAMPLE_SIZE)
             
             return {
                 'success': True,
-                'dominant_colors': colors
+                'dominant_colors': self._dominant_colors(img, num_colors, method),
+                'method': method
             }
         except Exception as e:
             logger.error(f"Color extraction error: {str(e)}")
             raise
+    
+    def _dominant_colors(self, img, num_colors, method=DEFAULT_PALETTE_METHOD):
+        """Palette of an already opened image, near-duplicate shades merged"""
+        # Resize for faster processing
+        img = self._flatten_to_rgb(img).convert('RGB')
+        img = img.resize(COLOR_SAMPLE_SIZE)
+        
+        return [
+            {
+                'rgb': color,
+                'hex': '#{:02x}{:02x}{:02x}'.format(*color),
+                'percentage': round(share * 100, 2)
+            }
+            for color, share in extract_palette(np.asarray(img), num_colors, method)
+        ]
+    
+    def process_pipeline(self, image_data, renditions=None, num_colors=5, include_metadata=True,
+                         color_method=DEFAULT_PALETTE_METHOD):
+        """
+        Decode an upload once and produce every derivative it needs
+        
+        JPEGs are decoded at the smallest DCT scale that still covers the
+        largest rendition. Renditions are generated largest first, each one
+        downscaled from the previous rendition rather than from the source, so
+        only the first resize touches the decoded pixels. Dominant colors come from
+        the smallest rendition that is still at least 100px on each side.
+        
+        Args:
+            image_data: Binary image data, base64 string or binary file object
+            renditions: [{'name', 'max_size': (w, h), 'quality'}] (default: feed, thumbnail, avatar)
+            num_colors: number of dominant colors, or 0 to skip them
+            include_metadata: include source dimensions, format and EXIF orientation
+            color_method: palette method for the dominant colors, 'median_cut' or 'kmeans'
+        """
+        try:
+            img, original_bytes = self._open_image(image_data)
+            original_size = img.size
+            original_format = img.format
+            original_mode = img.mode
+            orientation = img.getexif().get(EXIF_ORIENTATION) if include_metadata else None
+            width, height = original_size
+            
+            # Largest first: order by the scale each bounding box implies
+            ordered = sorted(
+                renditions or DEFAULT_RENDITIONS,
+                key=lambda r: min(r['max_size'][0] / width, r['max_size'][1] / height, 1.0),
+                reverse=True
+            )
+            
+            # Decode only as much resolution as the largest rendition needs
+            self._draft(img, ordered[0]['max_size'])
+            source = self._flatten_to_rgb(img)
+            
+            outputs = {}
+            color_source = None
+            current = source
+            for rendition in ordered:
+                resized = current.copy()
+                resized.thumbnail(tuple(rendition['max_size']), Image.Resampling.LANCZOS)
+                current = resized
+                
+                output = io.BytesIO()
+                resized.save(output, format='JPEG', quality=int(rendition.get('quality', 85)), optimize=True)
+                encoded = output.getvalue()
+                
+                outputs[rendition['name']] = {
+                    'image': base64.b64encode(encoded).decode('utf-8'),
+                    'size': resized.size,
+                    'bytes': len(encoded)
+                }
+                if min(resized.size) >= 100:
+                    color_source = resized
+            
+            result = {
+                'success': True,
+                'renditions': outputs
+            }
+            
+            if num_colors:
+                result['dominant_colors'] = self._dominant_colors(color_source or source, num_colors, color_method)
+            
+            if include_metadata:
+                result['metadata'] = {
+                    'width': original_size[0],
+                    'height': original_size[1],
+                    'format': original_format,
+                    'mode': original_mode,
+                    'bytes': original_bytes,
+                    'orientation': orientation
+                }
+            
+            return result
+        except Exception as e:
+            logger.error(f"Image pipeline error: {str(e)}")
+            raise
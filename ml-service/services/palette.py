@@ -0,0 +1,242 @@
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+PALETTE_METHODS = ('median_cut', 'kmeans')
+DEFAULT_PALETTE_METHOD = 'median_cut'
+
+# Histogram resolution: 5 bits per channel -> 32768 bins
+HISTOGRAM_BITS = 5
+
+# Clusters extracted per requested color before near-duplicates are merged
+OVERSEGMENT = 2
+
+# CIE76 color difference under which two palette entries count as one color
+MERGE_DISTANCE = 12.0
+
+KMEANS_ITERATIONS = 20
+
+# Linear sRGB -> XYZ (D65), and the D65 white point
+RGB_TO_XYZ = np.array([
+    [0.4124, 0.3576, 0.1805],
+    [0.2126, 0.7152, 0.0722],
+    [0.0193, 0.1192, 0.9505]
+])
+D65_WHITE = np.array([0.95047, 1.0, 1.08883])
+
+
+def rgb_to_lab(rgb):
+    """sRGB colors (n x 3, 0-255) to CIELAB"""
+    c = np.asarray(rgb, dtype=np.float64) / 255.0
+    linear = np.where(c <= 0.04045, c / 12.92, ((c + 0.055) / 1.055) ** 2.4)
+    xyz = (linear @ RGB_TO_XYZ.T) / D65_WHITE
+    f = np.where(xyz > (6 / 29) ** 3, np.cbrt(xyz), xyz / (3 * (6 / 29) ** 2) + 4 / 29)
+    return np.column_stack([
+        116 * f[:, 1] - 16,
+        500 * (f[:, 0] - f[:, 1]),
+        200 * (f[:, 1] - f[:, 2])
+    ])
+
+
+def color_histogram(pixels):
+    """
+    Occupied bins of a 5-bit-per-channel color histogram
+    
+    Returns: (mean RGB color of each bin as floats, pixel count of each bin)
+    """
+    pixels = np.asarray(pixels, dtype=np.uint8).reshape(-1, 3)
+    shift = 8 - HISTOGRAM_BITS
+    quantized = (pixels >> shift).astype(np.intp)
+    index = (quantized[:, 0] << (2 * HISTOGRAM_BITS)) | (quantized[:, 1] << HISTOGRAM_BITS) | quantized[:, 2]
+    bins = 1 << (3 * HISTOGRAM_BITS)
+    
+    counts = np.bincount(index, minlength=bins)
+    occupied = np.flatnonzero(counts)
+    sums = np.column_stack([
+        np.bincount(index, weights=pixels[:, channel], minlength=bins)[occupied]
+        for channel in range(3)
+    ])
+    counts = counts[occupied].astype(np.float64)
+    return sums / counts[:, None], counts
+
+
+def _cluster_means(colors, counts, labels, n_clusters):
+    """Population and population-weighted mean RGB of each cluster"""
+    populations = np.bincount(labels, weights=counts, minlength=n_clusters)
+    sums = np.column_stack([
+        np.bincount(labels, weights=counts * colors[:, channel], minlength=n_clusters)
+        for channel in range(3)
+    ])
+    return sums / np.maximum(populations, 1e-12)[:, None], populations
+
+
+def _best_split(colors, counts, box):
+    """
+    Variance-minimizing cut of one box
+    
+    For each channel the box's bins are ordered along it and every cut
+    between distinct values is scored by the population-weighted squared
+    error of the two halves (Wu's criterion), from running sums in O(n) per
+    channel after the sort.
+    
+    Returns: (error reduction, ordered bins, cut position), or None if the box cannot be split
+    """
+    best = None
+    for channel in range(3):
+        ordered = box[np.argsort(colors[box, channel], kind='stable')]
+        values = colors[ordered, channel]
+        cuts = np.flatnonzero(values[1:] != values[:-1]) + 1
+        if len(cuts) == 0:
+            continue
+        
+        w = counts[ordered]
+        weighted = colors[ordered] * w[:, None]
+        cum_w = np.cumsum(w)
+        cum_sum = np.cumsum(weighted, axis=0)
+        total_w, total_sum = cum_w[-1], cum_sum[-1]
+        
+        # Squared error = sum(w * |c|^2) - |sum(w * c)|^2 / sum(w); the first
+        # term is the same for every cut, so only the second one is compared
+        left_w, left_sum = cum_w[cuts - 1], cum_sum[cuts - 1]
+        right_w, right_sum = total_w - left_w, total_sum - left_sum
+        kept = (left_sum ** 2).sum(axis=1) / left_w + (right_sum ** 2).sum(axis=1) / right_w
+        i = int(np.argmax(kept))
+        reduction = kept[i] - (total_sum ** 2).sum() / total_w
+        if best is None or reduction > best[0]:
+            best = (reduction, ordered, int(cuts[i]))
+    return best
+
+
+def median_cut(colors, counts, n_colors):
+    """
+    Box-splitting quantization of histogram bins
+    
+    Repeatedly makes the cut that removes the most population-weighted
+    squared error, over every box and channel, until there are n_colors
+    boxes or nothing left to split. Unlike a cut at the median, the cut
+    falls in the gap between color clusters, so each box averages to a
+    color that is actually in the image.
+    
+    Returns: (mean RGB per box, pixel count per box)
+    """
+    boxes = [np.arange(len(colors))]
+    splits = [_best_split(colors, counts, boxes[0])]
+    while len(boxes) < n_colors:
+        candidates = [i for i, split in enumerate(splits) if split is not None]
+        if not candidates:
+            break
+        best = max(candidates, key=lambda i: splits[i][0])
+        
+        _, ordered, cut = splits[best]
+        halves = [ordered[:cut], ordered[cut:]]
+        boxes[best:best + 1] = halves
+        splits[best:best + 1] = [_best_split(colors, counts, half) for half in halves]
+    
+    labels = np.empty(len(colors), dtype=np.intp)
+    for i, box in enumerate(boxes):
+        labels[box] = i
+    return _cluster_means(colors, counts, labels, len(boxes))
+
+
+def kmeans(colors, counts, n_colors, iterations=KMEANS_ITERATIONS):
+    """
+    Weighted k-means over histogram bins in CIELAB space
+    
+    Each bin is one point weighted by its pixel count, so an iteration costs
+    O(bins * k) however many pixels were sampled. Centers are seeded from
+    median cut, which makes the result deterministic.
+    
+    Returns: (mean RGB per cluster, pixel count per cluster)
+    """
+    lab = rgb_to_lab(colors)
+    seeds, _ = median_cut(colors, counts, n_colors)
+    centers = rgb_to_lab(seeds)
+    labels = None
+    
+    for _ in range(iterations):
+        # |x - c|^2 without the per-bin |x|^2 term, which does not change the argmin
+        distances = (centers ** 2).sum(axis=1) - 2 * (lab @ centers.T)
+        new_labels = np.argmin(distances, axis=1)
+        if labels is not None and np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        
+        populations = np.bincount(labels, weights=counts, minlength=len(centers))
+        sums = np.column_stack([
+            np.bincount(labels, weights=counts * lab[:, channel], minlength=len(centers))
+            for channel in range(3)
+        ])
+        # Empty clusters keep their previous center
+        centers = np.where(populations[:, None] > 0, sums / np.maximum(populations, 1e-12)[:, None], centers)
+    
+    return _cluster_means(colors, counts, labels, len(centers))
+
+
+def merge_similar(colors, populations, threshold=MERGE_DISTANCE):
+    """
+    Fold palette entries that are perceptually the same color into one
+    
+    Entries are visited from most to least common; each one joins the
+    closest kept color within `threshold` (CIE76 delta E), averaging in its
+    pixels, or becomes a new kept color.
+    
+    Returns: (mean RGB per merged color, pixel count per merged color), most common first
+    """
+    order = np.argsort(-populations, kind='stable')
+    order = order[populations[order] > 0]
+    lab = rgb_to_lab(colors)
+    
+    kept = []
+    sums = []
+    totals = []
+    for i in order:
+        if kept:
+            distances = np.sqrt(((lab[kept] - lab[i]) ** 2).sum(axis=1))
+            nearest = int(np.argmin(distances))
+            if distances[nearest] < threshold:
+                sums[nearest] += colors[i] * populations[i]
+                totals[nearest] += populations[i]
+                continue
+        kept.append(i)
+        sums.append(colors[i] * populations[i])
+        totals.append(populations[i])
+    
+    totals = np.array(totals)
+    merged = np.array(sums).reshape(-1, 3) / np.maximum(totals, 1e-12)[:, None]
+    order = np.argsort(-totals, kind='stable')
+    return merged[order], totals[order]
+
+
+def extract_palette(pixels, num_colors=5, method=DEFAULT_PALETTE_METHOD):
+    """
+    Dominant colors of an RGB pixel array
+    
+    Args:
+        pixels: uint8 array with 3 channels in the last axis
+        num_colors: maximum number of colors to return
+        method: 'median_cut' or 'kmeans'
+    
+    Returns: [(rgb as 3 ints, share of pixels in [0, 1])], most common first.
+    Fewer than num_colors come back when the image has fewer distinct colors.
+    """
+    if method not in PALETTE_METHODS:
+        raise ValueError(f"Unsupported palette method: {method}. Use one of {', '.join(PALETTE_METHODS)}")
+    
+    try:
+        if num_colors < 1:
+            return []
+        
+        colors, counts = color_histogram(pixels)
+        quantize = median_cut if method == 'median_cut' else kmeans
+        centers, populations = quantize(colors, counts, min(num_colors * OVERSEGMENT, len(colors)))
+        centers, populations = merge_similar(centers, populations)
+        
+        total = populations.sum()
+        return [
+            (np.clip(np.rint(center), 0, 255).astype(int).tolist(), float(population / total))
+            for center, population in zip(centers[:num_colors], populations[:num_colors])
+        ]
+    except Exception as e:
+        logger.error(f"Error extracting palette: {str(e)}")
+        raise
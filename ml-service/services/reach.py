@@ -0,0 +1,230 @@
+import base64
+import os
+import socket
+import threading
+import time
+import logging
+
+from .sketches import HyperLogLog, hash_keys
+from .training_data import clamp_to_now, to_epoch_seconds
+
+logger = logging.getLogger(__name__)
+
+ITEM_KINDS = ('post', 'story')
+
+# Sketch streams kept per item: viewers, and anyone who engaged some other way
+VIEW_AUDIENCE = 'views'
+ENGAGED_AUDIENCE = 'engaged'
+
+
+class ReachTracker:
+    """
+    Unique-viewer and reach estimation for posts and stories
+    
+    Each (kind, item, audience) keeps an all-time HyperLogLog plus one
+    lower-precision HyperLogLog per day with activity. All-time counts read a
+    single sketch and any window of days is a register-wise max over its
+    daily sketches. With the defaults an audience costs 4 KiB all-time plus
+    1 KiB per active day (about 3.2% standard error on windows against 1.6%
+    all-time), so a post viewed and engaged with every day of the 30-day
+    retention holds about 68 KB; days older than the retention are pruned
+    across all items as soon as the clock moves to a new day.
+    
+    Sketches serialize to bytes and merge losslessly, so workers can exchange
+    and combine them. View totals are kept per worker and merged with a max,
+    so merging the same export twice, or a worker's own export, never
+    double-counts views.
+    """
+    
+    def __init__(self, precision=12, daily_precision=10, retention_days=30, worker_id=None):
+        self.precision = precision
+        self.daily_precision = daily_precision
+        self.retention_days = retention_days
+        # Default: host and pid, resolved per call so forked workers differ
+        self.worker_id = worker_id
+        self.daily = {}  # (kind, item_id, audience) -> {day: HyperLogLog}
+        self.all_time = {}  # (kind, item_id, audience) -> HyperLogLog
+        self.view_counts = {}  # (kind, item_id) -> {worker_id: views recorded by that worker}
+        self.latest_day = None
+        self._lock = threading.Lock()
+    
+    def record(self, kind, item_id, user_ids, timestamp=None, event_type='view'):
+        """
+        Record users viewing or engaging with an item
+        
+        Args:
+            kind: 'post' or 'story'
+            item_id: post or story id
+            user_ids: viewer/engager ids
+            timestamp: epoch seconds/milliseconds or ISO-8601 (default: now);
+                days in the future count as today
+            event_type: 'view' for views, anything else (like, comment, ...) counts toward reach only
+        """
+        if kind not in ITEM_KINDS:
+            raise ValueError(f"Unsupported item kind: {kind}")
+        
+        try:
+            user_ids = list(user_ids)
+            if not user_ids:
+                return
+            
+            seconds = time.time() if timestamp is None else to_epoch_seconds(timestamp)
+            day = int(seconds // 86400)
+            audience = VIEW_AUDIENCE if event_type == 'view' else ENGAGED_AUDIENCE
+            key = (kind, item_id, audience)
+            user_hashes = hash_keys(user_ids)
+            
+            with self._lock:
+                self._sketch(self.all_time, key, self.precision).add_hashes(user_hashes)
+                daily = self._daily_sketch(key, day)
+                if daily is not None:
+                    daily.add_hashes(user_hashes)
+                if audience == VIEW_AUDIENCE:
+                    counts = self.view_counts.setdefault((kind, item_id), {})
+                    worker = self._worker()
+                    counts[worker] = counts.get(worker, 0) + len(user_ids)
+        except Exception as e:
+            logger.error(f"Error recording reach: {str(e)}")
+            raise
+    
+    def record_events(self, events):
+        """
+        Record view/interaction rows, e.g. from story_views or post_interactions
+        
+        Each event has 'post_id' or 'story_id', 'user_id', and optionally
+        'timestamp' (or 'created_at') and 'type'. Events are grouped by item,
+        day and type so each sketch takes one vectorized update.
+        """
+        now = time.time()
+        groups = {}
+        for event in events:
+            if event.get('story_id') is not None:
+                kind, item_id = 'story', event['story_id']
+            else:
+                kind, item_id = 'post', event['post_id']
+            timestamp = event.get('timestamp', event.get('created_at'))
+            day = int((now if timestamp is None else to_epoch_seconds(timestamp)) // 86400)
+            groups.setdefault((kind, item_id, day, event.get('type', 'view')), []).append(event['user_id'])
+        
+        for (kind, item_id, day, event_type), user_ids in groups.items():
+            self.record(kind, item_id, user_ids, day * 86400, event_type)
+    
+    def views(self, kind, item_id):
+        """Total (non-unique) views recorded for an item, across all merged workers"""
+        return sum(self.view_counts.get((kind, item_id), {}).values())
+    
+    def unique_viewers(self, kind, item_id, days=None, now=None):
+        """Estimated distinct viewers, all-time or over the last `days` days"""
+        return self.unique_audience(kind, [item_id], (VIEW_AUDIENCE,), days, now)
+    
+    def reach(self, kind, item_id, days=None, now=None):
+        """Estimated distinct users who viewed or engaged with an item"""
+        return self.unique_audience(kind, [item_id], (VIEW_AUDIENCE, ENGAGED_AUDIENCE), days, now)
+    
+    def unique_audience(self, kind, item_ids, audiences=(VIEW_AUDIENCE,), days=None, now=None):
+        """Estimated distinct users across several items, e.g. all of a user's stories"""
+        with self._lock:
+            merged = HyperLogLog(self.precision if days is None else self.daily_precision)
+            if days is None:
+                for item_id in item_ids:
+                    for audience in audiences:
+                        sketch = self.all_time.get((kind, item_id, audience))
+                        if sketch is not None:
+                            merged.merge(sketch)
+            else:
+                today = int((time.time() if now is None else now) // 86400)
+                for item_id in item_ids:
+                    for audience in audiences:
+                        daily = self.daily.get((kind, item_id, audience), {})
+                        for day in range(today - days + 1, today + 1):
+                            sketch = daily.get(day)
+                            if sketch is not None:
+                                merged.merge(sketch)
+            return merged.count()
+    
+    def export_sketches(self, kind, item_id):
+        """Serialized sketches of one item, for merging into another worker"""
+        if kind not in ITEM_KINDS:
+            raise ValueError(f"Unsupported item kind: {kind}")
+        
+        with self._lock:
+            exported = {
+                'kind': kind,
+                'item_id': item_id,
+                'views': dict(self.view_counts.get((kind, item_id), {})),
+                'audiences': {}
+            }
+            for audience in (VIEW_AUDIENCE, ENGAGED_AUDIENCE):
+                key = (kind, item_id, audience)
+                if key not in self.all_time:
+                    continue
+                exported['audiences'][audience] = {
+                    'all_time': base64.b64encode(self.all_time[key].to_bytes()).decode('ascii'),
+                    'daily': {
+                        str(day): base64.b64encode(sketch.to_bytes()).decode('ascii')
+                        for day, sketch in self.daily.get(key, {}).items()
+                    }
+                }
+            return exported
+    
+    def merge_sketches(self, exported):
+        """
+        Merge the output of export_sketches() from another worker
+        
+        Idempotent: sketches merge by register maxima and each worker's view
+        total by taking the larger value, so re-merging an export is a no-op.
+        """
+        kind, item_id = exported['kind'], exported['item_id']
+        if kind not in ITEM_KINDS:
+            raise ValueError(f"Unsupported item kind: {kind}")
+        views = exported.get('views', {})
+        if not isinstance(views, dict):
+            raise ValueError('views must map worker ids to view counts')
+        
+        with self._lock:
+            for audience, sketches in exported.get('audiences', {}).items():
+                key = (kind, item_id, audience)
+                self._sketch(self.all_time, key, self.precision).merge(
+                    HyperLogLog.from_bytes(base64.b64decode(sketches['all_time']))
+                )
+                for day, encoded in sketches.get('daily', {}).items():
+                    daily = self._daily_sketch(key, int(day))
+                    if daily is not None:
+                        daily.merge(HyperLogLog.from_bytes(base64.b64decode(encoded)))
+            
+            if views:
+                counts = self.view_counts.setdefault((kind, item_id), {})
+                for worker, count in views.items():
+                    counts[worker] = max(counts.get(worker, 0), int(count))
+    
+    def _worker(self):
+        if self.worker_id is not None:
+            return self.worker_id
+        return f"{socket.gethostname()}:{os.getpid()}"
+    
+    def _sketch(self, sketches, key, precision):
+        sketch = sketches.get(key)
+        if sketch is None:
+            sketch = sketches[key] = HyperLogLog(precision)
+        return sketch
+    
+    def _daily_sketch(self, key, day):
+        """Daily sketch for `day`, or None once the day has aged out of retention"""
+        # A future day would advance latest_day and prune every real day
+        day = int(clamp_to_now(day * 86400) // 86400)
+        if self.latest_day is None or day > self.latest_day:
+            self.latest_day = day
+            self._prune_days()
+        if day <= self.latest_day - self.retention_days:
+            return None
+        return self._sketch(self.daily.setdefault(key, {}), day, self.daily_precision)
+    
+    def _prune_days(self):
+        """Drop daily sketches older than the retention from every item"""
+        cutoff = self.latest_day - self.retention_days
+        for key in list(self.daily):
+            daily = self.daily[key]
+            for old_day in [day for day in daily if day <= cutoff]:
+                del daily[old_day]
+            if not daily:
+                del self.daily[key]
@@ -1,68 +1,455 @@
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-from collections import defaultdict
+from scipy import sparse
+import json
 import logging
+import os
+import shutil
+import time
+
+from .ann_index import IVFIndex
+from .content_analysis import ContentAnalyzer
+from .factorization import ImplicitALS
+from .text_features import HashedTfidfEmbedder
+from .training_data import to_epoch_seconds
 
 logger = logging.getLogger(__name__)
 
+MODEL_FORMAT_VERSION = 1
+
+# Arrays written by save_model, one .npy file each so they can be memory-mapped
+USER_MODEL_ARRAYS = (
+    'user_ids', 'item_ids', 'user_norms', 'item_popularity', 'popular_items',
+    'neighbor_ids', 'neighbor_scores', 'matrix_indptr', 'matrix_indices', 'matrix_data'
+)
+FACTOR_MODEL_ARRAYS = ('user_factors', 'item_factors')
+EXCLUSION_ARRAYS = (
+    'author_item_ids', 'author_ids', 'blocker_ids', 'blocked_ids', 'items_by_author', 'sorted_item_authors'
+)
+CONTENT_MODEL_ARRAYS = (
+    'content_item_ids', 'item_features', 'document_frequency',
+    'index_centroids', 'index_list_offsets', 'index_ids', 'index_vectors'
+)
+
+
+def _max_timestamp(timestamps):
+    """Latest finite timestamp in an array, or None"""
+    if timestamps is None:
+        return None
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    timestamps = timestamps[np.isfinite(timestamps)]
+    return float(timestamps.max()) if len(timestamps) else None
+
+
 class RecommendationEngine:
     """Content-based and collaborative filtering recommendation engine"""
     
     def __init__(self):
         self.user_profiles = {}
-        self.item_features = {}
+        self.item_features = None
         self.user_item_matrix = None
+        self.user_norms = None
+        self.watermark = None
+        self.user_ids = np.empty(0, dtype=np.int64)
+        self.item_ids = np.empty(0, dtype=np.int64)
+        self.item_popularity = None
+        self.popular_items = None
+        
+        # Exclusions: post authors and block relationships, both sorted for searchsorted lookups
+        self.author_item_ids = np.empty(0, dtype=np.int64)
+        self.author_ids = np.empty(0, dtype=np.int64)
+        self.blocker_ids = np.empty(0, dtype=np.int64)
+        self.blocked_ids = np.empty(0, dtype=np.int64)
+        self.items_by_author = None
+        self.sorted_item_authors = None
+        
+        # Top-K neighbour table: (n_users, n_neighbors) user row indices and scores
+        self.n_neighbors = 50
+        self.max_popular_items = 1000
+        self.neighbor_ids = None
+        self.neighbor_scores = None
+        
+        # 'cosine' scores candidates from the neighbour table, 'als' from low-rank factors
+        self.model_type = 'cosine'
+        self.als_params = {}
+        self.factor_model = None
+        
+        # Content embeddings: item_features[i] is the embedding of content_item_ids[i]
+        self.content_analyzer = ContentAnalyzer()
+        self.item_embedder = HashedTfidfEmbedder()
+        self.content_item_ids = np.empty(0, dtype=np.int64)
+        self.content_index = None
+        
+        # Set by save_model/load_model; refresh() reloads when another worker saves
+        self.model_dir = None
+        self._model_mtime = None
+        self._last_refresh_check = 0.0
+        
+        # Weight different interaction types
+        self.interaction_weights = {
+            'like': 1,
+            'comment': 2,
+            'share': 3,
+            'save': 2
+        }
+        
+        # Exponential time decay: an interaction loses half its weight every
+        # half-life. All weights are expressed relative to decay_reference.
+        self.decay_half_life_days = 30.0
+        self.decay_reference = None
         
     def get_user_recommendations(self, user_id, limit=10):
         """
         Get personalized content recommendations for a user
         
-        Uses collaborative filtering based on user interactions
+        Uses collaborative filtering based on user interactions: posts engaged
+        with by the user's precomputed top-K neighbours are scored by neighbour
+        similarity, and popular posts fill any remaining slots.
         """
         try:
-            # Mock recommendations for now - will be replaced with actual ML model
-            recommendations = [
-                {
-                    'post_id': i,
-                    'score': round(np.random.random(), 2),
-                    'reason': 'Based on your interests' if i % 2 == 0 else 'Popular in your network',
-                    'type': 'post'
-                }
-                for i in range(1, limit + 1)
-            ]
+            user_idx = self._user_index(user_id)
+            recommendations = []
+            
+            if user_idx >= 0:
+                excluded = self._excluded_items(user_id, user_idx)
+                if self.factor_model is not None:
+                    item_idx, scores = self._score_factor_items(user_idx, excluded)
+                else:
+                    item_idx, scores = self._score_neighbor_items(user_idx, excluded)
+                top = self._top_k(scores, limit)
+                recommendations = [
+                    {
+                        'post_id': int(self.item_ids[item_idx[i]]),
+                        'score': round(float(scores[i]), 4),
+                        'reason': 'Based on your interests',
+                        'type': 'post'
+                    }
+                    for i in top
+                ]
             
-            # Sort by score
-            recommendations.sort(key=lambda x: x['score'], reverse=True)
+            if len(recommendations) < limit:
+                recommendations.extend(
+                    self._popular_items(user_id, user_idx, limit - len(recommendations), recommendations)
+                )
             
             return recommendations
         except Exception as e:
             logger.error(f"Error in get_user_recommendations: {str(e)}")
             return []
     
+    def get_batch_recommendations(self, user_ids, limit=10, block_size=1024):
+        """
+        Get recommendations for many users at once
+        
+        Neighbour tables for a block of users are turned into a sparse
+        (block x n_users) weight matrix, so all their candidate scores come
+        out of a single sparse product with the interaction matrix.
+        
+        Returns a list of dicts with user_id and recommendations, in input order.
+        """
+        try:
+            user_ids = np.asarray(user_ids, dtype=np.int64)
+            results = []
+            
+            if self.factor_model is not None:
+                # Dense (block x n_items) score matrices: keep each block around 64MB
+                block_size = max(1, min(block_size, (1 << 24) // max(len(self.item_ids), 1)))
+            
+            for block_start in range(0, len(user_ids), block_size):
+                block = user_ids[block_start:block_start + block_size]
+                results.extend(self._score_user_block(block, limit))
+            
+            return results
+        except Exception as e:
+            logger.error(f"Error in get_batch_recommendations: {str(e)}")
+            raise
+    
+    def _score_user_block(self, user_ids, limit):
+        """Score one block of users with a single matrix product"""
+        rows = np.full(len(user_ids), -1, dtype=np.int64)
+        if len(self.user_ids):
+            positions = np.minimum(np.searchsorted(self.user_ids, user_ids), len(self.user_ids) - 1)
+            known = self.user_ids[positions] == user_ids
+            rows[known] = positions[known]
+        
+        scores = None
+        excluded = None
+        if (rows >= 0).any():
+            excluded = self._excluded_matrix(user_ids, rows)
+        
+        if self.factor_model is not None and (rows >= 0).any():
+            known_rows = np.where(rows >= 0, rows, 0)
+            user_factors = self.factor_model.user_factors[known_rows]
+            dense_scores = user_factors @ self.factor_model.item_factors.T
+            
+            dense_scores[excluded.row, excluded.col] = -np.inf
+            # Unknown users, and users with all-zero factors, fall back to popular posts
+            dense_scores[(rows < 0) | ~user_factors.any(axis=1)] = -np.inf
+            
+            # Keep only each row's top candidates, in the same CSR shape as the cosine path
+            k = min(limit, dense_scores.shape[1])
+            top = np.argpartition(-dense_scores, k - 1, axis=1)[:, :k] if k > 0 else np.empty((len(rows), 0), dtype=np.int64)
+            top_scores = np.take_along_axis(dense_scores, top, axis=1)
+            finite = np.isfinite(top_scores)
+            scores = sparse.csr_matrix(
+                (top_scores[finite], (np.nonzero(finite)[0], top[finite])),
+                shape=dense_scores.shape
+            )
+        elif self.neighbor_ids is not None and (rows >= 0).any():
+            known_rows = np.where(rows >= 0, rows, 0)
+            neighbors = self.neighbor_ids[known_rows]
+            similarities = self.neighbor_scores[known_rows]
+            valid = (neighbors >= 0) & (rows >= 0)[:, None]
+            
+            weights = sparse.csr_matrix(
+                (similarities[valid], (np.nonzero(valid)[0], neighbors[valid])),
+                shape=(len(user_ids), len(self.user_ids))
+            )
+            totals = np.asarray(weights.sum(axis=1)).ravel()
+            inv_totals = np.divide(1.0, totals, out=np.zeros_like(totals), where=totals > 0)
+            scores = (sparse.diags(inv_totals) @ weights @ self.user_item_matrix).tocsr()
+            
+            # Drop seen, own and blocked posts for every user in the block at once
+            scores = (scores - scores.multiply(excluded.tocsr())).tocsr()
+            scores.eliminate_zeros()
+        
+        results = []
+        for offset, user_id in enumerate(user_ids):
+            recommendations = []
+            if scores is not None and rows[offset] >= 0:
+                start, end = scores.indptr[offset], scores.indptr[offset + 1]
+                item_idx = scores.indices[start:end]
+                row_scores = scores.data[start:end]
+                recommendations = [
+                    {
+                        'post_id': int(self.item_ids[item_idx[i]]),
+                        'score': round(float(row_scores[i]), 4),
+                        'reason': 'Based on your interests',
+                        'type': 'post'
+                    }
+                    for i in self._top_k(row_scores, limit)
+                ]
+            
+            if len(recommendations) < limit:
+                recommendations.extend(
+                    self._popular_items(int(user_id), int(rows[offset]), limit - len(recommendations), recommendations)
+                )
+            
+            results.append({
+                'user_id': int(user_id),
+                'recommendations': recommendations
+            })
+        
+        return results
+    
     def get_similar_users(self, user_id, limit=10):
         """
         Find users with similar interests using collaborative filtering
+        
+        Answered straight from the precomputed neighbour table in O(K).
         """
         try:
-            # Mock similar users - will be replaced with actual similarity calculation
-            similar_users = [
+            user_idx = self._user_index(user_id)
+            if user_idx < 0 or self.neighbor_ids is None:
+                return []
+            
+            neighbors = self.neighbor_ids[user_idx]
+            valid = neighbors >= 0
+            neighbors = neighbors[valid][:limit]
+            scores = self.neighbor_scores[user_idx][valid][:limit]
+            
+            return [
                 {
-                    'user_id': i,
-                    'similarity_score': round(np.random.random(), 2),
-                    'common_interests': ['technology', 'sports', 'music'][i % 3]
+                    'user_id': int(self.user_ids[neighbor]),
+                    'similarity_score': round(float(score), 4)
                 }
-                for i in range(1, limit + 1)
-                if i != user_id
+                for neighbor, score in zip(neighbors, scores)
             ]
-            
-            # Sort by similarity score
-            similar_users.sort(key=lambda x: x['similarity_score'], reverse=True)
-            
-            return similar_users
         except Exception as e:
             logger.error(f"Error in get_similar_users: {str(e)}")
             return []
     
+    def _user_index(self, user_id):
+        """Row index of a user in the trained model, or -1 if unknown"""
+        idx = int(np.searchsorted(self.user_ids, user_id))
+        if idx < len(self.user_ids) and self.user_ids[idx] == user_id:
+            return idx
+        return -1
+    
+    @staticmethod
+    def _top_k(scores, k):
+        """Positions of the k highest scores, best first"""
+        if k <= 0 or len(scores) == 0:
+            return np.empty(0, dtype=np.int64)
+        if len(scores) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(scores))
+        return top[np.argsort(-scores[top], kind='stable')]
+    
+    @staticmethod
+    def _gather_rows(matrix, rows, row_weights):
+        """
+        Concatenate the non-zeros of several CSR rows, each scaled by a weight
+        
+        Returns (column indices, values, position of the source row in `rows`).
+        """
+        starts = matrix.indptr[rows]
+        lengths = matrix.indptr[rows + 1] - starts
+        total = int(lengths.sum())
+        if total == 0:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, np.empty(0, dtype=np.float32), empty
+        
+        owner = np.repeat(np.arange(len(rows)), lengths)
+        offsets = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        positions = np.repeat(starts, lengths) + offsets
+        
+        return matrix.indices[positions], matrix.data[positions] * row_weights[owner], owner
+    
+    def _score_neighbor_items(self, user_idx, excluded):
+        """
+        Aggregate neighbour interactions into candidate item scores
+        
+        Items in the sorted `excluded` index array are dropped.
+        """
+        neighbors = self.neighbor_ids[user_idx]
+        valid = neighbors >= 0
+        neighbors = neighbors[valid]
+        similarities = self.neighbor_scores[user_idx][valid]
+        
+        columns, values, _ = self._gather_rows(self.user_item_matrix, neighbors, similarities)
+        if len(columns) == 0:
+            return columns, values
+        
+        item_idx, inverse = np.unique(columns, return_inverse=True)
+        scores = np.bincount(inverse, weights=values).astype(np.float32) / similarities.sum()
+        
+        keep = ~np.isin(item_idx, excluded, assume_unique=True)
+        return item_idx[keep], scores[keep]
+    
+    def _score_factor_items(self, user_idx, excluded):
+        """
+        Score every item by its dot product with the user's latent factors
+        
+        A user whose factors are all zero (only interacted with posts added
+        after the last factor training) gets no candidates, so popular posts
+        fill the list instead of arbitrary 0.0-scored ones.
+        """
+        user_factors = self.factor_model.user_factors[user_idx]
+        if not user_factors.any():
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        scores = self.factor_model.item_factors @ user_factors
+        
+        keep = np.ones(len(scores), dtype=bool)
+        keep[excluded] = False
+        
+        item_idx = np.flatnonzero(keep)
+        return item_idx, scores[item_idx]
+    
+    def _popular_items(self, user_id, user_idx, limit, already):
+        """Most interacted-with posts, used when neighbours run out of candidates"""
+        if limit <= 0 or self.popular_items is None:
+            return []
+        
+        already_idx = np.searchsorted(self.item_ids, [rec['post_id'] for rec in already])
+        excluded = np.union1d(self._excluded_items(user_id, user_idx), already_idx)
+        candidates = self.popular_items[~np.isin(self.popular_items, excluded)][:limit]
+        
+        return [
+            {
+                'post_id': int(self.item_ids[item]),
+                'score': round(float(self.item_popularity[item]), 4),
+                'reason': 'Popular in your network',
+                'type': 'post'
+            }
+            for item in candidates
+        ]
+    
+    def set_item_authors(self, item_ids, author_ids):
+        """
+        Record who authored each post, so users never get their own posts
+        or posts by users they blocked (or who blocked them)
+        
+        Later calls add to or overwrite earlier mappings.
+        """
+        item_ids = np.concatenate([np.asarray(item_ids, dtype=np.int64), self.author_item_ids])
+        author_ids = np.concatenate([np.asarray(author_ids, dtype=np.int64), self.author_ids])
+        
+        # np.unique keeps the first occurrence, i.e. the newest mapping
+        self.author_item_ids, first = np.unique(item_ids, return_index=True)
+        self.author_ids = author_ids[first]
+        self._sync_item_authors()
+    
+    def set_blocked_users(self, user_ids, blocked_user_ids):
+        """Record block relationships; blocking hides posts in both directions"""
+        user_ids = np.asarray(user_ids, dtype=np.int64)
+        blocked_user_ids = np.asarray(blocked_user_ids, dtype=np.int64)
+        
+        pairs = np.unique(np.stack([
+            np.concatenate([self.blocker_ids, user_ids, blocked_user_ids]),
+            np.concatenate([self.blocked_ids, blocked_user_ids, user_ids])
+        ]), axis=1)
+        
+        # Sorted by blocker, so one user's block list is a searchsorted range
+        self.blocker_ids = pairs[0]
+        self.blocked_ids = pairs[1]
+    
+    def _sync_item_authors(self):
+        """
+        Align the author mapping with the model's item index
+        
+        Produces item_authors (author per item index, -1 when unknown) and
+        the item indices grouped by author, so all posts by a set of users
+        are found with searchsorted instead of a scan. Called after every
+        train, incremental update and author change.
+        """
+        item_authors = np.full(len(self.item_ids), -1, dtype=np.int64)
+        if len(self.author_item_ids) and len(self.item_ids):
+            positions = np.minimum(np.searchsorted(self.author_item_ids, self.item_ids), len(self.author_item_ids) - 1)
+            known = self.author_item_ids[positions] == self.item_ids
+            item_authors[known] = self.author_ids[positions[known]]
+        
+        self.items_by_author = np.argsort(item_authors, kind='stable')
+        self.sorted_item_authors = item_authors[self.items_by_author]
+    
+    def _excluded_items(self, user_id, user_idx):
+        """
+        Sorted item indices a user must not be recommended
+        
+        The union of posts the user already interacted with, the user's own
+        posts and posts authored by blocked users.
+        """
+        excluded = []
+        if user_idx >= 0 and self.user_item_matrix is not None:
+            matrix = self.user_item_matrix
+            excluded.append(matrix.indices[matrix.indptr[user_idx]:matrix.indptr[user_idx + 1]])
+        
+        if self.sorted_item_authors is not None and len(self.sorted_item_authors):
+            start, end = np.searchsorted(self.blocker_ids, [user_id, user_id + 1])
+            authors = np.append(self.blocked_ids[start:end], user_id)
+            
+            lo = np.searchsorted(self.sorted_item_authors, authors, side='left')
+            hi = np.searchsorted(self.sorted_item_authors, authors, side='right')
+            lengths = hi - lo
+            if lengths.sum():
+                positions = np.repeat(lo, lengths) + np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+                excluded.append(self.items_by_author[positions])
+        
+        if not excluded:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(excluded))
+    
+    def _excluded_matrix(self, user_ids, rows):
+        """Exclusions for a block of users as a sparse 0/1 (block x n_items) matrix"""
+        excluded = [self._excluded_items(int(user_id), int(row)) for user_id, row in zip(user_ids, rows)]
+        lengths = np.fromiter((len(e) for e in excluded), dtype=np.int64, count=len(excluded))
+        columns = np.concatenate(excluded) if lengths.sum() else np.empty(0, dtype=np.int64)
+        
+        return sparse.coo_matrix(
+            (np.ones(len(columns), dtype=np.float32), (np.repeat(np.arange(len(rows)), lengths), columns)),
+            shape=(len(rows), len(self.item_ids))
+        )
+    
     def train_model(self, user_interactions):
         """
         Train the recommendation model with user interaction data
@@ -71,72 +458,795 @@ class RecommendationEngine:
             user_interactions: List of dicts with user_id, item_id, interaction_type, timestamp
         """
         try:
-            # Build user-item interaction matrix
-            users = set()
-            items = set()
+            return self.train_from_arrays(*self._interactions_to_arrays(user_interactions))
+        except Exception as e:
+            logger.error(f"Error training model: {str(e)}")
+            raise
+    
+    def update_model(self, user_interactions, since=None):
+        """
+        Incrementally add new interactions to the trained model
+        
+        Args:
+            user_interactions: List of dicts with user_id, item_id, interaction_type, timestamp
+            since: Optional watermark (epoch seconds or ISO string) overriding the stored one
+        """
+        try:
+            return self.update_from_arrays(*self._interactions_to_arrays(user_interactions), since=since)
+        except Exception as e:
+            logger.error(f"Error updating model: {str(e)}")
+            raise
+    
+    def train_from_columns(self, columns):
+        """
+        Train from columnar input as returned by training_data.read_interaction_columns
+        
+        Avoids building one Python dict per interaction for bulk training.
+        """
+        try:
+            return self.train_from_arrays(*self._columns_to_arrays(columns))
+        except Exception as e:
+            logger.error(f"Error training model: {str(e)}")
+            raise
+    
+    def update_from_columns(self, columns, since=None):
+        """Incremental counterpart of train_from_columns"""
+        try:
+            return self.update_from_arrays(*self._columns_to_arrays(columns), since=since)
+        except Exception as e:
+            logger.error(f"Error updating model: {str(e)}")
+            raise
+    
+    def _columns_to_arrays(self, columns):
+        """Resolve weights and timestamps for a dict of interaction columns"""
+        n = len(columns['user_id'])
+        
+        if 'weight' in columns:
+            weights = np.asarray(columns['weight'], dtype=np.float32)
+        elif 'interaction_type' in columns:
+            weights = self._type_weights(columns['interaction_type'])
+        else:
+            weights = np.ones(n, dtype=np.float32)
+        
+        timestamps = columns.get('timestamp')
+        if timestamps is None:
+            timestamps = np.full(n, np.nan)
+        
+        return columns['user_id'], columns['item_id'], weights, timestamps
+    
+    def configure_weighting(self, interaction_weights=None, half_life_days=None):
+        """
+        Set per-interaction-type weights and the time-decay half-life
+        
+        Takes effect for the next train; a half-life of 0 disables decay.
+        """
+        if interaction_weights:
+            self.interaction_weights = {**self.interaction_weights, **interaction_weights}
+        if half_life_days is not None:
+            half_life_days = float(half_life_days)
+            self.decay_half_life_days = half_life_days if half_life_days > 0 else None
+    
+    def configure_model(self, model_type=None, **als_params):
+        """
+        Choose the scoring model used by the next train
+        
+        Args:
+            model_type: 'cosine' (user-user neighbourhood) or 'als' (implicit matrix factorization)
+            als_params: ImplicitALS options such as factors, iterations, regularization, alpha
+        """
+        if model_type is not None:
+            if model_type not in ('cosine', 'als'):
+                raise ValueError(f"Unknown model type: {model_type}")
+            self.model_type = model_type
+        self.als_params.update({k: v for k, v in als_params.items() if v is not None})
+    
+    def _decay_factors(self, timestamps, reference):
+        """
+        Per-interaction decay multipliers relative to the reference time
+        
+        Interactions without a timestamp are treated as current.
+        """
+        if self.decay_half_life_days is None or reference is None or timestamps is None:
+            return None
+        age_days = (reference - np.asarray(timestamps, dtype=np.float64)) / 86400.0
+        age_days = np.where(np.isfinite(age_days), np.maximum(age_days, 0.0), 0.0)
+        return np.exp2(-age_days / self.decay_half_life_days).astype(np.float32)
+    
+    def _roll_decay_forward(self, reference):
+        """
+        Move the decay reference time forward without recomputing weights
+        
+        Advancing the reference scales every stored weight by the same
+        factor, so the matrix, norms and popularity are rescaled in one
+        vectorized O(nnz) pass. Cosine similarities are unchanged, so
+        neighbour lists stay valid.
+        """
+        if self.decay_half_life_days is None or reference is None:
+            return
+        if self.decay_reference is None or reference <= self.decay_reference:
+            if self.decay_reference is None:
+                self.decay_reference = reference
+            return
+        
+        factor = np.float32(np.exp2(-(reference - self.decay_reference) / 86400.0 / self.decay_half_life_days))
+        matrix = self.user_item_matrix
+        self.user_item_matrix = sparse.csr_matrix(
+            (matrix.data * factor, matrix.indices, matrix.indptr),
+            shape=matrix.shape
+        )
+        self.user_norms *= factor
+        self.item_popularity *= factor
+        self.decay_reference = reference
+    
+    def _type_weights(self, interaction_types):
+        """Map a column of interaction types to weights with one lookup per distinct type"""
+        types, inverse = np.unique(np.asarray(interaction_types).astype(str), return_inverse=True)
+        lookup = np.array([self.interaction_weights.get(t, 1) for t in types], dtype=np.float32)
+        return lookup[inverse]
+    
+    def _interactions_to_arrays(self, user_interactions):
+        """Split interaction dicts into parallel id, weight and timestamp arrays"""
+        n = len(user_interactions)
+        user_ids = np.fromiter((i['user_id'] for i in user_interactions), dtype=np.int64, count=n)
+        item_ids = np.fromiter((i['item_id'] for i in user_interactions), dtype=np.int64, count=n)
+        weights = np.fromiter(
+            (self.interaction_weights.get(i.get('interaction_type', 'like'), 1) for i in user_interactions),
+            dtype=np.float32,
+            count=n
+        )
+        timestamps = np.fromiter(
+            (to_epoch_seconds(i.get('timestamp')) for i in user_interactions),
+            dtype=np.float64,
+            count=n
+        )
+        return user_ids, item_ids, weights, timestamps
+    
+    def train_from_arrays(self, user_ids, item_ids, weights, timestamps=None):
+        """
+        Train from parallel arrays of user ids, item ids and interaction weights
+        
+        The interaction matrix is kept sparse (CSR) and user similarity is never
+        materialised as a dense n_users x n_users matrix, so memory grows with
+        the number of interactions rather than the number of users squared.
+        """
+        try:
+            user_ids = np.asarray(user_ids, dtype=np.int64)
+            item_ids = np.asarray(item_ids, dtype=np.int64)
+            weights = np.asarray(weights, dtype=np.float32)
+            self.watermark = _max_timestamp(timestamps)
             
-            for interaction in user_interactions:
-                users.add(interaction['user_id'])
-                items.add(interaction['item_id'])
+            self.decay_reference = self.watermark
+            decay = self._decay_factors(timestamps, self.decay_reference)
+            if decay is not None:
+                weights = weights * decay
             
-            # Create interaction matrix
-            n_users = len(users)
-            n_items = len(items)
+            # Map raw ids to dense row/column indices (sorted, so lookups can use searchsorted)
+            self.user_ids, user_idx = np.unique(user_ids, return_inverse=True)
+            self.item_ids, item_idx = np.unique(item_ids, return_inverse=True)
             
-            user_to_idx = {user: idx for idx, user in enumerate(users)}
-            item_to_idx = {item: idx for idx, item in enumerate(items)}
+            n_users = len(self.user_ids)
+            n_items = len(self.item_ids)
             
-            interaction_matrix = np.zeros((n_users, n_items))
+            # Duplicate (user, item) pairs are summed by the COO -> CSR conversion
+            interaction_matrix = sparse.coo_matrix(
+                (weights, (user_idx, item_idx)),
+                shape=(n_users, n_items)
+            ).tocsr()
+            interaction_matrix.sort_indices()
             
-            # Weight different interaction types
-            weights = {
-                'like': 1,
-                'comment': 2,
-                'share': 3,
-                'save': 2
-            }
+            self.user_item_matrix = interaction_matrix
+            self.user_norms = np.sqrt(
+                np.asarray(interaction_matrix.multiply(interaction_matrix).sum(axis=1)).ravel()
+            ).astype(np.float32)
             
-            for interaction in user_interactions:
-                user_idx = user_to_idx[interaction['user_id']]
-                item_idx = item_to_idx[interaction['item_id']]
-                interaction_type = interaction.get('interaction_type', 'like')
-                
-                interaction_matrix[user_idx][item_idx] += weights.get(interaction_type, 1)
+            self.item_popularity = np.asarray(interaction_matrix.sum(axis=0)).ravel().astype(np.float32)
+            self.popular_items = self._top_k(self.item_popularity, self.max_popular_items)
             
-            self.user_item_matrix = interaction_matrix
+            self._build_neighbor_table()
+            self._sync_item_authors()
             
-            # Calculate user similarity matrix
-            user_similarity = cosine_similarity(interaction_matrix)
+            self.factor_model = None
+            if self.model_type == 'als':
+                self.factor_model = ImplicitALS(**self.als_params).fit(interaction_matrix)
             
             return {
+                'model_type': self.model_type,
                 'n_users': n_users,
                 'n_items': n_items,
-                'avg_similarity': float(np.mean(user_similarity)),
+                'n_interactions': int(interaction_matrix.nnz),
+                'n_neighbors': self.n_neighbors,
+                'avg_similarity': self._mean_cosine_similarity(),
+                'watermark': self.watermark,
                 'status': 'trained'
             }
         except Exception as e:
             logger.error(f"Error training model: {str(e)}")
             raise
     
+    def update_from_arrays(self, user_ids, item_ids, weights, timestamps, since=None):
+        """
+        Fold interactions newer than the watermark into the trained model
+        
+        Only rows that received new interactions have their norms and
+        neighbour lists recomputed; every other user's neighbour list is
+        patched with its new similarities to those rows. Python-level work
+        follows the size of the update. A few vectorized O(nnz) passes over
+        the stored matrix remain (adding the delta, rolling the decay
+        reference forward, one sparse product for the new similarities),
+        which keeps a tick well under a full retrain.
+        """
+        if self.user_item_matrix is None:
+            raise ValueError('No trained model to update; train the model first')
+        
+        try:
+            user_ids = np.asarray(user_ids, dtype=np.int64)
+            item_ids = np.asarray(item_ids, dtype=np.int64)
+            weights = np.asarray(weights, dtype=np.float32)
+            timestamps = np.asarray(timestamps, dtype=np.float64)
+            
+            watermark = to_epoch_seconds(since) if since is not None else self.watermark
+            if watermark is not None and not np.isnan(watermark):
+                fresh = ~(timestamps <= watermark)
+                user_ids, item_ids, weights, timestamps = (
+                    user_ids[fresh], item_ids[fresh], weights[fresh], timestamps[fresh]
+                )
+            
+            if len(user_ids) == 0:
+                return {
+                    'n_new_interactions': 0,
+                    'n_affected_users': 0,
+                    'watermark': self.watermark,
+                    'status': 'unchanged'
+                }
+            
+            latest = _max_timestamp(timestamps)
+            if latest is not None and (self.watermark is None or latest > self.watermark):
+                self.watermark = latest
+            
+            self._ensure_writable()
+            self._roll_decay_forward(self.watermark)
+            decay = self._decay_factors(timestamps, self.decay_reference)
+            if decay is not None:
+                weights = weights * decay
+            
+            self._grow_index_maps(user_ids, item_ids)
+            n_users, n_items = len(self.user_ids), len(self.item_ids)
+            
+            delta = sparse.coo_matrix(
+                (weights, (np.searchsorted(self.user_ids, user_ids), np.searchsorted(self.item_ids, item_ids))),
+                shape=(n_users, n_items)
+            ).tocsr()
+            
+            matrix = (self.user_item_matrix + delta).tocsr()
+            matrix.sort_indices()
+            self.user_item_matrix = matrix
+            
+            affected = np.unique(delta.tocoo().row)
+            squares = matrix[affected].multiply(matrix[affected]).sum(axis=1)
+            self.user_norms[affected] = np.sqrt(np.asarray(squares).ravel())
+            
+            self.item_popularity += np.asarray(delta.sum(axis=0)).ravel().astype(np.float32)
+            self.popular_items = self._top_k(self.item_popularity, self.max_popular_items)
+            
+            self._update_neighbor_rows(affected)
+            self._sync_item_authors()
+            if self.factor_model is not None:
+                self.factor_model.fold_in_users(matrix, affected)
+            
+            return {
+                'n_users': n_users,
+                'n_items': n_items,
+                'n_interactions': int(matrix.nnz),
+                'n_new_interactions': len(user_ids),
+                'n_affected_users': len(affected),
+                'watermark': self.watermark,
+                'status': 'updated'
+            }
+        except Exception as e:
+            logger.error(f"Error updating model: {str(e)}")
+            raise
+    
+    def _grow_index_maps(self, user_ids, item_ids):
+        """
+        Add unseen user/item ids to the sorted id maps
+        
+        Existing rows and columns are shifted to their new positions; since
+        the maps stay sorted the shift is monotonic, so CSR column order and
+        neighbour tables are preserved by a simple index remap.
+        """
+        all_users = np.union1d(self.user_ids, user_ids)
+        all_items = np.union1d(self.item_ids, item_ids)
+        
+        if len(all_items) != len(self.item_ids):
+            item_remap = np.searchsorted(all_items, self.item_ids)
+            matrix = self.user_item_matrix
+            self.user_item_matrix = sparse.csr_matrix(
+                (matrix.data, item_remap[matrix.indices], matrix.indptr),
+                shape=(matrix.shape[0], len(all_items))
+            )
+            popularity = np.zeros(len(all_items), dtype=np.float32)
+            popularity[item_remap] = self.item_popularity
+            self.item_popularity = popularity
+            self.item_ids = all_items
+            
+            if self.factor_model is not None:
+                # New items have no factors until the next full train
+                factors = np.zeros((len(all_items), self.factor_model.factors), dtype=np.float32)
+                factors[item_remap] = self.factor_model.item_factors
+                self.factor_model.item_factors = factors
+        
+        if len(all_users) != len(self.user_ids):
+            user_remap = np.searchsorted(all_users, self.user_ids)
+            n_users = len(all_users)
+            matrix = self.user_item_matrix
+            
+            row_lengths = np.zeros(n_users, dtype=np.int64)
+            row_lengths[user_remap] = np.diff(matrix.indptr)
+            indptr = np.zeros(n_users + 1, dtype=np.int64)
+            np.cumsum(row_lengths, out=indptr[1:])
+            self.user_item_matrix = sparse.csr_matrix(
+                (matrix.data, matrix.indices, indptr),
+                shape=(n_users, matrix.shape[1])
+            )
+            
+            norms = np.zeros(n_users, dtype=np.float32)
+            norms[user_remap] = self.user_norms
+            self.user_norms = norms
+            
+            neighbor_ids = np.full((n_users, self.n_neighbors), -1, dtype=np.int32)
+            neighbor_scores = np.zeros((n_users, self.n_neighbors), dtype=np.float32)
+            old_ids = self.neighbor_ids
+            neighbor_ids[user_remap] = np.where(old_ids >= 0, user_remap[np.maximum(old_ids, 0)], -1)
+            neighbor_scores[user_remap] = self.neighbor_scores
+            self.neighbor_ids = neighbor_ids
+            self.neighbor_scores = neighbor_scores
+            self.user_ids = all_users
+            
+            if self.factor_model is not None:
+                factors = np.zeros((n_users, self.factor_model.factors), dtype=np.float32)
+                factors[user_remap] = self.factor_model.user_factors
+                self.factor_model.user_factors = factors
+    
+    def _update_neighbor_rows(self, affected, block_cells=4_000_000):
+        """
+        Refresh neighbour lists after the rows in `affected` changed
+        
+        Affected users get an exact recomputation. Other users only see
+        their similarity to affected users change, so their lists are patched
+        by swapping in the new scores for those users and re-taking the top-K.
+        
+        The similarities come from one sparse product of the full matrix with
+        the affected rows, an O(nnz) pass that never copies or transposes the
+        whole matrix. Touched rows are then patched in blocks of fixed-width
+        candidate arrays with a single batched argpartition per block.
+        """
+        n_users = self.user_item_matrix.shape[0]
+        inv_norms = self._inverse_norms()
+        affected_rows = (sparse.diags(inv_norms[affected]) @ self.user_item_matrix[affected]).tocsr()
+        
+        # reverse[u, j] = cosine similarity of user u to affected[j]
+        reverse = (sparse.diags(inv_norms) @ (self.user_item_matrix @ affected_rows.T)).tocsr()
+        self._fill_neighbor_rows(affected, reverse.T.tocsr())
+        
+        is_affected = np.zeros(n_users, dtype=bool)
+        is_affected[affected] = True
+        touched = np.flatnonzero(np.diff(reverse.indptr))
+        touched = touched[~is_affected[touched]]
+        if len(touched) == 0:
+            return
+        
+        k = self.n_neighbors
+        widest = int(np.diff(reverse.indptr)[touched].max())
+        block_size = max(block_cells // (k + widest), 1)
+        
+        for block_start in range(0, len(touched), block_size):
+            rows = touched[block_start:block_start + block_size]
+            
+            # Current neighbours, with stale entries for affected users dropped
+            current_ids = self.neighbor_ids[rows]
+            current_scores = self.neighbor_scores[rows]
+            stale = (current_ids < 0) | is_affected[np.maximum(current_ids, 0)]
+            current_scores = np.where(stale, -np.inf, current_scores).astype(np.float32)
+            
+            # New similarities to affected users, padded to a fixed width
+            block = reverse[rows]
+            lengths = np.diff(block.indptr)
+            width = int(lengths.max())
+            owner = np.repeat(np.arange(len(rows)), lengths)
+            slot = np.arange(block.nnz) - np.repeat(block.indptr[:-1], lengths)
+            new_ids = np.full((len(rows), width), -1, dtype=np.int32)
+            new_scores = np.full((len(rows), width), -np.inf, dtype=np.float32)
+            new_ids[owner, slot] = affected[block.indices]
+            new_scores[owner, slot] = np.where(block.data > 0, block.data, -np.inf)
+            
+            candidates = np.concatenate([current_ids, new_ids], axis=1)
+            scores = np.concatenate([current_scores, new_scores], axis=1)
+            
+            if candidates.shape[1] > k:
+                top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+                candidates = np.take_along_axis(candidates, top, axis=1)
+                scores = np.take_along_axis(scores, top, axis=1)
+            order = np.argsort(-scores, axis=1, kind='stable')
+            candidates = np.take_along_axis(candidates, order, axis=1)
+            scores = np.take_along_axis(scores, order, axis=1)
+            
+            valid = np.isfinite(scores)
+            self.neighbor_ids[rows] = np.where(valid, candidates, -1)
+            self.neighbor_scores[rows] = np.where(valid, scores, 0)
+    
+    def _inverse_norms(self):
+        return np.divide(
+            1.0, self.user_norms,
+            out=np.zeros_like(self.user_norms),
+            where=self.user_norms > 0
+        )
+    
+    def _normalized_matrix(self):
+        """Row-normalised interaction matrix, so X @ X.T is cosine similarity"""
+        return sparse.diags(self._inverse_norms()) @ self.user_item_matrix
+    
+    def _mean_cosine_similarity(self):
+        """
+        Mean of the full cosine similarity matrix, computed in O(nnz)
+        
+        sum(X X^T) == ||X^T 1||^2 for the row-normalised matrix X, so the
+        n_users x n_users product never has to be formed.
+        """
+        n_users = self.user_item_matrix.shape[0]
+        if n_users == 0:
+            return 0.0
+        column_sums = np.asarray(self._normalized_matrix().sum(axis=0)).ravel()
+        return float(np.dot(column_sums, column_sums) / (n_users * n_users))
+    
+    def _build_neighbor_table(self, block_size=1024):
+        """
+        Precompute the top-K most similar users for every user
+        
+        Similarities are computed one block of rows at a time as a sparse
+        product, so only the block's non-zero similarities are ever held in
+        memory. The result is two fixed-width (n_users, K) arrays of neighbour
+        row indices (-1 padded) and cosine scores, sorted best first.
+        """
+        n_users = self.user_item_matrix.shape[0]
+        k = self.n_neighbors
+        
+        self.neighbor_ids = np.full((n_users, k), -1, dtype=np.int32)
+        self.neighbor_scores = np.zeros((n_users, k), dtype=np.float32)
+        
+        normalized = self._normalized_matrix().tocsr()
+        normalized_t = normalized.T.tocsr()
+        
+        for block_start in range(0, n_users, block_size):
+            block_rows = np.arange(block_start, min(block_start + block_size, n_users))
+            self._fill_neighbor_rows(block_rows, normalized[block_rows] @ normalized_t)
+    
+    def _fill_neighbor_rows(self, rows, similarity):
+        """Write the top-K of each row of a sparse similarity block into the neighbour table"""
+        similarity = similarity.tocsr()
+        k = self.n_neighbors
+        
+        for offset, row in enumerate(rows):
+            start, end = similarity.indptr[offset], similarity.indptr[offset + 1]
+            candidates = similarity.indices[start:end]
+            scores = similarity.data[start:end]
+            
+            keep = (candidates != row) & (scores > 0)
+            candidates, scores = candidates[keep], scores[keep]
+            
+            top = self._top_k(scores, k)
+            self.neighbor_ids[row] = -1
+            self.neighbor_scores[row] = 0
+            self.neighbor_ids[row, :len(top)] = candidates[top]
+            self.neighbor_scores[row, :len(top)] = scores[top]
+    
+    def index_items(self, posts):
+        """
+        Build the item embedding store and ANN index from post text
+        
+        Args:
+            posts: List of dicts with post_id and content
+        """
+        try:
+            if not posts:
+                raise ValueError('No posts to index')
+            
+            post_ids = np.fromiter((p['post_id'] for p in posts), dtype=np.int64, count=len(posts))
+            post_ids, first = np.unique(post_ids, return_index=True)
+            token_lists = [self.content_analyzer.tokenize(posts[i].get('content') or '') for i in first]
+            
+            embedder = HashedTfidfEmbedder(self.item_embedder.dim, self.item_embedder.document_frequency.n_features)
+            embedder.fit(token_lists)
+            embeddings = embedder.embed(token_lists)
+            
+            self.content_index = IVFIndex().build(embeddings)
+            self.item_embedder = embedder
+            self.item_features = embeddings
+            self.content_item_ids = post_ids
+            
+            return {
+                'n_items': len(post_ids),
+                'dim': embedder.dim,
+                'n_lists': len(self.content_index.centroids),
+                'status': 'indexed'
+            }
+        except Exception as e:
+            logger.error(f"Error indexing items: {str(e)}")
+            raise
+    
     def get_content_recommendations(self, item_id, limit=10):
         """
         Get similar content based on content features
+        
+        Queries the IVF index with the item's own embedding ("more like this").
         """
         try:
-            # Mock content-based recommendations
-            recommendations = [
-                {
-                    'item_id': i,
-                    'similarity_score': round(np.random.random(), 2),
-                    'matching_features': ['topic', 'style', 'length'][i % 3]
-                }
-                for i in range(1, limit + 1)
-                if i != item_id
-            ]
+            if self.content_index is None:
+                return []
             
-            recommendations.sort(key=lambda x: x['similarity_score'], reverse=True)
+            idx = int(np.searchsorted(self.content_item_ids, item_id))
+            if idx >= len(self.content_item_ids) or self.content_item_ids[idx] != item_id:
+                return []
             
-            return recommendations
+            rows, scores = self.content_index.search(self.item_features[idx], limit + 1)
+            
+            return [
+                {
+                    'item_id': int(self.content_item_ids[row]),
+                    'similarity_score': round(float(score), 4)
+                }
+                for row, score in zip(rows, scores)
+                if row != idx
+            ][:limit]
         except Exception as e:
             logger.error(f"Error in get_content_recommendations: {str(e)}")
             return []
+    
+    def save_model(self, model_dir):
+        """
+        Persist the trained model as one .npy file per array plus meta.json
+        
+        The files are written to a temporary directory which is then swapped
+        into place, so workers never observe a half-written model. Workers
+        that still have the previous files mapped keep reading them until
+        they reload.
+        """
+        try:
+            # Exclusions can arrive before the first train and are saved on their own
+            has_exclusions = bool(len(self.author_item_ids) or len(self.blocker_ids))
+            if self.user_item_matrix is None and self.content_index is None and not has_exclusions:
+                raise ValueError('No trained model to save')
+            
+            model_dir = os.path.abspath(model_dir)
+            staging_dir = f"{model_dir}.tmp-{os.getpid()}"
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            os.makedirs(staging_dir)
+            
+            meta = {
+                'format_version': MODEL_FORMAT_VERSION,
+                'saved_at': time.time(),
+                'n_neighbors': self.n_neighbors,
+                'watermark': self.watermark,
+                'interaction_weights': self.interaction_weights,
+                'decay_half_life_days': self.decay_half_life_days,
+                'decay_reference': self.decay_reference,
+                'has_user_model': self.user_item_matrix is not None,
+                'model_type': self.model_type,
+                'als_params': self.als_params,
+                'has_factor_model': self.factor_model is not None,
+                'has_content_model': self.content_index is not None,
+                'has_exclusions': has_exclusions
+            }
+            
+            arrays = {}
+            if self.user_item_matrix is not None:
+                matrix = self.user_item_matrix
+                # Store indices in the dtype scipy would pick itself, so loading never copies
+                index_dtype = np.int32 if max(matrix.nnz, matrix.shape[1]) < np.iinfo(np.int32).max else np.int64
+                meta['matrix_shape'] = list(matrix.shape)
+                arrays.update({
+                    'user_ids': self.user_ids,
+                    'item_ids': self.item_ids,
+                    'user_norms': self.user_norms,
+                    'item_popularity': self.item_popularity,
+                    'popular_items': self.popular_items,
+                    'neighbor_ids': self.neighbor_ids,
+                    'neighbor_scores': self.neighbor_scores,
+                    'matrix_indptr': matrix.indptr.astype(index_dtype, copy=False),
+                    'matrix_indices': matrix.indices.astype(index_dtype, copy=False),
+                    'matrix_data': matrix.data
+                })
+            
+            if self.factor_model is not None:
+                arrays.update({
+                    'user_factors': self.factor_model.user_factors,
+                    'item_factors': self.factor_model.item_factors
+                })
+            
+            if has_exclusions or self.items_by_author is not None:
+                if self.items_by_author is None:
+                    self._sync_item_authors()
+                arrays.update({name: getattr(self, name) for name in EXCLUSION_ARRAYS})
+            
+            if self.content_index is not None:
+                document_frequency = self.item_embedder.document_frequency
+                meta.update({
+                    'embedding_dim': self.item_embedder.dim,
+                    'n_documents': document_frequency.n_documents,
+                    'n_probe': self.content_index.n_probe
+                })
+                arrays.update({
+                    'content_item_ids': self.content_item_ids,
+                    'item_features': self.item_features,
+                    'document_frequency': document_frequency.counts,
+                    'index_centroids': self.content_index.centroids,
+                    'index_list_offsets': self.content_index.list_offsets,
+                    'index_ids': self.content_index.ids,
+                    'index_vectors': self.content_index.vectors
+                })
+            
+            for name, array in arrays.items():
+                np.save(os.path.join(staging_dir, f"{name}.npy"), np.ascontiguousarray(array))
+            
+            with open(os.path.join(staging_dir, 'meta.json'), 'w') as f:
+                json.dump(meta, f)
+            
+            retired_dir = f"{model_dir}.old-{os.getpid()}"
+            if os.path.exists(model_dir):
+                os.rename(model_dir, retired_dir)
+            os.rename(staging_dir, model_dir)
+            shutil.rmtree(retired_dir, ignore_errors=True)
+            
+            self.model_dir = model_dir
+            self._model_mtime = os.stat(os.path.join(model_dir, 'meta.json')).st_mtime_ns
+            
+            return {
+                'model_dir': model_dir,
+                'n_arrays': len(arrays),
+                'bytes': sum(int(a.nbytes) for a in arrays.values()),
+                'status': 'saved'
+            }
+        except Exception as e:
+            logger.error(f"Error saving model: {str(e)}")
+            raise
+    
+    def load_model(self, model_dir, mmap_mode='r'):
+        """
+        Load a model written by save_model
+        
+        With mmap_mode='r' the arrays are memory-mapped rather than read, so
+        loading takes milliseconds and every worker shares one page-cache
+        copy. Arrays are copied lazily if an incremental update needs to
+        modify them.
+        """
+        try:
+            model_dir = os.path.abspath(model_dir)
+            meta_path = os.path.join(model_dir, 'meta.json')
+            mtime = os.stat(meta_path).st_mtime_ns
+            with open(meta_path) as f:
+                meta = json.load(f)
+            
+            if meta.get('format_version') != MODEL_FORMAT_VERSION:
+                raise ValueError(f"Unsupported model format version: {meta.get('format_version')}")
+            
+            def load(name):
+                return np.load(os.path.join(model_dir, f"{name}.npy"), mmap_mode=mmap_mode)
+            
+            if meta['has_user_model']:
+                arrays = {name: load(name) for name in USER_MODEL_ARRAYS}
+                matrix = sparse.csr_matrix(
+                    (arrays['matrix_data'], arrays['matrix_indices'], arrays['matrix_indptr']),
+                    shape=tuple(meta['matrix_shape']),
+                    copy=False
+                )
+                
+                self.n_neighbors = meta['n_neighbors']
+                self.interaction_weights = meta['interaction_weights']
+                self.watermark = meta['watermark']
+                self.decay_half_life_days = meta['decay_half_life_days']
+                self.decay_reference = meta['decay_reference']
+                self.user_ids = arrays['user_ids']
+                self.item_ids = arrays['item_ids']
+                self.user_norms = arrays['user_norms']
+                self.item_popularity = arrays['item_popularity']
+                self.popular_items = arrays['popular_items']
+                self.neighbor_ids = arrays['neighbor_ids']
+                self.neighbor_scores = arrays['neighbor_scores']
+                self.user_item_matrix = matrix
+                self.model_type = meta['model_type']
+                self.als_params = meta['als_params']
+                self.factor_model = None
+                
+                if meta['has_factor_model']:
+                    factor_model = ImplicitALS(**self.als_params)
+                    factor_model.user_factors = load('user_factors')
+                    factor_model.item_factors = load('item_factors')
+                    factor_model.factors = factor_model.user_factors.shape[1]
+                    self.factor_model = factor_model
+            
+            if meta['has_user_model'] or meta.get('has_exclusions'):
+                for name in EXCLUSION_ARRAYS:
+                    setattr(self, name, load(name))
+                if not meta['has_user_model']:
+                    # Exclusions saved before the first train: align them with the in-memory items
+                    self._sync_item_authors()
+            
+            if meta['has_content_model']:
+                arrays = {name: load(name) for name in CONTENT_MODEL_ARRAYS}
+                
+                embedder = HashedTfidfEmbedder(meta['embedding_dim'], len(arrays['document_frequency']))
+                embedder.document_frequency.counts = arrays['document_frequency']
+                embedder.document_frequency.n_documents = meta['n_documents']
+                
+                index = IVFIndex(n_lists=len(arrays['index_centroids']), n_probe=meta['n_probe'])
+                index.centroids = arrays['index_centroids']
+                index.list_offsets = arrays['index_list_offsets']
+                index.ids = arrays['index_ids']
+                index.vectors = arrays['index_vectors']
+                
+                self.item_embedder = embedder
+                self.item_features = arrays['item_features']
+                self.content_item_ids = arrays['content_item_ids']
+                self.content_index = index
+            
+            self.model_dir = model_dir
+            self._model_mtime = mtime
+            self._last_refresh_check = time.monotonic()
+            
+            return {
+                'model_dir': model_dir,
+                'n_users': len(self.user_ids),
+                'n_items': len(self.item_ids),
+                'n_content_items': len(self.content_item_ids),
+                'watermark': self.watermark,
+                'status': 'loaded'
+            }
+        except Exception as e:
+            logger.error(f"Error loading model: {str(e)}")
+            raise
+    
+    def refresh(self, min_interval=5.0, force=False):
+        """
+        Reload the model if another worker has saved a newer one
+        
+        Costs one stat() call at most every `min_interval` seconds. A reload
+        that fails (e.g. racing a save) is logged and the current model keeps
+        serving. With force=True the throttle is skipped and load errors are
+        raised, as writers must start from the latest saved model.
+        """
+        if self.model_dir is None:
+            return False
+        
+        now = time.monotonic()
+        if not force and now - self._last_refresh_check < min_interval:
+            return False
+        self._last_refresh_check = now
+        
+        try:
+            mtime = os.stat(os.path.join(self.model_dir, 'meta.json')).st_mtime_ns
+        except OSError:
+            return False
+        
+        if mtime == self._model_mtime:
+            return False
+        
+        try:
+            self.load_model(self.model_dir)
+        except Exception as e:
+            if force:
+                raise
+            logger.warning(f"Keeping the current recommendation model: {str(e)}")
+            return False
+        return True
+    
+    def _ensure_writable(self):
+        """Copy memory-mapped (read-only) arrays before they are modified in place"""
+        for name in ('user_norms', 'item_popularity', 'neighbor_ids', 'neighbor_scores'):
+            array = getattr(self, name)
+            if array is not None and not array.flags.writeable:
+                setattr(self, name, np.array(array))
+        
+        if self.factor_model is not None:
+            for name in FACTOR_MODEL_ARRAYS:
+                array = getattr(self.factor_model, name)
+                if not array.flags.writeable:
+                    setattr(self.factor_model, name, np.array(array))
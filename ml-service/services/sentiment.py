@@ -0,0 +1,137 @@
+from itertools import chain, repeat
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Weighted sentiment lexicon: word -> strength in [-3, 3]
+SENTIMENT_LEXICON = {
+    # Positive
+    'good': 1.5, 'great': 2.0, 'awesome': 2.5, 'excellent': 2.5, 'amazing': 2.5,
+    'love': 2.5, 'loved': 2.5, 'loving': 2.0, 'loves': 2.5, 'best': 2.0,
+    'wonderful': 2.5, 'fantastic': 2.5, 'happy': 2.0, 'excited': 2.0, 'exciting': 2.0,
+    'beautiful': 2.0, 'perfect': 2.5, 'nice': 1.5, 'cool': 1.0, 'fun': 1.5,
+    'enjoy': 1.5, 'enjoyed': 1.5, 'glad': 1.5, 'proud': 2.0, 'grateful': 2.0,
+    'thankful': 2.0, 'thanks': 1.0, 'thank': 1.0, 'brilliant': 2.5, 'impressive': 2.0,
+    'incredible': 2.5, 'outstanding': 2.5, 'superb': 2.5, 'delightful': 2.0, 'pleased': 1.5,
+    'like': 0.5, 'liked': 1.0, 'helpful': 1.5, 'useful': 1.0, 'easy': 1.0,
+    'win': 2.0, 'won': 2.0, 'winning': 2.0, 'success': 2.0, 'successful': 2.0,
+    'congrats': 2.0, 'congratulations': 2.0, 'celebrate': 2.0, 'inspiring': 2.0, 'inspired': 2.0,
+    'recommend': 1.5, 'favorite': 2.0, 'favourite': 2.0, 'cute': 1.5,
+    'yay': 2.0, 'wow': 1.5, 'lol': 1.0, 'smooth': 1.0, 'fast': 0.5,
+    'innovative': 1.5, 'creative': 1.5, 'clean': 1.0, 'fresh': 1.0, 'calm': 1.0,
+    'hope': 1.0, 'hopeful': 1.5, 'positive': 1.5, 'better': 1.0, 'improved': 1.5,
+    # Negative
+    'bad': -1.5, 'terrible': -2.5, 'awful': -2.5, 'worst': -3.0, 'hate': -2.5,
+    'hated': -2.5, 'hates': -2.5, 'horrible': -2.5, 'poor': -1.5, 'disappointing': -2.0,
+    'disappointed': -2.0, 'sad': -2.0, 'angry': -2.0, 'ugly': -2.0, 'boring': -1.5,
+    'bored': -1.5, 'annoying': -2.0, 'annoyed': -2.0, 'broken': -1.5, 'bug': -1.0,
+    'buggy': -1.5, 'crash': -1.5, 'crashed': -1.5, 'fail': -2.0, 'failed': -2.0,
+    'failure': -2.0, 'slow': -1.0, 'wrong': -1.5, 'worse': -2.0, 'sucks': -2.0,
+    'stupid': -2.0, 'useless': -2.0, 'waste': -2.0, 'wasted': -2.0, 'problem': -1.0,
+    'problems': -1.0, 'issue': -0.5, 'issues': -0.5, 'lost': -1.5, 'lose': -1.5,
+    'losing': -1.5, 'sorry': -0.5, 'unfortunately': -1.5, 'upset': -2.0, 'worried': -1.5,
+    'scary': -1.5, 'afraid': -1.5, 'tired': -1.0, 'sick': -1.5, 'pain': -2.0,
+    'hurt': -2.0, 'cry': -1.5, 'crying': -1.5, 'mess': -1.5, 'messy': -1.0,
+    'confusing': -1.5, 'confused': -1.0, 'frustrating': -2.0, 'frustrated': -2.0, 'hard': -0.5,
+    'difficult': -1.0, 'disgusting': -3.0, 'scam': -3.0, 'spam': -2.0, 'fake': -2.0,
+}
+
+NEGATION_WORDS = frozenset({
+    'not', 'no', 'never', 'none', 'nobody', 'nothing', 'neither', 'nor', 'without',
+    'dont', 'doesnt', 'didnt', 'isnt', 'wasnt', 'arent', 'werent', 'cant', 'cannot',
+    'couldnt', 'wont', 'wouldnt', 'shouldnt', 'hardly', 'barely'
+})
+
+# A negated word flips sign and is weakened ("not bad" is mildly positive)
+NEGATION_SCALE = -0.75
+NEGATION_WINDOW = 3
+
+
+class SentimentLexicon:
+    """
+    Lexicon sentiment scorer compiled for batch scoring
+    
+    Words are compiled into a token -> id hash table with a parallel weight
+    array (id 0 means "not in the lexicon"). A batch of tokenized posts is
+    flattened into one id array, negation scope is resolved with a running
+    maximum, and per-post totals come out of np.bincount, so the only
+    per-token Python work is the dict lookup.
+    """
+    
+    def __init__(self, lexicon=None, negations=NEGATION_WORDS, negation_window=NEGATION_WINDOW):
+        lexicon = SENTIMENT_LEXICON if lexicon is None else lexicon
+        self.negation_window = negation_window
+        
+        vocabulary = list(lexicon) + sorted(set(negations) - set(lexicon))
+        self.token_ids = {token: idx for idx, token in enumerate(vocabulary, start=1)}
+        
+        self.weights = np.zeros(len(vocabulary) + 1, dtype=np.float32)
+        self.weights[1:len(lexicon) + 1] = list(lexicon.values())
+        
+        self.is_negation = np.zeros(len(vocabulary) + 1, dtype=bool)
+        for token in negations:
+            self.is_negation[self.token_ids[token]] = True
+    
+    def score_batch(self, token_lists):
+        """
+        Score many tokenized posts at once
+        
+        Returns a list of dicts with label, score, compound, positive_words
+        and negative_words, in input order.
+        """
+        n_docs = len(token_lists)
+        if n_docs == 0:
+            return []
+        
+        lengths = np.fromiter((len(tokens) for tokens in token_lists), dtype=np.int64, count=n_docs)
+        total = int(lengths.sum())
+        
+        ids = np.fromiter(
+            map(self.token_ids.get, chain.from_iterable(token_lists), repeat(0)),
+            dtype=np.int64,
+            count=total
+        )
+        
+        docs = np.repeat(np.arange(n_docs), lengths)
+        positions = np.arange(total)
+        doc_starts = np.repeat(np.cumsum(lengths) - lengths, lengths)
+        
+        # Position of the most recent negation word at or before each token
+        last_negation = np.maximum.accumulate(np.where(self.is_negation[ids], positions, -1))
+        negated = (
+            (last_negation >= doc_starts)
+            & (positions > last_negation)
+            & (positions - last_negation <= self.negation_window)
+        )
+        
+        signed = self.weights[ids] * np.where(negated, NEGATION_SCALE, 1.0)
+        
+        positive_total = np.bincount(docs, weights=np.maximum(signed, 0), minlength=n_docs)
+        negative_total = np.bincount(docs, weights=np.maximum(-signed, 0), minlength=n_docs)
+        positive_count = np.bincount(docs, weights=signed > 0, minlength=n_docs).astype(np.int64)
+        negative_count = np.bincount(docs, weights=signed < 0, minlength=n_docs).astype(np.int64)
+        
+        net = positive_total - negative_total
+        # Strength relative to post length, capped at 1 (an average word weighs about 2)
+        strength = np.minimum(np.abs(net) / np.maximum(lengths, 1) * 5, 1.0)
+        compound = net / np.sqrt(net * net + 15.0)
+        
+        results = []
+        for i in range(n_docs):
+            if net[i] > 0:
+                label, score = 'positive', strength[i]
+            elif net[i] < 0:
+                label, score = 'negative', strength[i]
+            else:
+                label, score = 'neutral', 0.5
+            
+            results.append({
+                'label': label,
+                'score': round(float(score), 2),
+                'compound': round(float(compound[i]), 3),
+                'positive_words': int(positive_count[i]),
+                'negative_words': int(negative_count[i])
+            })
+        
+        return results
@@ -0,0 +1,285 @@
+import hashlib
+import heapq
+import math
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+MASK64 = (1 << 64) - 1
+
+_GOLDEN_GAMMA = np.uint64(0x9E3779B97F4A7C15)
+_MIX1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX2 = np.uint64(0x94D049BB133111EB)
+_SHIFT30, _SHIFT27, _SHIFT31 = np.uint64(30), np.uint64(27), np.uint64(31)
+
+
+def splitmix64(values):
+    """
+    SplitMix64 finalizer over a uint64 array
+    
+    Cheap, well-mixed 64-bit hashing; every output bit depends on every input bit.
+    """
+    z = np.asarray(values, dtype=np.uint64) + _GOLDEN_GAMMA
+    z = (z ^ (z >> _SHIFT30)) * _MIX1
+    z = (z ^ (z >> _SHIFT27)) * _MIX2
+    return z ^ (z >> _SHIFT31)
+
+
+def hash_keys(keys):
+    """
+    Stable 64-bit hashes for string or integer keys
+    
+    Integers are mixed with SplitMix64 directly; strings are first reduced to
+    64 bits with BLAKE2b so hashes agree across processes and restarts.
+    """
+    keys = list(keys)
+    values = np.fromiter(
+        (
+            key & MASK64 if isinstance(key, (int, np.integer))
+            else int.from_bytes(hashlib.blake2b(str(key).encode('utf-8'), digest_size=8).digest(), 'little')
+            for key in keys
+        ),
+        dtype=np.uint64,
+        count=len(keys)
+    )
+    return splitmix64(values)
+
+
+class CountMinSketch:
+    """
+    Count-Min Sketch frequency estimator with fixed memory
+    
+    Memory is depth * width 32-bit counters regardless of how many distinct
+    keys are seen. Estimates never undercount, and for a stream of total N:
+    
+        estimate <= true + epsilon * N   with probability >= 1 - delta
+        epsilon = e / width,  delta = exp(-depth)
+    
+    Sketches of the same shape and seed are linear: they can be added and
+    subtracted, which is how sliding windows are maintained.
+    """
+    
+    def __init__(self, width=1024, depth=4, seed=0):
+        self.width = width
+        self.depth = depth
+        self.seed = seed
+        self.table = np.zeros((depth, width), dtype=np.int32)
+        self.total = 0
+        self._rows = np.arange(depth)[:, None]
+        # One independent hash per row: SplitMix64 of the key hash xor a row seed
+        self._row_seeds = splitmix64(np.arange(depth, dtype=np.uint64) + np.uint64(seed * depth + 1))
+    
+    @classmethod
+    def from_error(cls, epsilon, delta, seed=0):
+        """Smallest sketch meeting the given (epsilon, delta) error bound"""
+        return cls(
+            width=int(math.ceil(math.e / epsilon)),
+            depth=int(math.ceil(math.log(1.0 / delta))),
+            seed=seed
+        )
+    
+    @property
+    def epsilon(self):
+        return math.e / self.width
+    
+    @property
+    def delta(self):
+        return math.exp(-self.depth)
+    
+    @property
+    def memory_bytes(self):
+        return self.table.nbytes
+    
+    def columns(self, key_hashes):
+        """Column of each key in every row, shape (depth, n_keys)"""
+        key_hashes = np.asarray(key_hashes, dtype=np.uint64)
+        mixed = splitmix64(key_hashes[None, :] ^ self._row_seeds[:, None])
+        return (mixed % np.uint64(self.width)).astype(np.int64)
+    
+    def add(self, key, count=1):
+        self.add_hashes(hash_keys([key]), count)
+    
+    def add_hashes(self, key_hashes, counts=1):
+        """Add counts for many pre-hashed keys in one vectorized update"""
+        self.add_columns(self.columns(key_hashes), counts)
+    
+    def add_columns(self, columns, counts=1):
+        """Add counts at precomputed columns (see columns()), shared by same-shaped sketches"""
+        # add.at, since two keys can share a column within a row
+        if np.isscalar(counts):
+            np.add.at(self.table, (self._rows, columns), counts)
+            self.total += int(counts) * columns.shape[1]
+        else:
+            counts = np.asarray(counts, dtype=np.int32)
+            np.add.at(self.table, (self._rows, columns), counts[None, :])
+            self.total += int(counts.sum())
+    
+    def estimate(self, key):
+        return int(self.estimate_hashes(hash_keys([key]))[0])
+    
+    def estimate_hashes(self, key_hashes):
+        """Estimated counts for many pre-hashed keys"""
+        return self.estimate_columns(self.columns(key_hashes))
+    
+    def estimate_columns(self, columns):
+        return self.table[self._rows, columns].min(axis=0)
+    
+    def merge(self, other, sign=1):
+        """Add (or with sign=-1, subtract) another sketch of the same shape and seed"""
+        if (other.width, other.depth, other.seed) != (self.width, self.depth, self.seed):
+            raise ValueError('Count-Min sketches must share width, depth and seed to merge')
+        if sign >= 0:
+            self.table += other.table
+            self.total += other.total
+        else:
+            self.table -= other.table
+            self.total -= other.total
+    
+    def clear(self):
+        self.table[:] = 0
+        self.total = 0
+
+
+class SpaceSaving:
+    """
+    Space-Saving heavy-hitter summary (Metwally et al.) over at most `capacity` keys
+    
+    For a stream of total N, every key with true count > N / capacity is
+    monitored, and each monitored key satisfies
+    
+        count - error <= true count <= count,   error <= N / capacity
+    
+    The minimum counter is found with a lazily cleaned heap.
+    """
+    
+    def __init__(self, capacity=100):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        self.total = 0
+        self._heap = []
+    
+    def offer(self, key, count=1):
+        """
+        Count a key
+        
+        Returns (evicted_key, evicted_count) when a monitored key had to make
+        room for this one, otherwise None.
+        """
+        self.total += count
+        evicted = None
+        
+        if key in self.counts:
+            self.counts[key] += count
+        elif len(self.counts) < self.capacity:
+            self.counts[key] = count
+            self.errors[key] = 0
+        else:
+            min_key, min_count = self._pop_min()
+            del self.counts[min_key]
+            del self.errors[min_key]
+            evicted = (min_key, min_count)
+            # The newcomer inherits the evicted count as its possible overestimate
+            self.counts[key] = min_count + count
+            self.errors[key] = min_count
+        
+        heapq.heappush(self._heap, (self.counts[key], key))
+        if len(self._heap) > 4 * self.capacity + 64:
+            self._heap = [(value, monitored) for monitored, value in self.counts.items()]
+            heapq.heapify(self._heap)
+        
+        return evicted
+    
+    def top(self, k):
+        """Top monitored keys as (key, count, error), highest count first"""
+        return [
+            (key, count, self.errors[key])
+            for key, count in heapq.nlargest(k, self.counts.items(), key=lambda item: item[1])
+        ]
+    
+    def _pop_min(self):
+        while True:
+            count, key = heapq.heappop(self._heap)
+            if self.counts.get(key) == count:
+                return key, count
+
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct counter (Flajolet et al.) with 2**precision registers
+    
+    At the default precision of 12 a sketch is 4 KiB and the standard error of
+    count() is about 1.04 / sqrt(4096) = 1.6%, whatever the number of distinct
+    keys. Sketches with equal precision merge by taking register maxima, so
+    time buckets and per-worker sketches combine without loss.
+    """
+    
+    def __init__(self, precision=12, registers=None):
+        if not 4 <= precision <= 18:
+            raise ValueError('HyperLogLog precision must be between 4 and 18')
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8) if registers is None else registers
+    
+    @property
+    def memory_bytes(self):
+        return self.registers.nbytes
+    
+    def add(self, key):
+        self.add_hashes(hash_keys([key]))
+    
+    def add_many(self, keys):
+        self.add_hashes(hash_keys(keys))
+    
+    def add_hashes(self, key_hashes):
+        """Add many pre-hashed keys in one vectorized update"""
+        key_hashes = np.asarray(key_hashes, dtype=np.uint64)
+        if key_hashes.size == 0:
+            return
+        
+        suffix_bits = 64 - self.precision
+        index = (key_hashes >> np.uint64(suffix_bits)).astype(np.int64)
+        suffix = key_hashes & np.uint64((1 << suffix_bits) - 1)
+        
+        # bit_length of the suffix, exact through float64 one 32-bit half at a time
+        high = (suffix >> np.uint64(32)).astype(np.float64)
+        low = (suffix & np.uint64(0xFFFFFFFF)).astype(np.float64)
+        bit_length = np.where(high > 0, np.frexp(high)[1] + 32, np.frexp(low)[1])
+        rank = (suffix_bits - bit_length + 1).astype(np.uint8)
+        
+        np.maximum.at(self.registers, index, rank)
+    
+    def count(self):
+        """Estimated number of distinct keys"""
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        
+        # Small-range correction: linear counting while registers are still empty
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * np.log(m / zeros)
+        
+        return int(round(estimate))
+    
+    def merge(self, other):
+        """Union with another sketch of the same precision, in place"""
+        if other.precision != self.precision:
+            raise ValueError('HyperLogLog sketches must share precision to merge')
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+    
+    def copy(self):
+        return HyperLogLog(self.precision, self.registers.copy())
+    
+    def to_bytes(self):
+        """Precision byte followed by the raw registers"""
+        return bytes([self.precision]) + self.registers.tobytes()
+    
+    @classmethod
+    def from_bytes(cls, data):
+        precision = data[0]
+        registers = np.frombuffer(data[1:], dtype=np.uint8).copy()
+        if len(registers) != 1 << precision:
+            raise ValueError('Corrupt HyperLogLog sketch')
+        return cls(precision, registers)
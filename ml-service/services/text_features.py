@@ -0,0 +1,172 @@
+import os
+import zlib
+import numpy as np
+import logging
+
+from .sketches import hash_keys
+
+logger = logging.getLogger(__name__)
+
+# Counted document ids remembered for deduplication (8 bytes each)
+MAX_DOCUMENT_IDS = 1000000
+
+
+def hash_tokens(tokens):
+    """
+    Hash tokens to stable 32-bit ids
+    
+    Uses CRC32 rather than the built-in hash() so ids agree across processes,
+    gunicorn workers and restarts.
+    """
+    return np.fromiter(
+        (zlib.crc32(token.encode('utf-8')) for token in tokens),
+        dtype=np.uint32,
+        count=len(tokens)
+    ).astype(np.int64)
+
+
+class DocumentFrequencyTable:
+    """
+    Streaming document frequencies kept as a fixed-size hashed count array
+    
+    Documents counted with an id are counted once per id: the hashes of the
+    most recent `max_document_ids` ids are kept (and saved) so retries and
+    re-published posts are skipped.
+    """
+    
+    def __init__(self, n_features=2 ** 18, max_document_ids=MAX_DOCUMENT_IDS):
+        self.n_features = n_features
+        self.counts = np.zeros(n_features, dtype=np.uint32)
+        self.n_documents = 0
+        self.max_document_ids = max_document_ids
+        # Id hashes in the order they were counted, and sorted for lookups
+        self.document_ids = np.zeros(0, dtype=np.uint64)
+        self._sorted_ids = self.document_ids
+    
+    def update(self, token_hashes):
+        """Count one document, given the hashes of its tokens"""
+        features = np.unique(np.asarray(token_hashes) % self.n_features)
+        self.counts[features] += 1
+        self.n_documents += 1
+    
+    def update_batch(self, token_hash_lists, document_ids=None):
+        """
+        Count a batch of documents in one vectorized pass
+        
+        With document_ids (one per document), documents whose id was already
+        counted, here or earlier in the batch, are skipped.
+        
+        Returns the number of documents counted.
+        """
+        if document_ids is not None:
+            id_hashes = hash_keys([str(document_id) for document_id in document_ids])
+            _, first = np.unique(id_hashes, return_index=True)
+            first = np.sort(first)
+            first = first[~self.has_ids(id_hashes[first])]
+            token_hash_lists = [token_hash_lists[i] for i in first]
+            self._add_ids(id_hashes[first])
+        if not token_hash_lists:
+            return 0
+        features = np.concatenate([
+            np.unique(np.asarray(hashes) % self.n_features) for hashes in token_hash_lists
+        ])
+        self.counts += np.bincount(features, minlength=self.n_features).astype(np.uint32)
+        self.n_documents += len(token_hash_lists)
+        return len(token_hash_lists)
+    
+    def has_ids(self, id_hashes):
+        """Whether each document id hash has been counted"""
+        positions = np.searchsorted(self._sorted_ids, id_hashes)
+        found = positions < len(self._sorted_ids)
+        found[found] = self._sorted_ids[positions[found]] == id_hashes[found]
+        return found
+    
+    def _add_ids(self, id_hashes):
+        if not len(id_hashes):
+            return
+        self.document_ids = np.concatenate([self.document_ids, id_hashes])
+        if len(self.document_ids) > self.max_document_ids:
+            # Forget the oldest tenth at once, so the sorted copy is rebuilt rarely
+            self.document_ids = self.document_ids[-(self.max_document_ids * 9 // 10):]
+            self._sorted_ids = np.sort(self.document_ids)
+        else:
+            id_hashes = np.sort(id_hashes)
+            positions = np.searchsorted(self._sorted_ids, id_hashes)
+            self._sorted_ids = np.insert(self._sorted_ids, positions, id_hashes)
+    
+    def idf(self, token_hashes):
+        """Smoothed inverse document frequency for each token hash"""
+        df = self.counts[np.asarray(token_hashes) % self.n_features].astype(np.float32)
+        return np.log((1.0 + self.n_documents) / (1.0 + df)) + 1.0
+    
+    def save(self, path):
+        """Write the table atomically, so readers never see a partial file"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        staging_path = f"{path}.tmp-{os.getpid()}"
+        with open(staging_path, 'wb') as f:
+            np.savez(f, counts=self.counts, n_documents=self.n_documents, document_ids=self.document_ids)
+        os.replace(staging_path, path)
+    
+    def load(self, path):
+        with np.load(path) as saved:
+            counts = saved['counts']
+            if len(counts) != self.n_features:
+                raise ValueError('Saved document frequency table uses a different n_features')
+            self.counts = counts.astype(np.uint32)
+            self.n_documents = int(saved['n_documents'])
+            if 'document_ids' in saved.files:
+                self.document_ids = saved['document_ids'].astype(np.uint64)
+                self._sorted_ids = np.sort(self.document_ids)
+        return self
+
+
+class HashedTfidfEmbedder:
+    """
+    Dense item embeddings from hashed TF-IDF text features
+    
+    Each distinct token contributes (1 + log tf) * idf to one of `dim`
+    buckets with a hash-derived sign (the hashing trick), so inner products
+    between embeddings approximate TF-IDF cosine similarity while every post
+    costs only `dim` floats.
+    """
+    
+    def __init__(self, dim=256, n_features=2 ** 18):
+        self.dim = dim
+        self.document_frequency = DocumentFrequencyTable(n_features)
+    
+    def fit(self, token_lists):
+        """Add documents to the document-frequency statistics"""
+        self.document_frequency.update_batch([hash_tokens(tokens) for tokens in token_lists])
+        return self
+    
+    def embed(self, token_lists):
+        """Embed a batch of tokenized documents into L2-normalised float32 rows"""
+        n_docs = len(token_lists)
+        embeddings = np.zeros((n_docs, self.dim), dtype=np.float32)
+        if n_docs == 0:
+            return embeddings
+        
+        hashes = [hash_tokens(tokens) for tokens in token_lists]
+        lengths = np.fromiter((len(h) for h in hashes), dtype=np.int64, count=n_docs)
+        if lengths.sum() == 0:
+            return embeddings
+        
+        # Count (document, token) pairs in one pass over a combined 64-bit key
+        keys = (np.repeat(np.arange(n_docs, dtype=np.int64), lengths) << 32) | np.concatenate(hashes)
+        keys, counts = np.unique(keys, return_counts=True)
+        docs = keys >> 32
+        token_hashes = keys & 0xFFFFFFFF
+        
+        weights = (1.0 + np.log(counts)) * self.document_frequency.idf(token_hashes)
+        signs = np.where((token_hashes >> 31) & 1, -1.0, 1.0)
+        buckets = docs * self.dim + token_hashes % self.dim
+        
+        embeddings += np.bincount(
+            buckets, weights=weights * signs, minlength=n_docs * self.dim
+        ).reshape(n_docs, self.dim).astype(np.float32)
+        
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        np.divide(embeddings, norms, out=embeddings, where=norms > 0)
+        return embeddings
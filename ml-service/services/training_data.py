@@ -0,0 +1,164 @@
+from datetime import datetime, timezone
+import io
+import json
+import os
+import time
+import numpy as np
+import logging
+
+# Arrow IPC input is optional; .npz and JSON columns work without it
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+NPZ_CONTENT_TYPES = ('application/x-npz', 'application/octet-stream')
+ARROW_CONTENT_TYPES = ('application/vnd.apache.arrow.stream', 'application/vnd.apache.arrow.file')
+
+# Column name -> dtype used for training; interaction_type is kept as-is
+INTERACTION_COLUMNS = {
+    'user_id': np.int64,
+    'item_id': np.int64,
+    'weight': np.float32,
+    'timestamp': None,
+    'interaction_type': None
+}
+
+# How far ahead of this host's clock a client-supplied event time may be
+MAX_CLOCK_SKEW_SECONDS = 300
+
+
+def to_epoch_seconds(value):
+    """Convert an epoch (seconds or milliseconds) or ISO-8601 timestamp to epoch seconds"""
+    if value is None or value == '':
+        return np.nan
+    if isinstance(value, str):
+        try:
+            value = float(value)
+        except ValueError:
+            parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+            if parsed.tzinfo is None:
+                parsed = parsed.replace(tzinfo=timezone.utc)
+            return parsed.timestamp()
+    value = float(value)
+    # JavaScript Date.now() style millisecond timestamps
+    return value / 1000.0 if value > 1e11 else value
+
+
+def clamp_to_now(seconds, now=None):
+    """
+    Cap an event time at the current time plus MAX_CLOCK_SKEW_SECONDS
+    
+    Time windows only slide forward, so a single future-dated event (a
+    scheduled post, a bad client clock) would otherwise expire everything
+    recorded before it.
+    """
+    return min(seconds, (time.time() if now is None else now) + MAX_CLOCK_SKEW_SECONDS)
+
+
+def timestamps_to_epoch_seconds(values):
+    """Vectorized to_epoch_seconds for a whole timestamp column"""
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        seconds = values.astype('datetime64[ms]').astype(np.float64) / 1000.0
+        seconds[np.isnat(values)] = np.nan
+        return seconds
+    if np.issubdtype(values.dtype, np.number):
+        values = values.astype(np.float64)
+        return np.where(values > 1e11, values / 1000.0, values)
+    return np.fromiter((to_epoch_seconds(v) for v in values), dtype=np.float64, count=len(values))
+
+
+def _select_columns(get_column, names):
+    """Pick the known interaction columns out of a columnar container"""
+    columns = {}
+    for name in INTERACTION_COLUMNS:
+        if name in names:
+            columns[name] = get_column(name)
+    return columns
+
+
+def _read_bytes(body):
+    """Request bodies may arrive as bytes or as a non-seekable stream"""
+    return body if isinstance(body, (bytes, bytearray)) else body.read()
+
+
+def _read_npz(source):
+    with np.load(source, allow_pickle=False) as npz:
+        return _select_columns(lambda name: npz[name], npz.files)
+
+
+def _read_arrow(reader):
+    table = reader.read_all()
+    return _select_columns(
+        lambda name: table.column(name).to_numpy(),
+        table.column_names
+    )
+
+
+def read_interaction_columns(body=None, content_type=None, path=None, columns=None):
+    """
+    Read training interactions in a columnar format
+    
+    Accepts one of:
+        body + content_type: raw request bytes or stream, an .npz archive or an Arrow IPC stream/file
+        path: a local .npz, .arrow/.feather or .json file with the same columns
+        columns: a dict of parallel lists (columnar JSON)
+    
+    Returns a dict of arrays keyed by user_id, item_id and optionally weight,
+    interaction_type and timestamp.
+    """
+    if columns is not None:
+        result = _select_columns(lambda name: np.asarray(columns[name]), columns)
+    elif path is not None:
+        extension = os.path.splitext(path)[1].lower()
+        if extension == '.npz':
+            result = _read_npz(path)
+        elif extension in ('.arrow', '.feather', '.ipc'):
+            if not PYARROW_AVAILABLE:
+                raise ValueError('Arrow input requires pyarrow to be installed')
+            with pa.memory_map(path) as source:
+                result = _read_arrow(pa.ipc.open_file(source))
+        elif extension == '.json':
+            with open(path) as f:
+                data = json.load(f)
+            result = _select_columns(lambda name: np.asarray(data[name]), data)
+        else:
+            raise ValueError(f'Unsupported training file type: {extension}')
+    elif body is not None:
+        content_type = (content_type or '').split(';')[0].strip().lower()
+        if content_type in ARROW_CONTENT_TYPES:
+            if not PYARROW_AVAILABLE:
+                raise ValueError('Arrow input requires pyarrow to be installed')
+            if content_type.endswith('.stream'):
+                # The stream format can be decoded batch by batch straight from the socket
+                result = _read_arrow(pa.ipc.open_stream(body))
+            else:
+                result = _read_arrow(pa.ipc.open_file(pa.BufferReader(_read_bytes(body))))
+        elif content_type in NPZ_CONTENT_TYPES:
+            result = _read_npz(io.BytesIO(_read_bytes(body)))
+        else:
+            raise ValueError(f'Unsupported training content type: {content_type}')
+    else:
+        raise ValueError('No training data source given')
+    
+    for required in ('user_id', 'item_id'):
+        if required not in result:
+            raise ValueError(f'Training data is missing the {required} column')
+    
+    n = len(result['user_id'])
+    for name, values in result.items():
+        if len(values) != n:
+            raise ValueError(f'Column {name} has {len(values)} rows, expected {n}')
+        dtype = INTERACTION_COLUMNS[name]
+        if dtype is not None:
+            result[name] = np.asarray(values, dtype=dtype)
+    
+    if 'timestamp' in result:
+        result['timestamp'] = timestamps_to_epoch_seconds(result['timestamp'])
+    
+    return result
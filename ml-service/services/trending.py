@@ -0,0 +1,433 @@
+import heapq
+import threading
+import time
+import logging
+
+import numpy as np
+
+from .training_data import clamp_to_now, to_epoch_seconds
+from .sketches import CountMinSketch, SpaceSaving, hash_keys
+
+logger = logging.getLogger(__name__)
+
+# Supported trending windows, in hourly buckets
+WINDOW_HOURS = {
+    '24h': 24,
+    '7d': 24 * 7,
+    '30d': 24 * 30
+}
+
+TRENDING_BACKENDS = ('exact', 'sketch')
+
+# Average sentiment beyond which a topic is labelled positive/negative
+SENTIMENT_THRESHOLD = 0.05
+
+
+def normalize_topic(topic):
+    """Case-fold a hashtag/topic and strip the leading '#'"""
+    return str(topic).strip().lstrip('#').lower()
+
+
+class WindowCounter:
+    """
+    Per-topic counts for one sliding window with an incrementally maintained top-N heap
+    
+    Every count change pushes a fresh (-count, topic) entry; entries whose count
+    no longer matches are discarded lazily when they reach the top, and the heap
+    is rebuilt once stale entries dominate. A top-N query therefore touches about
+    `limit` entries instead of rescanning every topic.
+    """
+    
+    def __init__(self):
+        self.counts = {}
+        self.sentiment = {}
+        self._heap = []
+    
+    def add(self, topic, count, sentiment=0.0):
+        """Add (or, with a negative count, remove) mentions of a topic"""
+        new_count = self.counts.get(topic, 0) + count
+        
+        if new_count <= 0:
+            self.counts.pop(topic, None)
+            self.sentiment.pop(topic, None)
+            return
+        
+        self.counts[topic] = new_count
+        self.sentiment[topic] = self.sentiment.get(topic, 0.0) + sentiment
+        heapq.heappush(self._heap, (-new_count, topic))
+        
+        if len(self._heap) > 4 * len(self.counts) + 1024:
+            self._compact()
+    
+    def top(self, limit):
+        """Top topics as (topic, count) pairs, highest count first"""
+        result = []
+        seen = set()
+        
+        while self._heap and len(result) < limit:
+            neg_count, topic = heapq.heappop(self._heap)
+            if topic in seen or self.counts.get(topic) != -neg_count:
+                continue  # stale or duplicate entry
+            seen.add(topic)
+            result.append((topic, -neg_count))
+        
+        # Live entries go back so the heap stays complete
+        for topic, count in result:
+            heapq.heappush(self._heap, (-count, topic))
+        
+        return result
+    
+    def clear(self):
+        self.counts.clear()
+        self.sentiment.clear()
+        self._heap = []
+    
+    def _compact(self):
+        self._heap = [(-count, topic) for topic, count in self.counts.items()]
+        heapq.heapify(self._heap)
+
+
+class ExactBucket:
+    """One hour of mentions with an exact counter per topic"""
+    
+    def __init__(self):
+        self.entries = {}  # topic -> [count, sentiment_sum]
+    
+    def add(self, topic, count, sentiment):
+        """Count a topic; returns the (topic, count, sentiment) changes to apply to windows"""
+        entry = self.entries.setdefault(topic, [0, 0.0])
+        entry[0] += count
+        entry[1] += sentiment
+        return [(topic, count, sentiment)]
+    
+    def items(self):
+        return self.entries.items()
+
+
+class SketchBucket:
+    """
+    One hour of mentions in fixed memory
+    
+    A Space-Saving summary monitors at most `capacity` topics (with their
+    sentiment), and a Count-Min Sketch estimates the frequency of any topic.
+    """
+    
+    def __init__(self, capacity, width, depth):
+        self.summary = SpaceSaving(capacity)
+        self.sentiment = {}
+        self.sketch = CountMinSketch(width, depth)
+    
+    def add(self, topic, count, sentiment):
+        """Count a topic; returns the (topic, count, sentiment) changes to apply to windows"""
+        before = self.summary.counts.get(topic, 0)
+        evicted = self.summary.offer(topic, count)
+        
+        changes = []
+        if evicted is not None:
+            evicted_topic, evicted_count = evicted
+            changes.append((evicted_topic, -evicted_count, -self.sentiment.pop(evicted_topic, 0.0)))
+        
+        self.sentiment[topic] = self.sentiment.get(topic, 0.0) + sentiment
+        changes.append((topic, self.summary.counts[topic] - before, sentiment))
+        return changes
+    
+    def items(self):
+        for topic, count in self.summary.counts.items():
+            yield topic, (count, self.sentiment.get(topic, 0.0))
+
+
+class TrendingEngine:
+    """
+    Streaming trending-topics counter over sliding 24h/7d/30d windows
+    
+    Mentions are kept in hourly buckets. Each window holds running counts for
+    its current span and for the span before it (for growth), and when the
+    clock moves forward the bucket crossing each boundary is subtracted from
+    one and added to the other, so nothing is recounted.
+    
+    The 'exact' backend keeps a counter for every topic ever seen inside the
+    retention period. The 'sketch' backend bounds memory for unbounded
+    hashtag cardinality (typos, spam, one-offs): each hour keeps a
+    Space-Saving summary of `topic_capacity` topics plus a Count-Min Sketch,
+    so memory is fixed at roughly
+        
+        retention_hours * (topic_capacity entries + sketch_depth * sketch_width * 4 bytes)
+    
+    whatever the stream. The hourly Space-Saving summaries only nominate
+    candidates: any topic holding more than 1/topic_capacity of a window's
+    mentions holds that share in at least one hour, so it is monitored there
+    and always a candidate. Their summed counts can undercount (a topic
+    evicted during an hour loses that hour), so they are not reported.
+    Candidates are ranked by, and report, the window's Count-Min estimates:
+    for each topic
+        
+        true <= mentions <= true + e / sketch_width * window total
+        
+    with probability 1 - exp(-sketch_depth), and the same holds for
+    previous_mentions against the previous window.
+    """
+    
+    def __init__(self, windows=None, backend='exact', topic_capacity=100, sketch_width=512, sketch_depth=4):
+        if backend not in TRENDING_BACKENDS:
+            raise ValueError(f"Unsupported trending backend: {backend}")
+        
+        self.window_hours = dict(windows or WINDOW_HOURS)
+        # Two spans of the longest window: current plus previous
+        self.retention_hours = 2 * max(self.window_hours.values())
+        self.backend = backend
+        self.topic_capacity = topic_capacity
+        self.sketch_width = sketch_width
+        self.sketch_depth = sketch_depth
+        
+        self.buckets = {}  # hour -> ExactBucket / SketchBucket
+        self.current = {window: WindowCounter() for window in self.window_hours}
+        if backend == 'sketch':
+            # Window sketches are sums of the hourly sketches they cover
+            self.current_sketch = {window: CountMinSketch(sketch_width, sketch_depth) for window in self.window_hours}
+            self.previous_sketch = {window: CountMinSketch(sketch_width, sketch_depth) for window in self.window_hours}
+            # Sketch columns of every candidate topic, so queries never rehash
+            self.topic_columns = {}
+        else:
+            self.previous = {window: {} for window in self.window_hours}
+        self.current_hour = None
+        self._lock = threading.Lock()
+    
+    def ingest(self, topics, timestamp=None, sentiment=0.0):
+        """
+        Record the topics/hashtags of one post
+        
+        Args:
+            topics: hashtags or topics, with or without '#'
+            timestamp: epoch seconds/milliseconds or ISO-8601 (default: now);
+                times in the future count as now
+            sentiment: post sentiment in [-1, 1], tracked per topic
+        """
+        try:
+            seconds = time.time() if timestamp is None else clamp_to_now(to_epoch_seconds(timestamp))
+            hour = int(seconds // 3600)
+            # A post counts once per topic, however often it repeats the tag
+            unique_topics = list({normalize_topic(topic) for topic in topics} - {''})
+            if not unique_topics:
+                return
+            
+            with self._lock:
+                self._advance(hour)
+                self._add(hour, unique_topics, sentiment)
+        except Exception as e:
+            logger.error(f"Error ingesting trending topics: {str(e)}")
+            raise
+    
+    def ingest_batch(self, events):
+        """Record many posts: dicts with 'hashtags' (or 'topics'), 'timestamp' and 'sentiment'"""
+        for event in events:
+            self.ingest(
+                event.get('hashtags', event.get('topics', [])),
+                event.get('timestamp'),
+                float(event.get('sentiment') or 0.0)
+            )
+    
+    def get_trending(self, timeframe='24h', limit=10, now=None):
+        """
+        Top topics for a window with growth against the previous window
+        
+        Args:
+            timeframe: '24h', '7d', '30d'
+            limit: number of trending topics to return
+            now: evaluation time in epoch seconds (default: current time)
+        """
+        if timeframe not in self.window_hours:
+            raise ValueError(f"Unsupported timeframe: {timeframe}")
+        
+        try:
+            with self._lock:
+                self._advance(int((time.time() if now is None else now) // 3600))
+                
+                window = self.current[timeframe]
+                
+                if self.backend == 'sketch':
+                    top, previous_counts = self._sketch_top(timeframe, limit)
+                else:
+                    top = window.top(limit)
+                    previous_counts = [self.previous[timeframe].get(topic, 0) for topic, _ in top]
+                
+                trending = []
+                for (topic, mentions), previous_mentions in zip(top, previous_counts):
+                    previous_mentions = int(previous_mentions)
+                    if previous_mentions:
+                        growth = (mentions - previous_mentions) / previous_mentions * 100
+                    else:
+                        growth = 100.0
+                    
+                    sentiment_score = window.sentiment.get(topic, 0.0) / max(mentions, 1)
+                    if sentiment_score > SENTIMENT_THRESHOLD:
+                        sentiment = 'positive'
+                    elif sentiment_score < -SENTIMENT_THRESHOLD:
+                        sentiment = 'negative'
+                    else:
+                        sentiment = 'neutral'
+                    
+                    trending.append({
+                        'topic': f'#{topic}',
+                        'mentions': mentions,
+                        'previous_mentions': previous_mentions,
+                        'growth': round(growth, 1),
+                        'sentiment': sentiment,
+                        'sentiment_score': round(sentiment_score, 3)
+                    })
+                
+                return trending
+        except Exception as e:
+            logger.error(f"Error getting trending topics: {str(e)}")
+            raise
+    
+    def _sketch_top(self, timeframe, limit):
+        """
+        Rank every candidate topic of a window by its Count-Min estimate
+        
+        Returns ([(topic, mentions)], previous mentions), best first.
+        """
+        candidates = list(self.current[timeframe].counts)
+        if not candidates or limit <= 0:
+            return [], []
+        
+        columns = np.stack([self.topic_columns[topic] for topic in candidates], axis=1)
+        estimates = self.current_sketch[timeframe].estimate_columns(columns)
+        
+        if len(candidates) > limit:
+            top = np.argpartition(-estimates, limit - 1)[:limit]
+        else:
+            top = np.arange(len(candidates))
+        # Highest estimate first, ties by topic so results are stable
+        top = sorted(top.tolist(), key=lambda i: (-int(estimates[i]), candidates[i]))
+        
+        previous_counts = self.previous_sketch[timeframe].estimate_columns(columns[:, top])
+        return [(candidates[i], int(estimates[i])) for i in top], previous_counts
+    
+    def stats(self):
+        """Backend configuration and current memory footprint"""
+        with self._lock:
+            stats = {
+                'backend': self.backend,
+                'buckets': len(self.buckets),
+                'window_topics': {window: len(counter.counts) for window, counter in self.current.items()}
+            }
+            if self.backend == 'sketch':
+                stats.update({
+                    'topic_capacity': self.topic_capacity,
+                    'sketch_width': self.sketch_width,
+                    'sketch_depth': self.sketch_depth,
+                    'sketch_bytes': sum(bucket.sketch.memory_bytes for bucket in self.buckets.values())
+                        + 2 * len(self.window_hours) * self.sketch_width * self.sketch_depth * 4,
+                    'max_bucket_sketch_bytes': self.retention_hours * self.sketch_width * self.sketch_depth * 4
+                })
+            return stats
+    
+    def _new_bucket(self):
+        if self.backend == 'sketch':
+            return SketchBucket(self.topic_capacity, self.sketch_width, self.sketch_depth)
+        return ExactBucket()
+    
+    def _add(self, hour, topics, sentiment):
+        """Count one mention of each topic in an hour's bucket and every window covering it"""
+        if self.current_hour is None:
+            self.current_hour = hour
+        
+        age = self.current_hour - hour
+        if age >= self.retention_hours:
+            return  # older than anything a window can still see
+        
+        bucket = self.buckets.get(hour)
+        if bucket is None:
+            bucket = self.buckets[hour] = self._new_bucket()
+        
+        changes = []
+        for topic in topics:
+            changes.extend(bucket.add(topic, 1, sentiment))
+        
+        if self.backend == 'sketch':
+            # Every sketch shares one shape and seed, so columns are hashed once per post
+            columns = bucket.sketch.columns(hash_keys(topics))
+            bucket.sketch.add_columns(columns)
+            for i, topic in enumerate(topics):
+                if topic not in self.topic_columns:
+                    self.topic_columns[topic] = columns[:, i].copy()
+        
+        for window, hours in self.window_hours.items():
+            if age < hours:
+                counter = self.current[window]
+                for changed_topic, changed_count, changed_sentiment in changes:
+                    counter.add(changed_topic, changed_count, changed_sentiment)
+                if self.backend == 'sketch':
+                    self.current_sketch[window].add_columns(columns)
+            elif age < 2 * hours:
+                if self.backend == 'sketch':
+                    self.previous_sketch[window].add_columns(columns)
+                else:
+                    previous = self.previous[window]
+                    for topic in topics:
+                        previous[topic] = previous.get(topic, 0) + 1
+    
+    def _advance(self, hour):
+        """Move the clock forward, sliding every window hour by hour"""
+        if self.current_hour is None or hour <= self.current_hour:
+            if self.current_hour is None:
+                self.current_hour = hour
+            return
+        
+        if hour - self.current_hour >= self.retention_hours:
+            # Every bucket has expired
+            self.buckets.clear()
+            for window in self.window_hours:
+                self.current[window].clear()
+                if self.backend == 'sketch':
+                    self.current_sketch[window].clear()
+                    self.previous_sketch[window].clear()
+                else:
+                    self.previous[window].clear()
+            if self.backend == 'sketch':
+                self.topic_columns = {}
+            self.current_hour = hour
+            return
+        
+        for step in range(self.current_hour + 1, hour + 1):
+            for window, hours in self.window_hours.items():
+                leaving = self.buckets.get(step - hours)
+                if leaving:
+                    counter = self.current[window]
+                    for topic, (count, sentiment) in leaving.items():
+                        counter.add(topic, -count, -sentiment)
+                    
+                    if self.backend == 'sketch':
+                        self.current_sketch[window].merge(leaving.sketch, sign=-1)
+                        self.previous_sketch[window].merge(leaving.sketch)
+                    else:
+                        previous = self.previous[window]
+                        for topic, (count, _) in leaving.items():
+                            previous[topic] = previous.get(topic, 0) + count
+                
+                expired = self.buckets.get(step - 2 * hours)
+                if expired and self.backend == 'sketch':
+                    self.previous_sketch[window].merge(expired.sketch, sign=-1)
+                elif expired:
+                    previous = self.previous[window]
+                    for topic, (count, _) in expired.items():
+                        remaining = previous.get(topic, 0) - count
+                        if remaining > 0:
+                            previous[topic] = remaining
+                        else:
+                            previous.pop(topic, None)
+            
+            self.buckets.pop(step - self.retention_hours, None)
+        
+        self.current_hour = hour
+        self._prune_topic_columns()
+    
+    def _prune_topic_columns(self):
+        """Forget columns of topics that are no longer a candidate in any window"""
+        if self.backend != 'sketch':
+            return
+        live = set()
+        for counter in self.current.values():
+            live.update(counter.counts)
+        if len(self.topic_columns) > 2 * len(live) + 1024:
+            self.topic_columns = {topic: self.topic_columns[topic] for topic in live}
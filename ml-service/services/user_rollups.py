@@ -0,0 +1,302 @@
+import heapq
+import threading
+import time
+import logging
+
+import numpy as np
+
+from .cache import LRUCache
+from .training_data import clamp_to_now, to_epoch_seconds
+
+logger = logging.getLogger(__name__)
+
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+ENGAGEMENT_TYPES = ('like', 'comment', 'share')
+
+EVENT_TYPES = ('post', 'follow', 'unfollow', 'profile') + ENGAGEMENT_TYPES
+
+# Daily engagement/follower history needed for 30-day growth plus the previous week
+HISTORY_DAYS = 37
+
+# Interests kept per user before the long tail is pruned
+MAX_INTERESTS = 100
+
+# Posts whose author, posting slot and engagement are remembered, least recently touched evicted first
+MAX_TRACKED_POSTS = 100000
+
+
+class UserRollup:
+    """Running aggregates for one user"""
+    
+    __slots__ = (
+        'posts', 'received', 'activity', 'followers', 'following',
+        'slot_posts_hour', 'slot_engagement_hour', 'slot_posts_day', 'slot_engagement_day',
+        'active_hours', 'daily', 'interests', 'best_post'
+    )
+    
+    def __init__(self):
+        self.posts = 0
+        self.received = dict.fromkeys(ENGAGEMENT_TYPES, 0)  # engagement on this user's posts
+        self.activity = {'posts': 0, 'comments': 0, 'shares': 0}  # what this user does
+        self.followers = 0
+        self.following = 0
+        # Engagement received by posting hour / weekday, and posts per slot
+        self.slot_posts_hour = np.zeros(24, dtype=np.int64)
+        self.slot_engagement_hour = np.zeros(24, dtype=np.int64)
+        self.slot_posts_day = np.zeros(7, dtype=np.int64)
+        self.slot_engagement_day = np.zeros(7, dtype=np.int64)
+        self.active_hours = np.zeros(24, dtype=np.int64)
+        self.daily = {}  # day -> [engagement received, follower delta]
+        self.interests = {}  # topic -> weight
+        self.best_post = None  # (engagement, post_id)
+
+
+class UserRollupStore:
+    """
+    Per-user analytics rollups maintained incrementally from an event feed
+    
+    Events update running counters (engagement received, follower deltas,
+    posting-slot histograms, active hours, interests) in O(1) each, so the
+    insights page renders a precomputed record instead of aggregating the
+    user's history on every view.
+    
+    Supported event types: 'post', 'like', 'comment', 'share' (on a post,
+    credited to its author), 'follow'/'unfollow' (user_id follows
+    target_user_id) and 'profile' (absolute follower/following counts, for
+    seeding from the database). Other event types are ignored.
+    
+    Posts are remembered in a bounded LRU (max_posts), so memory does not
+    grow with every post ever seen. Engagement on an evicted post is still
+    credited to the event's 'author_id', but without its posting slot, and
+    its best-post count starts over.
+    """
+    
+    def __init__(self, max_posts=MAX_TRACKED_POSTS):
+        self.users = {}
+        self.posts = LRUCache(max_posts)  # post_id -> [author_id, posting hour, posting weekday, engagement]
+        self._lock = threading.Lock()
+    
+    def apply_events(self, events):
+        """
+        Fold a batch of events into the rollups
+        
+        The whole batch is validated first, so a malformed event raises
+        ValueError naming its position and nothing is applied.
+        
+        Returns the set of user ids whose rollups changed.
+        """
+        parsed = []
+        for i, event in enumerate(events):
+            try:
+                parsed.append(self._parse(event))
+            except (KeyError, TypeError, ValueError) as e:
+                raise ValueError(f"event {i}: {str(e)}")
+        
+        changed = set()
+        with self._lock:
+            for event, seconds in parsed:
+                if event is not None:
+                    changed.update(self._apply(event, seconds))
+        return changed
+    
+    def snapshot(self, user_id, now=None):
+        """Render a user's rollup in the get_user_analytics format"""
+        with self._lock:
+            rollup = self.users.get(user_id) or UserRollup()
+            today = int((time.time() if now is None else now) // 86400)
+            
+            def window_sum(column, start, end):
+                return sum(rollup.daily.get(day, (0, 0))[column] for day in range(today - end + 1, today - start + 1))
+            
+            engagement_7d = window_sum(0, 0, 7)
+            engagement_prev_7d = window_sum(0, 7, 14)
+            if engagement_7d > engagement_prev_7d * 1.1:
+                trend = 'up'
+            elif engagement_7d < engagement_prev_7d * 0.9:
+                trend = 'down'
+            else:
+                trend = 'stable'
+            
+            follower_growth_7d = window_sum(1, 0, 7)
+            follower_growth_30d = window_sum(1, 0, 30)
+            followers_30d_ago = rollup.followers - follower_growth_30d
+            
+            total_engagement = sum(rollup.received.values())
+            activity_total = sum(rollup.activity.values())
+            
+            return {
+                'engagement': {
+                    'total_posts': rollup.posts,
+                    'total_likes': rollup.received['like'],
+                    'total_comments': rollup.received['comment'],
+                    'total_shares': rollup.received['share'],
+                    'avg_engagement_rate': round(total_engagement / rollup.posts / max(rollup.followers, 1), 3) if rollup.posts else 0.0,
+                    'engagement_trend': trend
+                },
+                'growth': {
+                    'followers': rollup.followers,
+                    'following': rollup.following,
+                    'follower_growth_7d': follower_growth_7d,
+                    'follower_growth_30d': follower_growth_30d,
+                    'growth_rate': round(follower_growth_30d / max(followers_30d_ago, 1), 2)
+                },
+                'content_performance': {
+                    'best_performing_post': {
+                        'post_id': rollup.best_post[1],
+                        'engagement_score': round(rollup.best_post[0] / max(total_engagement, 1), 2)
+                    } if rollup.best_post else None,
+                    'avg_likes_per_post': round(rollup.received['like'] / rollup.posts, 1) if rollup.posts else 0.0,
+                    'avg_comments_per_post': round(rollup.received['comment'] / rollup.posts, 1) if rollup.posts else 0.0,
+                    'best_posting_time': self._best_posting_time(rollup),
+                    'best_posting_day': self._best_posting_day(rollup)
+                },
+                'audience_insights': {
+                    'top_interests': [topic for topic, _ in heapq.nlargest(3, rollup.interests.items(), key=lambda item: item[1])],
+                    'engagement_by_type': {
+                        kind: round(count / activity_total * 100) if activity_total else 0
+                        for kind, count in rollup.activity.items()
+                    },
+                    'active_hours': [f'{hour:02d}:00' for hour in sorted(np.argsort(-rollup.active_hours, kind='stable')[:4].tolist()) if rollup.active_hours[hour]]
+                }
+            }
+    
+    def _user(self, user_id):
+        rollup = self.users.get(user_id)
+        if rollup is None:
+            rollup = self.users[user_id] = UserRollup()
+        return rollup
+    
+    @staticmethod
+    def _parse(event):
+        """
+        Check one event's fields before anything is applied
+        
+        Returns (event, epoch seconds), or (None, None) for an event type
+        that is not tracked.
+        """
+        event_type = event.get('type')
+        if event_type not in EVENT_TYPES:
+            return None, None
+        if event.get('user_id') is None:
+            raise ValueError(f"'{event_type}' event needs a user_id")
+        if event_type in ('follow', 'unfollow') and event.get('target_user_id') is None:
+            raise ValueError(f"'{event_type}' event needs a target_user_id")
+        if event_type == 'profile':
+            for field in ('followers', 'following'):
+                if field in event:
+                    int(event[field])
+        
+        timestamp = event.get('timestamp', event.get('created_at'))
+        seconds = time.time() if timestamp is None else to_epoch_seconds(timestamp)
+        if np.isnan(seconds):
+            raise ValueError(f"invalid timestamp: {timestamp!r}")
+        return event, seconds
+    
+    def _apply(self, event, seconds):
+        event_type = event['type']
+        user_id = event['user_id']
+        hour = int(seconds // 3600) % 24
+        weekday = (int(seconds // 86400) + 3) % 7  # 1970-01-01 was a Thursday
+        # Daily history is pruned relative to the newest day, so a future-dated
+        # event (e.g. a scheduled post) is booked on today instead
+        day = int(clamp_to_now(seconds) // 86400)
+        
+        if event_type == 'profile':
+            rollup = self._user(user_id)
+            rollup.followers = int(event.get('followers', rollup.followers))
+            rollup.following = int(event.get('following', rollup.following))
+            return {user_id}
+        
+        if event_type in ('follow', 'unfollow'):
+            delta = 1 if event_type == 'follow' else -1
+            target = self._user(event['target_user_id'])
+            target.followers = max(target.followers + delta, 0)
+            self._daily(target, day)[1] += delta
+            follower = self._user(user_id)
+            follower.following = max(follower.following + delta, 0)
+            return {user_id, event['target_user_id']}
+        
+        topics = [str(topic).lstrip('#').lower() for topic in event.get('hashtags', event.get('topics', []))]
+        actor = self._user(user_id)
+        actor.active_hours[hour] += 1
+        self._add_interests(actor, topics)
+        
+        if event_type == 'post':
+            post_id = event.get('post_id')
+            actor.posts += 1
+            actor.activity['posts'] += 1
+            actor.slot_posts_hour[hour] += 1
+            actor.slot_posts_day[weekday] += 1
+            if post_id is not None:
+                # Engagement may have arrived before the post event
+                known = self.posts.get(post_id)
+                self.posts.set(post_id, [user_id, hour, weekday, known[3] if known else 0])
+            return {user_id}
+        
+        if event_type in ENGAGEMENT_TYPES:
+            if event_type == 'comment':
+                actor.activity['comments'] += 1
+            elif event_type == 'share':
+                actor.activity['shares'] += 1
+            
+            post_id = event.get('post_id')
+            post = self.posts.get(post_id) if post_id is not None else None
+            if post is None:
+                post = [event.get('author_id'), None, None, 0]
+                if post_id is not None and post[0] is not None:
+                    self.posts.set(post_id, post)
+            author_id, post_hour, post_weekday = post[:3]
+            if author_id is None or author_id == user_id:
+                return {user_id}
+            
+            author = self._user(author_id)
+            author.received[event_type] += 1
+            self._daily(author, day)[0] += 1
+            if post_hour is not None:
+                author.slot_engagement_hour[post_hour] += 1
+                author.slot_engagement_day[post_weekday] += 1
+            
+            post[3] += 1
+            engagement = post[3]
+            if author.best_post is None or engagement > author.best_post[0]:
+                author.best_post = (engagement, post_id)
+            return {user_id, author_id}
+        
+        return set()
+    
+    def _daily(self, rollup, day):
+        entry = rollup.daily.get(day)
+        if entry is None:
+            entry = rollup.daily[day] = [0, 0]
+            for old_day in [old for old in rollup.daily if old <= day - HISTORY_DAYS]:
+                del rollup.daily[old_day]
+        return entry
+    
+    def _add_interests(self, rollup, topics):
+        for topic in topics:
+            if topic:
+                rollup.interests[topic] = rollup.interests.get(topic, 0) + 1
+        if len(rollup.interests) > 2 * MAX_INTERESTS:
+            rollup.interests = dict(heapq.nlargest(MAX_INTERESTS, rollup.interests.items(), key=lambda item: item[1]))
+    
+    def _best_posting_time(self, rollup):
+        """Two-hour window with the highest engagement per post"""
+        if not rollup.slot_posts_hour.any():
+            return None
+        # Circular two-hour sums so 23:00-01:00 is a candidate too
+        engagement = rollup.slot_engagement_hour + np.roll(rollup.slot_engagement_hour, -1)
+        posts = rollup.slot_posts_hour + np.roll(rollup.slot_posts_hour, -1)
+        per_post = np.where(posts > 0, engagement / np.maximum(posts, 1), -1.0)
+        start = int(np.argmax(per_post))
+        return f'{start:02d}:00-{(start + 2) % 24:02d}:00'
+    
+    def _best_posting_day(self, rollup):
+        if not rollup.slot_posts_day.any():
+            return None
+        per_post = np.where(
+            rollup.slot_posts_day > 0,
+            rollup.slot_engagement_day / np.maximum(rollup.slot_posts_day, 1),
+            -1.0
+        )
+        return WEEKDAYS[int(np.argmax(per_post))]
@@ -0,0 +1,95 @@
+"""Expiry and failure handling of the two-tier ResultCache"""
+import json
+
+from services import cache as cache_module
+from services.cache import ResultCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self):
+        return self.now
+
+
+class FakeRedis:
+    """The slice of the redis client ResultCache uses, with a settable clock"""
+    
+    def __init__(self, clock):
+        self.clock = clock
+        self.values = {}
+    
+    def set(self, key, value, ex=None):
+        self.values[key] = (value, self.clock() + ex if ex else None)
+    
+    def get(self, key):
+        value, expires_at = self.values.get(key, (None, None))
+        if expires_at is not None and expires_at <= self.clock():
+            return None
+        return value
+    
+    def pttl(self, key):
+        if self.get(key) is None:
+            return -2
+        expires_at = self.values[key][1]
+        return -1 if expires_at is None else int((expires_at - self.clock()) * 1000)
+    
+    def pipeline(self):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+    
+    def get(self, key):
+        self.calls.append(lambda: self.client.get(key))
+    
+    def pttl(self, key):
+        self.calls.append(lambda: self.client.pttl(key))
+    
+    def execute(self):
+        return [call() for call in self.calls]
+
+
+def cache_with_redis(monkeypatch, ttl=60):
+    clock = Clock()
+    monkeypatch.setattr(cache_module.time, 'monotonic', clock)
+    result_cache = ResultCache('test', ttl=ttl)
+    result_cache.redis = FakeRedis(clock)
+    return result_cache, clock
+
+
+def test_local_entries_expire_with_the_redis_ttl(monkeypatch):
+    result_cache, clock = cache_with_redis(monkeypatch)
+    result_cache.set('key', {'score': 1})
+    result_cache.redis.values.clear()
+    
+    clock.now += 59
+    assert result_cache.get('key') == {'score': 1}
+    clock.now += 2
+    assert result_cache.get('key') is None
+
+
+def test_local_copy_of_a_redis_value_expires_with_it(monkeypatch):
+    result_cache, clock = cache_with_redis(monkeypatch)
+    result_cache.redis.set('test:key', json.dumps({'score': 1}), ex=60)
+    
+    clock.now += 50
+    assert result_cache.get('key') == {'score': 1}
+    assert result_cache.redis_hits == 1
+    clock.now += 11
+    assert result_cache.get('key') is None
+
+
+def test_undecodable_redis_value_is_a_miss(monkeypatch):
+    result_cache, _ = cache_with_redis(monkeypatch)
+    result_cache.redis.set('test:truncated', '{"score": ', ex=60)
+    result_cache.redis.set('test:binary', b'\xff\xfe', ex=60)
+    
+    assert result_cache.get('truncated') is None
+    assert result_cache.get('binary') is None
+    assert result_cache.redis_errors == 2
+    assert len(result_cache.local) == 0
@@ -0,0 +1,62 @@
+"""Topic document frequencies: which posts count, and sharing them between workers"""
+from services.cache import ResultCache
+from services.content_analysis import ContentAnalyzer
+
+PUBLISHED = [
+    'Shipping our release notes for the mobile release today',
+    'Release party tonight, mobile team rocks',
+    'Mobile release is live for everyone'
+]
+
+
+def analyzer(**options):
+    return ContentAnalyzer(cache=ResultCache('test', max_size=0), **options)
+
+
+def test_analyze_and_suggest_do_not_count_drafts():
+    content_analyzer = analyzer()
+    content_analyzer.analyze('Draft about gardening tomatoes')
+    content_analyzer.suggest_hashtags('Another draft about gardening')
+    content_analyzer.analyze_batch(['Preview of gardening plans'])
+    content_analyzer.analyze_batch(['Draft of gardening plans'], post_ids=[None])
+    
+    assert content_analyzer.document_frequency.n_documents == 0
+
+
+def test_published_posts_count_once_each():
+    content_analyzer = analyzer()
+    content_analyzer.analyze_batch(PUBLISHED, post_ids=[1, 2, 3])
+    # A retried request, and a post published again
+    content_analyzer.analyze_batch(PUBLISHED, post_ids=[1, 2, 3])
+    content_analyzer.analyze_batch(PUBLISHED[:1] * 2, post_ids=[1, 1])
+    
+    assert content_analyzer.document_frequency.n_documents == 3
+    # 'release' is in every published post, so the rarer word ranks first
+    assert content_analyzer.analyze('Release of the garden planner')['topics'][0] == 'garden'
+
+
+def test_document_frequencies_are_shared_through_the_saved_table(tmp_path):
+    path = str(tmp_path / 'content_df.npz')
+    first = analyzer(document_frequency_path=path, sync_interval=0.0)
+    second = analyzer(document_frequency_path=path, sync_interval=0.0)
+    
+    first.analyze_batch(PUBLISHED[:2], post_ids=[1, 2])
+    second.analyze_batch(PUBLISHED[2:], post_ids=[3])
+    # The same post, retried against another worker
+    second.analyze_batch(PUBLISHED[:1], post_ids=[1])
+    first.sync_document_frequency()
+    
+    assert first.document_frequency.n_documents == second.document_frequency.n_documents == 3
+    assert analyzer(document_frequency_path=path).document_frequency.n_documents == 3
+
+
+def test_counted_post_ids_are_bounded():
+    content_analyzer = analyzer()
+    content_analyzer.document_frequency.max_document_ids = 10
+    content_analyzer.analyze_batch(['Gardening post'] * 25, post_ids=list(range(25)))
+    
+    assert content_analyzer.document_frequency.n_documents == 25
+    assert len(content_analyzer.document_frequency.document_ids) <= 10
+    # Recent posts are still recognised
+    content_analyzer.analyze_batch(['Gardening post'], post_ids=[24])
+    assert content_analyzer.document_frequency.n_documents == 25
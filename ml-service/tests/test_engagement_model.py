@@ -0,0 +1,58 @@
+"""Sharing trained engagement weights between workers"""
+import os
+
+import numpy as np
+
+from services.engagement_model import EngagementModel
+
+
+def test_refresh_picks_up_weights_saved_by_another_worker(tmp_path):
+    path = str(tmp_path / 'engagement.json')
+    trainer, server = EngagementModel(), EngagementModel()
+    trainer.save(path)
+    server.load(path)
+    
+    trainer.weights = trainer.weights + 0.5
+    trainer.trained_samples = 100
+    trainer.save(path)
+    
+    assert server.refresh(min_interval=0.0)
+    assert np.allclose(server.weights, trainer.weights)
+    assert server.trained_samples == 100
+    assert not server.refresh(min_interval=0.0)
+
+
+def test_refresh_is_throttled(tmp_path):
+    path = str(tmp_path / 'engagement.json')
+    trainer, server = EngagementModel(), EngagementModel()
+    trainer.save(path)
+    server.load(path)
+    
+    trainer.weights = trainer.weights + 0.5
+    trainer.save(path)
+    
+    assert not server.refresh(min_interval=60.0)
+    assert server.refresh(min_interval=60.0, force=True)
+
+
+def test_refresh_without_saved_model():
+    model = EngagementModel()
+    model.path = '/nonexistent/engagement.json'
+    
+    assert not model.refresh(min_interval=0.0)
+
+
+def test_save_stages_in_a_per_process_file(tmp_path, monkeypatch):
+    path = str(tmp_path / 'engagement.json')
+    staged = []
+    real_replace = os.replace
+    
+    def replace(source, target):
+        staged.append(os.path.basename(source))
+        real_replace(source, target)
+    
+    monkeypatch.setattr(os, 'replace', replace)
+    EngagementModel().save(path)
+    
+    assert staged == [f'engagement.json.tmp-{os.getpid()}']
+    assert os.listdir(tmp_path) == ['engagement.json']
@@ -0,0 +1,102 @@
+"""JPEG outputs of uploads in image modes JPEG cannot store"""
+import base64
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from services.image_processing import ImageProcessor
+
+SIZE = (320, 240)
+RED = (200, 40, 40)
+
+
+def upload(img, format):
+    output = io.BytesIO()
+    img.save(output, format=format)
+    return output.getvalue()
+
+
+def color_upload(mode, format='PNG'):
+    """Half-transparent red, converted to `mode`"""
+    return upload(Image.new('RGBA', SIZE, RED + (128,)).convert(mode), format)
+
+
+def gray_ramp(mode):
+    """Horizontal ramp over the full range of a high bit-depth grayscale mode"""
+    ramp = np.tile(np.linspace(0.0, 1.0, SIZE[0]), (SIZE[1], 1))
+    if mode == 'F':
+        return upload(Image.fromarray(ramp.astype(np.float32)), 'TIFF')
+    img = Image.fromarray(np.rint(ramp * 65535).astype(np.uint16))
+    return upload(img, 'PNG') if mode == 'I;16' else upload(img.convert('I'), 'TIFF')
+
+
+UPLOADS = {
+    # Transparency and palettes
+    'RGBA': lambda: color_upload('RGBA'),
+    'LA': lambda: color_upload('LA'),
+    'P': lambda: color_upload('P'),
+    'PA': lambda: color_upload('PA', 'TIFF'),
+    # High bit-depth grayscale
+    'I;16': lambda: gray_ramp('I;16'),
+    'I': lambda: gray_ramp('I'),
+    'F': lambda: gray_ramp('F'),
+    # Other color spaces and bilevel
+    'CMYK': lambda: color_upload('CMYK', 'TIFF'),
+    'LAB': lambda: color_upload('LAB', 'TIFF'),
+    '1': lambda: color_upload('1')
+}
+
+
+def outputs(data):
+    """JPEGs from the thumbnail, optimize and pipeline paths"""
+    processor = ImageProcessor()
+    pipeline = processor.process_pipeline(data, num_colors=3)
+    assert pipeline['dominant_colors']
+    return [
+        processor.generate_thumbnail(data, as_bytes=True)['thumbnail'],
+        processor.optimize_image(data, max_size=(160, 160), as_bytes=True)['optimized_image'],
+        base64.b64decode(pipeline['renditions']['feed']['image'])
+    ]
+
+
+def decoded(data):
+    img = Image.open(io.BytesIO(data))
+    assert img.format == 'JPEG'
+    assert img.mode in ('RGB', 'L')
+    return img
+
+
+@pytest.mark.parametrize('mode', list(UPLOADS))
+def test_every_mode_produces_browser_safe_jpegs(mode):
+    data = UPLOADS[mode]()
+    assert Image.open(io.BytesIO(data)).mode == mode
+    
+    for output in outputs(data):
+        decoded(output)
+
+
+@pytest.mark.parametrize('mode', ['RGBA', 'P', 'PA'])
+def test_transparency_is_composited_onto_white(mode):
+    for output in outputs(UPLOADS[mode]()):
+        center = np.asarray(decoded(output).convert('RGB'), dtype=np.int64)[20, 20]
+        # 50% red over white
+        assert np.abs(center - (227, 147, 147)).max() <= 6
+
+
+@pytest.mark.parametrize('mode', ['I;16', 'I', 'F'])
+def test_high_bit_depth_gray_is_scaled_not_clipped(mode):
+    for output in outputs(UPLOADS[mode]()):
+        row = np.asarray(decoded(output).convert('L'), dtype=np.int64)[5]
+        assert row[:3].max() <= 12
+        assert row[-3:].min() >= 243
+        assert 100 <= row[len(row) // 2] <= 155
+
+
+@pytest.mark.parametrize('mode', ['CMYK', 'LAB'])
+def test_other_color_spaces_come_out_as_rgb(mode):
+    for output in outputs(UPLOADS[mode]()):
+        img = decoded(output)
+        assert img.mode == 'RGB'
+        assert np.abs(np.asarray(img, dtype=np.int64)[20, 20] - RED).max() <= 8
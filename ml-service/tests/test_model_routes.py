@@ -0,0 +1,68 @@
+"""Recommendation model routes when several workers share a model directory"""
+import json
+import os
+
+import numpy as np
+import pytest
+
+import app as ml_app
+from services.recommendations import RecommendationEngine
+
+
+def interactions(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        {'user_id': int(user), 'item_id': int(item), 'interaction_type': 'like', 'timestamp': 1_700_000_000 + i}
+        for i, (user, item) in enumerate(zip(rng.integers(1, 31, n), rng.integers(1, 61, n)))
+    ]
+
+
+@pytest.fixture
+def model_dir(tmp_path, monkeypatch):
+    model_dir = str(tmp_path / 'recommendations')
+    engine = RecommendationEngine()
+    engine.model_dir = model_dir
+    monkeypatch.setattr(ml_app, 'RECOMMENDATION_MODEL_DIR', model_dir)
+    monkeypatch.setattr(ml_app, 'recommendation_engine', engine)
+    return model_dir
+
+
+def saved_meta(model_dir):
+    with open(os.path.join(model_dir, 'meta.json')) as f:
+        return json.load(f)
+
+
+def test_train_options_survive_reload_of_another_workers_model(model_dir):
+    # Another worker saved a cosine model with the default 30-day half-life
+    other = RecommendationEngine()
+    other.train_model(interactions(seed=1))
+    other.save_model(model_dir)
+    
+    response = ml_app.app.test_client().post('/api/ml/train', json={
+        'user_interactions': interactions(),
+        'model_type': 'als',
+        'factors': 4,
+        'half_life_days': 0
+    })
+    
+    assert response.status_code == 200
+    meta = saved_meta(model_dir)
+    assert meta['model_type'] == 'als'
+    assert meta['has_factor_model']
+    assert meta['decay_half_life_days'] is None
+
+
+def test_refresh_keeps_serving_when_the_saved_model_is_unreadable(model_dir):
+    writer, reader = RecommendationEngine(), RecommendationEngine()
+    writer.train_model(interactions())
+    writer.save_model(model_dir)
+    reader.load_model(model_dir)
+    before = reader.get_user_recommendations(1, limit=5)
+    
+    with open(os.path.join(model_dir, 'meta.json'), 'w') as f:
+        f.write('{"format_version": ')
+    
+    assert not reader.refresh(min_interval=0.0)
+    assert reader.get_user_recommendations(1, limit=5) == before
+    with pytest.raises(Exception):
+        reader.refresh(force=True)
@@ -0,0 +1,40 @@
+"""Palettes of images made of known flat colors"""
+import numpy as np
+import pytest
+
+from services.palette import PALETTE_METHODS, extract_palette
+
+FIVE_COLORS = [(200, 30, 40), (30, 160, 60), (40, 60, 200), (230, 220, 50), (120, 40, 160)]
+THREE_COLORS = [(30, 60, 170), (150, 80, 30), (240, 240, 240)]
+
+
+def blocks(colors, noise=0, seed=0):
+    """Vertical stripes of equal width, one per color, with optional uniform noise"""
+    pixels = np.zeros((100, 100, 3), dtype=np.int64)
+    for i, edges in enumerate(np.array_split(np.arange(100), len(colors))):
+        pixels[:, edges] = colors[i]
+    if noise:
+        pixels += np.random.default_rng(seed).integers(-noise, noise + 1, pixels.shape)
+    return np.clip(pixels, 0, 255).astype(np.uint8)
+
+
+@pytest.mark.parametrize('method', PALETTE_METHODS)
+@pytest.mark.parametrize('colors', [FIVE_COLORS, THREE_COLORS])
+def test_flat_colors_come_back_exactly(method, colors):
+    palette = extract_palette(blocks(colors), 5, method)
+    
+    assert sorted(tuple(color) for color, _ in palette) == sorted(colors)
+    assert sum(share for _, share in palette) == pytest.approx(1.0)
+
+
+@pytest.mark.parametrize('method', PALETTE_METHODS)
+@pytest.mark.parametrize('colors', [FIVE_COLORS, THREE_COLORS])
+def test_noisy_flat_colors_stay_in_the_image(method, colors):
+    palette = extract_palette(blocks(colors, noise=6), 5, method)
+    
+    assert len(palette) == len(colors)
+    for color, share in palette:
+        nearest = min(colors, key=lambda c: np.abs(np.subtract(c, color)).max())
+        assert np.abs(np.subtract(nearest, color)).max() <= 2
+        assert share == pytest.approx(1 / len(colors), abs=0.02)
+    assert sum(share for _, share in palette) == pytest.approx(1.0)
@@ -0,0 +1,69 @@
+"""Merging and retention of ReachTracker sketches"""
+import time
+
+from services.reach import ReachTracker
+from services.training_data import MAX_CLOCK_SKEW_SECONDS
+
+DAY = 86400
+NOW = 20_000 * DAY
+
+
+def test_merging_own_export_does_not_double_views():
+    tracker = ReachTracker(worker_id='a')
+    tracker.record('post', 1, range(500), NOW)
+    exported = tracker.export_sketches('post', 1)
+    
+    tracker.merge_sketches(exported)
+    tracker.merge_sketches(exported)
+    
+    assert tracker.views('post', 1) == 500
+
+
+def test_views_from_other_workers_add_up_once():
+    first, second = ReachTracker(worker_id='a'), ReachTracker(worker_id='b')
+    first.record('post', 1, range(500), NOW)
+    second.record('post', 1, range(300, 600), NOW)
+    
+    for _ in range(2):
+        second.merge_sketches(first.export_sketches('post', 1))
+        first.merge_sketches(second.export_sketches('post', 1))
+    
+    assert first.views('post', 1) == second.views('post', 1) == 800
+    assert abs(first.unique_viewers('post', 1) - 600) <= 30
+
+
+def test_daily_sketches_use_daily_precision():
+    tracker = ReachTracker(precision=12, daily_precision=10)
+    tracker.record('post', 1, range(1000), NOW)
+    
+    assert tracker.all_time[('post', 1, 'views')].memory_bytes == 4096
+    assert tracker.daily[('post', 1, 'views')][NOW // DAY].memory_bytes == 1024
+    assert abs(tracker.unique_viewers('post', 1, days=1, now=NOW) - 1000) <= 100
+
+
+def test_new_day_prunes_every_item():
+    tracker = ReachTracker(retention_days=30)
+    tracker.record('post', 1, range(10), NOW)
+    tracker.record('story', 2, range(10), NOW)
+    
+    tracker.record('post', 3, range(10), NOW + 30 * DAY)
+    
+    assert set(tracker.daily) == {('post', 3, 'views')}
+    assert tracker.unique_viewers('post', 1) == 10
+
+
+def test_future_dated_view_does_not_prune_real_days():
+    tracker = ReachTracker(retention_days=30)
+    now = time.time()
+    tracker.record('post', 1, range(100), now)
+    
+    tracker.record('post', 2, range(10), now + 90 * DAY)
+    exported = ReachTracker(worker_id='b')
+    exported.record('post', 3, range(10), now + 120 * DAY)
+    tracker.merge_sketches(exported.export_sketches('post', 3))
+    
+    # Future days count as today (or tomorrow, within the allowed clock skew)
+    latest = now + MAX_CLOCK_SKEW_SECONDS
+    assert tracker.latest_day == int(latest // DAY)
+    assert abs(tracker.unique_viewers('post', 1, days=2, now=latest) - 100) <= 10
+    assert tracker.unique_viewers('post', 2, days=2, now=latest) == 10
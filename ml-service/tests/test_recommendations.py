@@ -0,0 +1,186 @@
+"""Recommendation engine: neighbour tables, batch scoring, incremental updates, exclusions and saved models"""
+import numpy as np
+import pytest
+
+from services.recommendations import RecommendationEngine
+
+DAY = 86400
+
+
+@pytest.fixture
+def engine():
+    rng = np.random.default_rng(0)
+    n = 2000
+    engine = RecommendationEngine()
+    engine.configure_model('als', factors=8, iterations=5)
+    engine.train_from_arrays(
+        rng.integers(1, 101, n),
+        rng.integers(1, 201, n),
+        np.ones(n),
+        np.full(n, 1_700_000_000.0)
+    )
+    # A new user who only engaged with posts created after factor training
+    engine.update_from_arrays([500, 500], [900, 901], [1.0, 1.0], [1_700_000_000.0 + DAY] * 2)
+    return engine
+
+
+def test_user_with_zero_factors_gets_popular_posts(engine):
+    recommendations = engine.get_user_recommendations(500, limit=5)
+    
+    assert len(recommendations) == 5
+    assert all(rec['reason'] == 'Popular in your network' for rec in recommendations)
+
+
+def test_batch_user_with_zero_factors_gets_popular_posts(engine):
+    single = engine.get_user_recommendations(500, limit=5)
+    batch = engine.get_batch_recommendations([500, 1], limit=5)
+    
+    assert all(rec['reason'] == 'Popular in your network' for rec in batch[0]['recommendations'])
+    assert batch[0]['recommendations'] == single
+    assert batch[1]['recommendations'][0]['reason'] == 'Based on your interests'
+
+
+def interactions(seed, n=600, n_users=60, n_items=120, start=1_700_000_000.0):
+    """Random interactions with distinct float weights, so scores never tie"""
+    rng = np.random.default_rng(seed)
+    return (
+        rng.integers(1, n_users + 1, n),
+        rng.integers(1, n_items + 1, n),
+        rng.uniform(0.5, 3.0, n),
+        start + np.sort(rng.uniform(0, 10 * DAY, n))
+    )
+
+
+def trained_engine(model_type='cosine', data=None):
+    engine = RecommendationEngine()
+    engine.configure_model(model_type, factors=8, iterations=5)
+    engine.train_from_arrays(*(data or interactions(1)))
+    return engine
+
+
+def brute_force_cosine(engine):
+    matrix = engine.user_item_matrix.toarray().astype(np.float64)
+    norms = np.linalg.norm(matrix, axis=1)
+    norms[norms == 0] = 1.0
+    similarity = (matrix @ matrix.T) / np.outer(norms, norms)
+    np.fill_diagonal(similarity, 0.0)
+    return similarity
+
+
+def assert_neighbours_match(engine, similarity):
+    k = engine.n_neighbors
+    for row in range(len(engine.user_ids)):
+        valid = engine.neighbor_ids[row] >= 0
+        listed = engine.neighbor_scores[row][valid]
+        expected = np.sort(similarity[row][similarity[row] > 1e-9])[::-1][:k]
+        
+        np.testing.assert_allclose(listed, expected, rtol=1e-4, atol=1e-6)
+        np.testing.assert_allclose(similarity[row, engine.neighbor_ids[row][valid]], listed, rtol=1e-4, atol=1e-6)
+
+
+def assert_same_recommendations(first, second):
+    assert [rec['post_id'] for rec in first] == [rec['post_id'] for rec in second]
+    np.testing.assert_allclose([rec['score'] for rec in first], [rec['score'] for rec in second], atol=2e-4)
+
+
+def test_neighbours_match_brute_force_cosine():
+    engine = trained_engine()
+    engine.n_neighbors = 10
+    engine._build_neighbor_table(block_size=7)
+    
+    assert_neighbours_match(engine, brute_force_cosine(engine))
+    similar = engine.get_similar_users(int(engine.user_ids[0]), limit=3)
+    assert [user['similarity_score'] for user in similar] == [
+        round(float(score), 4) for score in engine.neighbor_scores[0][:3]
+    ]
+
+
+@pytest.mark.parametrize('model_type', ['cosine', 'als'])
+def test_batch_matches_single_user_recommendations(model_type):
+    engine = trained_engine(model_type)
+    engine.set_item_authors(np.arange(1, 121), np.arange(1, 121) % 60 + 1)
+    engine.set_blocked_users([1, 2], [3, 4])
+    user_ids = [1, 2, 3, 17, 60, 999]
+    
+    batch = engine.get_batch_recommendations(user_ids, limit=8, block_size=4)
+    
+    assert [result['user_id'] for result in batch] == user_ids
+    for user_id, result in zip(user_ids, batch):
+        assert_same_recommendations(result['recommendations'], engine.get_user_recommendations(user_id, limit=8))
+
+
+def test_incremental_update_matches_full_retrain():
+    user_ids, item_ids, weights, timestamps = interactions(2)
+    # Later interactions, including new users and new posts
+    late = interactions(3, n=150, n_users=70, n_items=130, start=timestamps[-1] + 1)
+    
+    incremental = trained_engine(data=(user_ids, item_ids, weights, timestamps))
+    incremental.update_from_arrays(*late[:2], late[2], late[3])
+    full = trained_engine(data=tuple(np.concatenate([early, later]) for early, later in zip(
+        (user_ids, item_ids, weights, timestamps), late
+    )))
+    
+    np.testing.assert_array_equal(incremental.user_ids, full.user_ids)
+    np.testing.assert_array_equal(incremental.item_ids, full.item_ids)
+    np.testing.assert_allclose(incremental.user_item_matrix.toarray(), full.user_item_matrix.toarray(), rtol=1e-5)
+    assert_neighbours_match(incremental, brute_force_cosine(full))
+    for user_id in [1, 5, 33, 65, 69]:
+        assert_same_recommendations(
+            incremental.get_user_recommendations(user_id, limit=8),
+            full.get_user_recommendations(user_id, limit=8)
+        )
+
+
+@pytest.mark.parametrize('model_type', ['cosine', 'als'])
+def test_recommendations_exclude_seen_own_and_blocked_posts(model_type):
+    engine = trained_engine(model_type)
+    authors = np.arange(1, 121) % 60 + 1
+    engine.set_item_authors(np.arange(1, 121), authors)
+    engine.set_blocked_users([1, 2], [3, 4])
+    blocked = {1: {3}, 2: {4}, 3: {1}, 4: {2}}
+    
+    user_ids = [1, 2, 3, 4, 17]
+    batch = engine.get_batch_recommendations(user_ids, limit=20)
+    for user_id, result in zip(user_ids, batch):
+        row = engine._user_index(user_id)
+        matrix = engine.user_item_matrix
+        seen = set(engine.item_ids[matrix.indices[matrix.indptr[row]:matrix.indptr[row + 1]]].tolist())
+        hidden_authors = {user_id} | blocked.get(user_id, set())
+        
+        for recommendations in (result['recommendations'], engine.get_user_recommendations(user_id, limit=20)):
+            post_ids = [rec['post_id'] for rec in recommendations]
+            assert len(post_ids) == 20 and len(set(post_ids)) == 20
+            assert not seen & set(post_ids)
+            assert not hidden_authors & {int(authors[post_id - 1]) for post_id in post_ids}
+
+
+@pytest.mark.parametrize('model_type', ['cosine', 'als'])
+def test_saved_model_loads_memory_mapped_and_keeps_updating(tmp_path, model_type):
+    engine = trained_engine(model_type)
+    engine.save_model(str(tmp_path / 'model'))
+    
+    loaded = RecommendationEngine()
+    loaded.load_model(str(tmp_path / 'model'))
+    assert not loaded.neighbor_ids.flags.writeable
+    for user_id in [1, 30, 60]:
+        assert_same_recommendations(
+            loaded.get_user_recommendations(user_id, limit=8),
+            engine.get_user_recommendations(user_id, limit=8)
+        )
+    
+    saved_scores = np.array(loaded.neighbor_scores)
+    late = interactions(4, n=100, n_users=65, start=engine.watermark + 1)
+    engine.update_from_arrays(*late)
+    loaded.update_from_arrays(*late)
+    for user_id in [1, 30, 62]:
+        assert_same_recommendations(
+            loaded.get_user_recommendations(user_id, limit=8),
+            engine.get_user_recommendations(user_id, limit=8)
+        )
+    
+    # Updating the loaded copy never writes through to the saved files
+    reloaded = RecommendationEngine()
+    reloaded.load_model(str(tmp_path / 'model'))
+    assert reloaded._user_index(62) < 0
+    np.testing.assert_array_equal(reloaded.neighbor_scores, saved_scores)
+    assert not np.array_equal(loaded.neighbor_scores[:len(saved_scores)], saved_scores)
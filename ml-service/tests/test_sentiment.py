@@ -0,0 +1,26 @@
+"""Negation handling in lexicon sentiment scoring"""
+import pytest
+
+from services.content_analysis import ContentAnalyzer
+
+
+@pytest.fixture
+def analyzer():
+    return ContentAnalyzer()
+
+
+@pytest.mark.parametrize('content', [
+    "I don't like this, it isn't good",
+    "I don’t love it",
+    "This wasn't great and we can't recommend it"
+])
+def test_negated_contractions_score_negative(analyzer, content):
+    assert analyzer.analyze_sentiment_batch([content])[0]['label'] == 'negative'
+
+
+def test_contractions_keep_their_negation_stem(analyzer):
+    assert analyzer.tokenize("I don't think it's #great") == ['i', 'dont', 'think', 'its', 'great']
+
+
+def test_unnegated_text_stays_positive(analyzer):
+    assert analyzer.analyze_sentiment_batch(["I like this, it's good"])[0]['label'] == 'positive'
@@ -0,0 +1,140 @@
+"""TrendingEngine: sketch backend error bounds against the exact backend, and clock handling"""
+import math
+import time
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from services.trending import TRENDING_BACKENDS, TrendingEngine
+
+START = 1_700_000_000 // 3600 * 3600
+HOURS = 48
+
+
+def make_posts(seed=0, posts_per_hour=400, spam=0.6):
+    """Zipf-distributed hashtags mixed with one-off spam tags, spread over HOURS hours"""
+    rng = np.random.default_rng(seed)
+    posts = []
+    for hour in range(HOURS):
+        for i in range(posts_per_hour):
+            tags = [f'tag{int(t) % 500}' for t in rng.zipf(1.3, rng.integers(1, 4))]
+            if rng.random() < spam:
+                tags.append(f'spam{hour}_{i}')
+            posts.append((tags, START + hour * 3600 + int(rng.integers(0, 3600))))
+    return posts
+
+
+def build(backend, posts, **options):
+    engine = TrendingEngine(windows={'24h': 24}, backend=backend, **options)
+    for tags, timestamp in posts:
+        engine.ingest(tags, timestamp)
+    return engine
+
+
+@pytest.fixture(scope='module')
+def posts():
+    return make_posts()
+
+
+@pytest.fixture(scope='module')
+def now():
+    return START + HOURS * 3600 - 1
+
+
+@pytest.fixture(scope='module')
+def exact(posts, now):
+    engine = build('exact', posts)
+    return {
+        'current': dict(engine.current['24h'].counts),
+        'previous': dict(engine.previous['24h'])
+    }
+
+
+@pytest.fixture(scope='module')
+def sketch(posts):
+    # Small capacity forces frequent evictions from the hourly summaries
+    return build('sketch', posts, topic_capacity=20, sketch_width=2048, sketch_depth=5)
+
+
+def test_mentions_never_undercount(sketch, exact, now):
+    trending = sketch.get_trending('24h', limit=50, now=now)
+    assert trending
+    for item in trending:
+        topic = item['topic'].lstrip('#')
+        assert item['mentions'] >= exact['current'][topic]
+        assert item['previous_mentions'] >= exact['previous'].get(topic, 0)
+
+
+def test_mentions_within_count_min_bound(sketch, exact, now):
+    window_total = sketch.current_sketch['24h'].total
+    bound = math.e / sketch.sketch_width * window_total
+    trending = sketch.get_trending('24h', limit=50, now=now)
+    overshoots = [item['mentions'] - exact['current'][item['topic'].lstrip('#')] for item in trending]
+    # Each estimate exceeds the bound with probability <= exp(-depth)
+    assert sum(overshoot > bound for overshoot in overshoots) <= max(1, len(overshoots) * math.exp(-sketch.sketch_depth))
+
+
+def test_ranked_by_reported_mentions(sketch, now):
+    mentions = [item['mentions'] for item in sketch.get_trending('24h', limit=50, now=now)]
+    assert mentions == sorted(mentions, reverse=True)
+
+
+def test_heavy_hitters_are_reported(sketch, exact, now):
+    window_total = sum(exact['current'].values())
+    heavy = {topic for topic, count in exact['current'].items() if count > window_total / sketch.topic_capacity}
+    assert heavy
+    reported = {item['topic'].lstrip('#') for item in sketch.get_trending('24h', limit=len(heavy) + 10, now=now)}
+    assert heavy <= reported
+
+
+def test_top_topics_match_exact(sketch, exact, now):
+    true_top = [topic for topic, _ in Counter(exact['current']).most_common(5)]
+    reported = [item['topic'].lstrip('#') for item in sketch.get_trending('24h', limit=5, now=now)]
+    assert reported == true_top
+
+
+def test_topic_evicted_in_some_hours_is_not_undercounted():
+    """
+    A topic that is heavy over the window but drops out of some hourly
+    summaries must still report at least its true count
+    """
+    engine = TrendingEngine(windows={'24h': 24}, backend='sketch', topic_capacity=20, sketch_width=1024, sketch_depth=5)
+    true_count = 0
+    for hour in range(24):
+        base = START + hour * 3600
+        if hour % 2 == 0:
+            # Heavy hour: one mention in every 11 tags
+            for i in range(60):
+                engine.ingest(['launch'], base + i)
+                true_count += 1
+                for j in range(10):
+                    engine.ingest([f'noise{hour}_{i}_{j}'], base + i)
+        else:
+            # Light hour: a few early mentions, then enough one-off tags to evict it
+            for i in range(5):
+                engine.ingest(['launch'], base)
+                true_count += 1
+            for j in range(200):
+                engine.ingest([f'noise{hour}_{j}'], base + 1)
+            assert 'launch' not in engine.buckets[base // 3600].summary.counts
+    
+    trending = engine.get_trending('24h', limit=1, now=START + 24 * 3600 - 1)
+    assert trending[0]['topic'] == '#launch'
+    assert trending[0]['mentions'] >= true_count
+
+
+@pytest.mark.parametrize('backend', TRENDING_BACKENDS)
+def test_future_dated_post_does_not_expire_the_windows(backend):
+    engine = TrendingEngine(windows={'24h': 24}, backend=backend)
+    now = time.time()
+    for i in range(50):
+        engine.ingest(['launch'], now - 3600 + i)
+    
+    # A scheduled post 90 days ahead counts as now instead of sliding every window
+    engine.ingest(['scheduled'], now + 90 * 86400)
+    engine.ingest(['launch'], now)
+    
+    trending = {item['topic']: item['mentions'] for item in engine.get_trending('24h', limit=5, now=now)}
+    assert trending['#launch'] >= 51
+    assert trending['#scheduled'] >= 1
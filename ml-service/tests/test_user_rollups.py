@@ -0,0 +1,58 @@
+"""Per-user analytics rollups fed from the event stream"""
+import time
+
+import pytest
+
+from services.training_data import MAX_CLOCK_SKEW_SECONDS
+from services.user_rollups import UserRollupStore
+
+DAY = 86400
+
+
+def test_future_dated_event_does_not_prune_daily_history():
+    store = UserRollupStore()
+    now = time.time()
+    store.apply_events([{'type': 'post', 'user_id': 1, 'post_id': 10, 'timestamp': now - 3 * DAY}])
+    store.apply_events([
+        {'type': 'like', 'user_id': 2, 'post_id': 10, 'timestamp': now - 3 * DAY + i}
+        for i in range(5)
+    ])
+    
+    # A follow dated 90 days ahead is booked on today (or tomorrow, within the clock skew)
+    store.apply_events([{'type': 'follow', 'user_id': 3, 'target_user_id': 1, 'timestamp': now + 90 * DAY}])
+    
+    snapshot = store.snapshot(1, now=now + MAX_CLOCK_SKEW_SECONDS)
+    assert snapshot['engagement']['total_likes'] == 5
+    assert snapshot['growth']['follower_growth_7d'] == 1
+    assert sum(engagement for engagement, _ in store.users[1].daily.values()) == 5
+
+
+def test_tracked_posts_are_bounded():
+    store = UserRollupStore(max_posts=100)
+    store.apply_events([{'type': 'post', 'user_id': 1, 'post_id': post_id} for post_id in range(1000)])
+    store.apply_events([{'type': 'like', 'user_id': 2, 'post_id': 999}])
+    
+    assert len(store.posts) == 100
+    assert store.snapshot(1)['content_performance']['best_performing_post']['post_id'] == 999
+
+
+def test_malformed_event_rejects_the_whole_batch():
+    store = UserRollupStore()
+    events = [
+        {'type': 'post', 'user_id': 1, 'post_id': 10},
+        {'type': 'follow', 'user_id': 2},
+        {'type': 'like', 'user_id': 3, 'post_id': 10}
+    ]
+    
+    with pytest.raises(ValueError, match='event 1'):
+        store.apply_events(events)
+    assert store.users == {}
+    assert len(store.posts) == 0
+
+
+def test_unknown_event_types_are_ignored():
+    store = UserRollupStore()
+    changed = store.apply_events([{'type': 'view', 'user_id': 1, 'hashtags': ['#music']}])
+    
+    assert changed == set()
+    assert store.users == {}
@@ -42,6 +42,23 @@ class MLServiceClient {
     }
   }
 
+  /**
+   * Get personalized recommendations for many users in one request
+   */
+  async getBatchUserRecommendations(userIds, limit = 10) {
+    try {
+      const response = await axios.post(
+        `${this.baseURL}/api/recommendations/users/batch`,
+        { user_ids: userIds, limit },
+        { timeout: 30000 } // Longer timeout for large batches
+      );
+      return response.data;
+    } catch (error) {
+      console.error('Error getting batch recommendations:', error.message);
+      throw new Error('Failed to get batch recommendations');
+    }
+  }
+
   /**
    * Get similar users
    */
@@ -113,6 +130,74 @@ class MLServiceClient {
     }
   }
 
+  /**
+   * Record posts (hashtags or raw content) for trending topics
+   */
+  async ingestTrendingTopics(events) {
+    try {
+      const response = await axios.post(
+        `${this.baseURL}/api/analytics/trending/ingest`,
+        { events },
+        { timeout: this.timeout }
+      );
+      return response.data;
+    } catch (error) {
+      console.error('Error ingesting trending topics:', error.message);
+      throw new Error('Failed to ingest trending topics');
+    }
+  }
+
+  /**
+   * Record story_views / post_interactions rows for unique viewer and reach estimates
+   */
+  async recordViewEvents(events) {
+    try {
+      const response = await axios.post(
+        `${this.baseURL}/api/analytics/views`,
+        { events },
+        { timeout: this.timeout }
+      );
+      return response.data;
+    } catch (error) {
+      console.error('Error recording view events:', error.message);
+      throw new Error('Failed to record view events');
+    }
+  }
+
+  /**
+   * Feed post, engagement and follow events into the per-user analytics rollups
+   */
+  async recordUserEvents(events) {
+    try {
+      const response = await axios.post(
+        `${this.baseURL}/api/analytics/events`,
+        { events },
+        { timeout: this.timeout }
+      );
+      return response.data;
+    } catch (error) {
+      console.error('Error recording user events:', error.message);
+      throw new Error('Failed to record user events');
+    }
+  }
+
+  /**
+   * Predict engagement (and the best posting slot) for a batch of draft posts
+   */
+  async predictEngagement(posts) {
+    try {
+      const response = await axios.post(
+        `${this.baseURL}/api/analytics/engagement/predict`,
+        { posts },
+        { timeout: this.timeout }
+      );
+      return response.data;
+    } catch (error) {
+      console.error('Error predicting engagement:', error.message);
+      throw new Error('Failed to predict engagement');
+    }
+  }
+
   /**
    * Train the ML model with user interaction data
    */